@@ -1,6 +1,7 @@
 """CopilotKit SDK"""
 from .sdk import CopilotKitRemoteEndpoint, CopilotKitContext, CopilotKitSDK, CopilotKitSDKContext
-from .action import Action
+from .action import Action, ActionProgress
+from .cache import ActionCache
 from .langgraph import CopilotKitState
 from .parameter import Parameter
 from .agent import Agent
@@ -13,6 +14,8 @@ __all__ = [
     'CopilotKitRemoteEndpoint', 
     'CopilotKitSDK',
     'Action', 
+    'ActionProgress',
+    'ActionCache',
     'CopilotKitState',    
     'Parameter',
     'Agent',
@@ -1,34 +1,134 @@
 """Actions"""
 
 import re
-from inspect import iscoroutinefunction
-from typing import Optional, List, Callable, TypedDict, Any, cast
+import asyncio
+from inspect import iscoroutinefunction, isasyncgenfunction, isawaitable
+from typing import (
+    Optional, List, Callable, TypedDict, Any, Dict, AsyncIterator, Literal, cast, TYPE_CHECKING
+)
+from typing_extensions import NotRequired
 from .parameter import Parameter, normalize_parameters
+from .validation import ArgumentValidator
+from .executor import ConcurrencyLimiter, get_action_executor
+from .cache import ActionCache
+from .exc import ActionArgumentsException, ActionTimeoutException
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .sdk import CopilotKitContext
 
 class ActionDict(TypedDict):
     """Dict representation of an action"""
     name: str
     description: str
     parameters: List[Parameter]
+    jsonSchema: NotRequired[Dict[str, Any]]
 
 class ActionResultDict(TypedDict):
     """Dict representation of an action result"""
     result: Any
 
-class Action:  # pylint: disable=too-few-public-methods
-    """Action class for CopilotKit"""
-    def __init__(
+class ActionStreamEvent(TypedDict):
+    """
+    An event of a streamed action execution: a `chunk` yielded by the handler, a `progress`
+    update, or the final `result`.
+    """
+    type: Literal["chunk", "progress", "result"]
+    data: NotRequired[Any]
+    progress: NotRequired[Optional[float]]
+    message: NotRequired[Optional[str]]
+    result: NotRequired[Any]
+
+class ActionProgress:  # pylint: disable=too-few-public-methods
+    """
+    Yield this from a streaming handler to report progress.
+
+    Parameters
+    ----------
+    progress : Optional[float]
+        The completed fraction, from 0 to 1.
+    message : Optional[str]
+        A description of the current step.
+    """
+    def __init__(self, progress: Optional[float] = None, message: Optional[str] = None):
+        self.progress = progress
+        self.message = message
+
+class Action:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    Action class for CopilotKit
+
+    Synchronous handlers run on the action executor (see `copilotkit.executor`), so that they do
+    not block the event loop.
+
+    Arguments are validated against the parameters before the handler runs, and coerced where
+    that is unambiguous (see `copilotkit.validation`). Invalid calls raise
+    `ActionArgumentsException`, listing every invalid argument.
+
+    Async generator handlers stream their results. Each yielded value is sent to the caller as a
+    `chunk` event as soon as it is produced, and `ActionProgress` values as `progress` events:
+
+    ```python
+    async def export_rows(query: str):
+        async for index, batch in fetch_batches(query):
+            yield ActionProgress(message=f"batch {index}")
+            yield batch
+
+    Action(
+        name="export_rows",
+        handler=export_rows,
+        aggregate=lambda count, batch: (count or 0) + len(batch),
+    )
+    ```
+
+    Callers that do not stream (see `stream()`) receive the aggregate as the result, or the list
+    of chunks when there is no `aggregate`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the action.
+    handler : Callable
+        The function implementing the action, either sync or async.
+    description : Optional[str]
+        The description of the action.
+    parameters : Optional[List[Parameter]]
+        The parameters of the action.
+    timeout : Optional[float]
+        The maximum number of seconds the handler may run. Async handlers are cancelled when the
+        timeout expires. Sync handlers are cancelled if they have not started yet; a thread that
+        is already running cannot be interrupted, so its result is discarded.
+    max_concurrency : Optional[int]
+        The maximum number of concurrent executions of this action. Further executions wait.
+    cache : Optional[ActionCache]
+        Cache the results of the action, see `ActionCache`. Streamed executions are not cached.
+    aggregate : Optional[Callable[[Any, Any], Any]]
+        For streaming handlers, folds each chunk into the final result, starting from None:
+        `aggregate(result, chunk) -> result`. The chunks themselves are not kept.
+    """
+    def __init__( # pylint: disable=too-many-arguments
             self,
             *,
             name: str,
             handler: Callable,
             description: Optional[str] = None,
             parameters: Optional[List[Parameter]] = None,
+            timeout: Optional[float] = None,
+            max_concurrency: Optional[int] = None,
+            cache: Optional[ActionCache] = None,
+            aggregate: Optional[Callable[[Any, Any], Any]] = None,
         ):
         self.name = name
         self.description = description
         self.parameters = parameters
         self.handler = handler
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._limiter = ConcurrencyLimiter(max_concurrency) if max_concurrency else None
+        self.cache = cache
+        self.aggregate = aggregate
+        self.streaming = isasyncgenfunction(handler)
+        self._validator = ArgumentValidator(normalize_parameters(cast(Any, parameters)))
 
         if not re.match(r"^[a-zA-Z0-9_-]+$", name):
             raise ValueError(
@@ -39,19 +139,139 @@ class Action:  # pylint: disable=too-few-public-methods
     async def execute(
             self,
             *,
-            arguments: dict
+            arguments: dict,
+            context: Optional["CopilotKitContext"] = None,
         ) -> ActionResultDict:
         """Execute the action"""
-        result = self.handler(**arguments)
+        arguments = self._validate(arguments)
+
+        if self.cache is None:
+            result = await self._execute(arguments)
+        else:
+            result = await self.cache.get_or_execute(
+                self.name,
+                self.cache.make_key(self.name, arguments, context),
+                lambda: self._execute(arguments),
+            )
 
         return {
-            "result": await result if iscoroutinefunction(self.handler) else result
+            "result": result
         }
 
+    async def stream(
+            self,
+            *,
+            arguments: dict,
+            context: Optional["CopilotKitContext"] = None,
+        ) -> AsyncIterator[ActionStreamEvent]:
+        """
+        Execute the action, streaming its chunks and progress, followed by the `result` event.
+        For handlers that do not stream, this is just the `result` event.
+        """
+        if not self.streaming:
+            result = await self.execute(arguments=arguments, context=context)
+            yield {"type": "result", "result": result["result"]}
+            return
+
+        arguments = self._validate(arguments)
+        async for event in self._stream(arguments, collect=False):
+            yield event
+
+    def _validate(self, arguments: dict) -> dict:
+        arguments, errors = self._validator.validate(arguments)
+        if errors:
+            metrics.increment("copilotkit_action_invalid_arguments", action=self.name)
+            raise ActionArgumentsException(self.name, errors)
+        return arguments
+
+    async def _stream(self, arguments: dict, collect: bool) -> AsyncIterator[ActionStreamEvent]:
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None else loop.time() + self.timeout
+        chunks: List[Any] = []
+        result = None
+
+        generator = None
+        if self._limiter is not None:
+            await self._limiter.acquire()
+        try:
+            generator = self.handler(**arguments)
+            while True:
+                remaining = None if deadline is None else max(deadline - loop.time(), 0)
+                try:
+                    item = await asyncio.wait_for(generator.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    if deadline is None or loop.time() < deadline:
+                        raise
+                    metrics.increment("copilotkit_action_timeouts", action=self.name)
+                    raise ActionTimeoutException(self.name, cast(float, self.timeout)) from None
+
+                if isinstance(item, ActionProgress):
+                    yield {"type": "progress", "progress": item.progress, "message": item.message}
+                    continue
+                if self.aggregate is not None:
+                    result = self.aggregate(result, item)
+                elif collect:
+                    chunks.append(item)
+                if not collect:
+                    yield {"type": "chunk", "data": item}
+        finally:
+            try:
+                if generator is not None:
+                    await generator.aclose()
+            finally:
+                if self._limiter is not None:
+                    self._limiter.release()
+
+        if collect and self.aggregate is None:
+            result = chunks
+        yield {"type": "result", "result": result}
+
+    async def _execute(self, arguments: dict) -> Any:
+        if self.streaming:
+            async for event in self._stream(arguments, collect=True):
+                if event["type"] == "result":
+                    return event["result"]
+
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None else loop.time() + self.timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(deadline - loop.time(), 0)
+
+        limiter = self._limiter
+        if limiter is not None:
+            await limiter.acquire()
+        try:
+            if iscoroutinefunction(self.handler):
+                result = await asyncio.wait_for(self.handler(**arguments), remaining())
+            else:
+                future = get_action_executor().submit(self.handler, **arguments)
+                if limiter is not None:
+                    # hold the slot until the thread is done, even if we stop waiting for it
+                    release = limiter.release
+                    future.add_done_callback(lambda _future: release())
+                    limiter = None
+                result = await asyncio.wait_for(asyncio.wrap_future(future), remaining())
+                if isawaitable(result):
+                    result = await asyncio.wait_for(result, remaining())
+        except asyncio.TimeoutError:
+            if deadline is None or loop.time() < deadline:
+                # raised by the handler itself
+                raise
+            metrics.increment("copilotkit_action_timeouts", action=self.name)
+            raise ActionTimeoutException(self.name, cast(float, self.timeout)) from None
+        finally:
+            if limiter is not None:
+                limiter.release()
+        return result
+
     def dict_repr(self) -> ActionDict:
         """Dict representation of the action"""
         return {
             'name': self.name,
             'description': self.description or '',
-            'parameters': normalize_parameters(cast(Any, self.parameters)),
+            'parameters': self._validator.parameters,
+            'jsonSchema': self._validator.json_schema,
         }
@@ -0,0 +1,236 @@
+"""
+Admission control for agent runs.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Mapping, Optional, Union, cast
+from .exc import AgentOverloadedException
+from .metrics import metrics
+
+
+class _Waiter: # pylint: disable=too-few-public-methods
+    """A run waiting in the admission queue"""
+
+    def __init__(self, name: str, loop: asyncio.AbstractEventLoop):
+        self.name = name
+        self.loop = loop
+        self.future = loop.create_future()
+        self.admitted = False
+
+
+class AdmissionTicket:
+    """A slot held by a running agent. Release it when the run is finished."""
+
+    def __init__(self, controller: "AdmissionController", name: str):
+        self.controller = controller
+        self.name = name
+        self.released = False
+
+    def release(self):
+        """Release the slot. Calling this more than once has no effect."""
+        if not self.released:
+            self.released = True
+            self.controller._release(self.name) # pylint: disable=protected-access
+
+
+class AdmissionController:
+    """
+    Limits the number of concurrent agent runs, globally and per agent.
+
+    Runs exceeding the limits wait in a FIFO queue. When the queue is full, or a run has waited
+    for longer than `max_queue_wait` seconds, `AgentOverloadedException` is raised.
+
+    The controller is thread safe, so it can be shared by event loops running in different
+    threads.
+
+    Parameters
+    ----------
+    max_concurrent_runs : Optional[int]
+        The maximum number of runs across all agents.
+    max_concurrent_runs_per_agent : Optional[Union[int, Mapping[str, int]]]
+        The maximum number of runs per agent. Pass a mapping to limit agents individually.
+    max_queued_runs : int
+        The maximum number of runs waiting for a slot.
+    max_queue_wait : Optional[float]
+        The maximum number of seconds a run waits for a slot. None waits indefinitely.
+    retry_after : float
+        The number of seconds clients are asked to wait before retrying a rejected run.
+    """
+
+    def __init__( # pylint: disable=too-many-arguments
+            self,
+            *,
+            max_concurrent_runs: Optional[int] = None,
+            max_concurrent_runs_per_agent: Optional[Union[int, Mapping[str, int]]] = None,
+            max_queued_runs: int = 100,
+            max_queue_wait: Optional[float] = 30.0,
+            retry_after: float = 1.0,
+        ):
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_concurrent_runs_per_agent = max_concurrent_runs_per_agent
+        self.max_queued_runs = max_queued_runs
+        self.max_queue_wait = max_queue_wait
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._active_total = 0
+        self._active: Dict[str, int] = {}
+        self._queued: Dict[str, int] = {}
+        self._waiters: Deque[_Waiter] = deque()
+
+    def _agent_limit(self, name: str) -> Optional[int]:
+        if isinstance(self.max_concurrent_runs_per_agent, Mapping):
+            return self.max_concurrent_runs_per_agent.get(name)
+        return self.max_concurrent_runs_per_agent
+
+    def _global_slot_free(self) -> bool:
+        return self.max_concurrent_runs is None or self._active_total < self.max_concurrent_runs
+
+    def _can_run(self, name: str) -> bool:
+        limit = self._agent_limit(name)
+        return self._global_slot_free() and (limit is None or self._active.get(name, 0) < limit)
+
+    def _start(self, name: str):
+        self._active_total += 1
+        self._active[name] = self._active.get(name, 0) + 1
+        metrics.set_gauge("copilotkit_agent_runs_active", self._active[name], agent=name)
+
+    def _set_queued(self, name: str, delta: int):
+        self._queued[name] = self._queued.get(name, 0) + delta
+        metrics.set_gauge("copilotkit_agent_runs_queued", self._queued[name], agent=name)
+
+    async def acquire(self, name: str) -> AdmissionTicket:
+        """Wait for a free slot for a run of the given agent"""
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            # when every agent shares a global limit, queued runs are admitted first
+            queue_is_fair = (
+                not any(waiter.name == name for waiter in self._waiters)
+                if self.max_concurrent_runs is None
+                else not self._waiters
+            )
+            if queue_is_fair and self._can_run(name):
+                self._start(name)
+                return AdmissionTicket(self, name)
+
+            if len(self._waiters) >= self.max_queued_runs:
+                self._reject(name, "queue_full")
+
+            waiter = _Waiter(name, loop)
+            self._waiters.append(waiter)
+            self._set_queued(name, 1)
+
+        started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter.future, self.max_queue_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            with self._lock:
+                if not waiter.admitted:
+                    self._waiters.remove(waiter)
+                    self._set_queued(name, -1)
+                    if isinstance(exc, asyncio.CancelledError):
+                        raise
+                    self._reject(name, "queue_timeout")
+            # we were admitted while timing out
+            if isinstance(exc, asyncio.CancelledError):
+                self._release(name)
+                raise
+
+        waited = time.monotonic() - started_at
+        metrics.set_gauge("copilotkit_agent_queue_wait_seconds", waited, agent=name)
+        metrics.increment("copilotkit_agent_queue_wait_seconds_total", waited, agent=name)
+        return AdmissionTicket(self, name)
+
+    def _reject(self, name: str, reason: str):
+        metrics.increment("copilotkit_agent_runs_rejected", agent=name, reason=reason)
+        raise AgentOverloadedException(
+            name,
+            "too many queued runs" if reason == "queue_full" else "timed out waiting for a slot",
+            self.retry_after,
+        )
+
+    def _release(self, name: str):
+        with self._lock:
+            self._active_total -= 1
+            self._active[name] -= 1
+            metrics.set_gauge("copilotkit_agent_runs_active", self._active[name], agent=name)
+
+            for waiter in list(self._waiters):
+                if not self._global_slot_free():
+                    break
+                if not self._can_run(waiter.name):
+                    continue
+                self._waiters.remove(waiter)
+                self._set_queued(waiter.name, -1)
+                self._start(waiter.name)
+                waiter.admitted = True
+                waiter.loop.call_soon_threadsafe(_admit, waiter.future)
+
+    def guard(
+            self,
+            events: AsyncIterator[Any],
+            *,
+            name: str,
+            ticket: Optional[AdmissionTicket] = None,
+        ) -> "AdmittedStream":
+        """
+        Run `events` in an admission slot. The slot is acquired before the first event, unless a
+        `ticket` is passed, and released when the stream finishes or is closed.
+        """
+        return AdmittedStream(self, events, name=name, ticket=ticket)
+
+
+class AdmittedStream:
+    """
+    An event stream holding an admission slot, returned by `AdmissionController.guard()`.
+
+    Unlike an async generator, the stream releases its slot when it is closed before the first
+    event was requested.
+    """
+
+    def __init__(
+            self,
+            controller: AdmissionController,
+            events: AsyncIterator[Any],
+            *,
+            name: str,
+            ticket: Optional[AdmissionTicket] = None,
+        ):
+        self.controller = controller
+        self.name = name
+        self.ticket = ticket
+        self._events = events
+        self._closed = False
+
+    def __aiter__(self) -> "AdmittedStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._closed:
+            raise StopAsyncIteration
+        if self.ticket is None:
+            self.ticket = await self.controller.acquire(self.name)
+        try:
+            return await self._events.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        """Release the slot and close the events"""
+        if self.ticket is not None:
+            self.ticket.release()
+        if self._closed:
+            return
+        self._closed = True
+        if hasattr(self._events, "aclose"):
+            await cast(Any, self._events).aclose()
+
+
+def _admit(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
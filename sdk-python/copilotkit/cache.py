@@ -0,0 +1,175 @@
+"""
+Result caching for actions.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TYPE_CHECKING
+from .codec import default
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .sdk import CopilotKitContext
+
+
+class CacheBackend(ABC):
+    """
+    Storage for cached action results. Implement this interface to share results between
+    processes, e.g. in Redis.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """Return `(True, value)` for a fresh entry, `(False, None)` otherwise"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        """Store a value, expiring after `ttl` seconds (never if None)"""
+
+
+class LRUCacheBackend(CacheBackend):
+    """An in-memory backend evicting the least recently used entries"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ActionCache:
+    """
+    Caches the results of an action by its arguments.
+
+    Concurrent calls with the same key share a single execution. Failed executions are not
+    cached. Cached results are shared between callers and must not be mutated.
+
+    ```python
+    Action(
+        name="lookup_order",
+        handler=lookup_order,
+        cache=ActionCache(
+            ttl=60,
+            key=lambda arguments, context: context["properties"].get("userId"),
+        ),
+    )
+    ```
+
+    Parameters
+    ----------
+    ttl : Optional[float]
+        Seconds after which a result expires. None keeps results until they are evicted.
+    max_entries : int
+        The maximum number of results kept by the default in-memory backend.
+    key : Optional[Callable[[dict, CopilotKitContext], Any]]
+        Returns a JSON serializable value that scopes the cache entry, in addition to the
+        arguments, e.g. the user id from `context["properties"]`.
+    backend : Optional[CacheBackend]
+        Where results are stored. Defaults to an `LRUCacheBackend`.
+    """
+
+    def __init__(
+            self,
+            *,
+            ttl: Optional[float] = None,
+            max_entries: int = 1024,
+            key: Optional[Callable[[dict, "CopilotKitContext"], Any]] = None,
+            backend: Optional[CacheBackend] = None,
+        ):
+        self.ttl = ttl
+        self.key = key
+        self.backend = backend or LRUCacheBackend(max_entries)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def make_key(
+            self,
+            name: str,
+            arguments: dict,
+            context: Optional["CopilotKitContext"] = None,
+        ) -> str:
+        """Hash the action name, the canonicalized arguments and the key function's result"""
+        scope = self.key(arguments, context) if self.key is not None else None # type: ignore
+        canonical = json.dumps(
+            [name, arguments, scope],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=default,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get_or_execute(
+            self,
+            name: str,
+            key: str,
+            execute: Callable[[], Awaitable[Any]],
+        ) -> Any:
+        """Return the cached result for `key`, or execute and cache it"""
+        while True:
+            found, value = await self.backend.get(key)
+            if found:
+                metrics.increment("copilotkit_action_cache_hits", action=name)
+                return value
+
+            with self._lock:
+                shared = self._in_flight.get(key)
+                if shared is None:
+                    future: Future = Future()
+                    self._in_flight[key] = future
+
+            if shared is None:
+                break
+
+            metrics.increment("copilotkit_action_cache_coalesced", action=name)
+            try:
+                # shielded, so that a cancelled caller does not cancel the shared execution
+                return await asyncio.shield(asyncio.wrap_future(shared))
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # the execution we were waiting for was cancelled, try again
+
+        metrics.increment("copilotkit_action_cache_misses", action=name)
+        try:
+            value = await execute()
+            await self.backend.set(key, value, self.ttl)
+        except BaseException as exc:
+            self._finish(key)
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(exc)
+            raise
+        self._finish(key)
+        future.set_result(value)
+        return value
+
+    def _finish(self, key: str):
+        # callers arriving from now on read the backend, or execute again if the call failed
+        with self._lock:
+            del self._in_flight[key]
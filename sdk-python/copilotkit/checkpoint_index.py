@@ -0,0 +1,82 @@
+"""
+Index of the checkpoints messages were added in, used to regenerate from a message.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+class CheckpointIndexEntry(NamedTuple):
+    """
+    The checkpoint to go back to in order to regenerate a message: the checkpoint before the
+    first one containing the message. When the message is already in the first checkpoint of
+    the thread, this is that checkpoint and `first` is set.
+    """
+    checkpoint_id: str
+    first: bool = False
+
+
+class CheckpointIndex(ABC):
+    """
+    Maps message ids to checkpoints, per thread. Implement this interface to persist the index
+    next to the checkpointer, e.g. in the same database.
+    """
+
+    @abstractmethod
+    async def get(self, thread_id: str, message_id: str) -> Optional[CheckpointIndexEntry]:
+        """Get the entry of a message"""
+
+    @abstractmethod
+    async def last_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        """The id of the latest checkpoint indexed for the thread"""
+
+    @abstractmethod
+    async def update(
+            self,
+            thread_id: str,
+            entries: Dict[str, CheckpointIndexEntry],
+            last_checkpoint_id: str,
+        ):
+        """Add the entries of messages that are not indexed yet, and set the latest checkpoint"""
+
+
+class InMemoryCheckpointIndex(CheckpointIndex):
+    """An in-memory index, evicting the least recently used threads beyond `max_threads`"""
+
+    def __init__(self, max_threads: int = 1024):
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, Tuple[Dict[str, CheckpointIndexEntry], Optional[str]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    async def get(self, thread_id: str, message_id: str) -> Optional[CheckpointIndexEntry]:
+        with self._lock:
+            thread = self._threads.get(thread_id)
+            if thread is None:
+                return None
+            self._threads.move_to_end(thread_id)
+            return thread[0].get(message_id)
+
+    async def last_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        with self._lock:
+            thread = self._threads.get(thread_id)
+            return None if thread is None else thread[1]
+
+    async def update(
+            self,
+            thread_id: str,
+            entries: Dict[str, CheckpointIndexEntry],
+            last_checkpoint_id: str,
+        ):
+        with self._lock:
+            thread = self._threads.get(thread_id)
+            indexed = {} if thread is None else thread[0]
+            for message_id, entry in entries.items():
+                indexed.setdefault(message_id, entry)
+            self._threads[thread_id] = (indexed, last_checkpoint_id)
+            self._threads.move_to_end(thread_id)
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
@@ -0,0 +1,157 @@
+"""
+Coalescing of streamed LLM tokens.
+
+Models stream one `on_chat_model_stream` event per token, each of which is serialized and written
+to the response on its own. Coalescing merges consecutive chunks of the same message or tool
+call into one event, sent at most `max_delay` seconds after its first chunk or once it holds
+`max_bytes` of content. Any other event, the start of a new tool call, a chunk ending the message
+(one with `response_metadata`, such as a `finish_reason`) and the end of the stream send the
+pending chunks first, so events keep their order.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
+from typing_extensions import TypedDict, NotRequired
+from langchain_core.messages import AIMessageChunk
+from langchain_core.messages.ai import add_ai_message_chunks
+
+_STREAM_EVENT = "on_chat_model_stream"
+
+
+class CoalescingConfig(TypedDict):
+    """
+    Configuration of token coalescing
+
+    Parameters
+    ----------
+    max_delay : float
+        Seconds the first chunk of a merged event may wait for more chunks. Defaults to 0.02.
+    max_bytes : int
+        Characters of content or tool call arguments after which a merged event is sent.
+        Defaults to 4096.
+    queue_size : int
+        The number of events read ahead of the response. Defaults to 64.
+    """
+    max_delay: NotRequired[float]
+    max_bytes: NotRequired[int]
+    queue_size: NotRequired[int]
+
+
+class _Done: # pylint: disable=too-few-public-methods
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+async def coalesce_events(
+        events: AsyncIterator[Any],
+        *,
+        max_delay: float = 0.02,
+        max_bytes: int = 4096,
+        queue_size: int = 64,
+    ) -> AsyncIterator[Any]:
+    """
+    Merge consecutive `on_chat_model_stream` events of LangGraph's `astream_events`.
+
+    The events are read by a separate task, so that merged events are sent after `max_delay`
+    even when the model pauses.
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=queue_size)
+
+    async def read():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except asyncio.CancelledError:
+            # closes the LangGraph stream, tearing down the running nodes
+            await events.aclose() # type: ignore
+            raise
+        except BaseException as exc: # pylint: disable=broad-except
+            await queue.put(_Done(exc))
+            return
+        await queue.put(_Done())
+
+    reader = asyncio.ensure_future(read())
+    pending: List[Any] = []
+    pending_size = 0
+    deadline = 0.0
+    try:
+        while True:
+            timeout = None if not pending else max(deadline - loop.time(), 0)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield _merge(pending)
+                pending = []
+                continue
+
+            if isinstance(item, _Done):
+                if pending:
+                    yield _merge(pending)
+                if item.error is not None:
+                    raise item.error
+                return
+
+            if pending and _can_merge(pending[-1], item):
+                pending.append(item)
+                pending_size += _size(item)
+                if pending_size >= max_bytes:
+                    yield _merge(pending)
+                    pending = []
+                continue
+
+            if pending:
+                yield _merge(pending)
+                pending = []
+            if _is_mergeable(item):
+                pending = [item]
+                pending_size = _size(item)
+                deadline = loop.time() + max_delay
+            else:
+                yield item
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+
+
+def _is_mergeable(event: Any) -> bool:
+    if not isinstance(event, dict) or event.get("event") != _STREAM_EVENT:
+        return False
+    chunk = event.get("data", {}).get("chunk")
+    return (
+        isinstance(chunk, AIMessageChunk) and
+        isinstance(chunk.content, str) and
+        not chunk.additional_kwargs and
+        # the end of a message, e.g. a finish_reason, is sent on its own after the pending chunks
+        not chunk.response_metadata and
+        len(chunk.tool_call_chunks) <= 1
+    )
+
+
+def _can_merge(previous: Any, event: Any) -> bool:
+    if not _is_mergeable(event) or event.get("run_id") != previous.get("run_id"):
+        return False
+    previous_calls = previous["data"]["chunk"].tool_call_chunks
+    calls = event["data"]["chunk"].tool_call_chunks
+    if not calls:
+        # text follows text
+        return not previous_calls
+    # the arguments of the same tool call
+    return (
+        bool(previous_calls) and
+        calls[0].get("name") is None and
+        calls[0].get("index") == previous_calls[0].get("index")
+    )
+
+
+def _size(event: Any) -> int:
+    chunk = event["data"]["chunk"]
+    return len(chunk.content) + sum(len(call.get("args") or "") for call in chunk.tool_call_chunks)
+
+
+def _merge(events: List[Any]) -> Any:
+    if len(events) == 1:
+        return events[0]
+    first = events[0]
+    chunk = add_ai_message_chunks(*(event["data"]["chunk"] for event in events))
+    return {**first, "data": {**first["data"], "chunk": chunk}}
@@ -0,0 +1,157 @@
+"""
+JSON codec for CopilotKit.
+
+Request bodies and streamed events are encoded with orjson or msgspec when one of them is
+installed, falling back to the standard library otherwise. LangChain objects are encoded the same
+way `langchain.load.dump.dumps` encodes them, pydantic models are dumped and enums are encoded by
+value.
+
+The codec can be chosen with the `COPILOTKIT_JSON_CODEC` environment variable (`orjson`,
+`msgspec` or `json`) or with `set_codec()`.
+"""
+
+import os
+import json
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, Union, Optional
+from pydantic import BaseModel
+from langchain_core.load.serializable import Serializable, to_json_not_implemented
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+def default(obj: Any) -> Any:
+    """Convert an object that is not natively JSON serializable"""
+    if isinstance(obj, Serializable):
+        return obj.to_json()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Enum):
+        return obj.value
+    return to_json_not_implemented(obj)
+
+
+class JSONCodec(ABC):
+    """Base class for JSON codecs"""
+    name: str
+
+    @abstractmethod
+    def dumpb(self, obj: Any) -> bytes:
+        """Encode an object to UTF-8 encoded JSON"""
+
+    def dumps(self, obj: Any) -> str:
+        """Encode an object to a JSON string"""
+        return self.dumpb(obj).decode("utf-8")
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode JSON, raising ValueError if the input is not valid JSON"""
+
+
+class StdlibJSONCodec(JSONCodec):
+    """JSON codec based on the standard library"""
+    name = "json"
+
+    def dumpb(self, obj: Any) -> bytes:
+        return self.dumps(obj).encode("utf-8")
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, default=default)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonJSONCodec(JSONCodec):
+    """JSON codec based on orjson"""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson # pylint: disable=import-outside-toplevel
+        self._orjson = orjson
+
+    def dumpb(self, obj: Any) -> bytes:
+        try:
+            return self._orjson.dumps(
+                obj,
+                default=default,
+                option=self._orjson.OPT_NON_STR_KEYS
+            )
+        except TypeError:
+            # e.g. integers that do not fit into 64 bits
+            return _STDLIB_CODEC.dumpb(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecJSONCodec(JSONCodec):
+    """JSON codec based on msgspec"""
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec # pylint: disable=import-outside-toplevel
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=default)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumpb(self, obj: Any) -> bytes:
+        try:
+            return self._encoder.encode(obj)
+        except (TypeError, OverflowError, self._msgspec.EncodeError):
+            return _STDLIB_CODEC.dumpb(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._msgspec.DecodeError as exc:
+            raise ValueError(str(exc)) from exc
+
+
+_STDLIB_CODEC = StdlibJSONCodec()
+
+_CODECS = {
+    "orjson": OrjsonJSONCodec,
+    "msgspec": MsgspecJSONCodec,
+    "json": StdlibJSONCodec,
+}
+
+def _load_codec(name: Optional[str] = None) -> JSONCodec:
+    if name and name not in _CODECS:
+        raise ValueError(f"Unknown JSON codec '{name}'")
+    names = [name] if name else list(_CODECS.keys())
+    for codec_name in names:
+        try:
+            return _CODECS[codec_name]()
+        except ImportError:
+            if name:
+                logger.warning("JSON codec '%s' is not installed, using json", name)
+    return _STDLIB_CODEC
+
+try:
+    _codec: JSONCodec = _load_codec(os.getenv("COPILOTKIT_JSON_CODEC"))
+except ValueError as _exc:
+    logger.warning("%s, using the default codec", _exc)
+    _codec = _load_codec()
+
+def get_codec() -> JSONCodec:
+    """Get the JSON codec in use"""
+    return _codec
+
+def set_codec(codec: Union[str, JSONCodec]):
+    """Set the JSON codec, either by name or by passing a `JSONCodec` instance"""
+    global _codec # pylint: disable=global-statement
+    _codec = _load_codec(codec) if isinstance(codec, str) else codec
+
+def dumps(obj: Any) -> str:
+    """Encode an object to a JSON string"""
+    return _codec.dumps(obj)
+
+def dumpb(obj: Any) -> bytes:
+    """Encode an object to UTF-8 encoded JSON"""
+    return _codec.dumpb(obj)
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON, raising ValueError if the input is not valid JSON"""
+    return _codec.loads(data)
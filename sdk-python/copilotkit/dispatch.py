@@ -0,0 +1,240 @@
+"""
+Acknowledged dispatch of CopilotKit's custom LangGraph events.
+
+`copilotkit_emit_state` and the other emit helpers dispatch custom events from inside a node.
+When the graph runs in a `LangGraphAgent`, the agent puts an `EventAcknowledger` into the
+config of the run. The helpers then send their events as one `copilotkit_emit_many` event
+and wait until the agent has processed the events and sent them to the client, instead of
+sleeping and hoping that the client received them by then.
+
+Without an acknowledger, e.g. on LangGraph Platform, the events are dispatched one by one as
+before.
+
+If the agent sets a `state_emit_interval`, the acknowledger also carries a `StateEmitThrottle`
+that rate limits `copilotkit_emit_state`.
+"""
+
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config, get_async_callback_manager_for_config
+from langchain_core.callbacks.manager import adispatch_custom_event
+
+from .logging import get_logger
+from .metrics import metrics
+
+logger = get_logger(__name__)
+
+ACKNOWLEDGER_KEY = "__copilotkit_acknowledger"
+
+BATCH_EVENT = "copilotkit_emit_many"
+
+STATE_EVENT = "copilotkit_manually_emit_intermediate_state"
+
+# seconds a node waits for the agent to process its events, e.g. while the client is slow
+_ACKNOWLEDGE_TIMEOUT = 5.0
+
+# seconds a node sleeps after dispatching events that are not acknowledged
+_UNACKNOWLEDGED_DELAY = 0.02
+
+CustomEvent = Tuple[str, Any]
+
+
+class _HeldState: # pylint: disable=too-few-public-methods
+    """The throttling state of a node"""
+
+    def __init__(self):
+        self.next_emit = 0.0
+        self.pending: Optional[Tuple[RunnableConfig, Any]] = None
+        self.trailing: Optional["asyncio.Future[None]"] = None
+
+
+class StateEmitThrottle:
+    """
+    Rate limits the intermediate states emitted by each node of a run to one every `interval`
+    seconds.
+
+    A state emitted too early is held back and replaced by any state the same node emits after
+    it, including states emitted by runnables nested in the node, such as tools. The latest state
+    is emitted once the interval passed, or by the agent when the node ends, whichever comes
+    first. Nodes running in parallel are throttled independently.
+
+    Parameters
+    ----------
+    interval : float
+        The minimum number of seconds between two states emitted by a node.
+    agent : str
+        The name of the agent, used as the label of the metrics.
+    """
+
+    def __init__(self, interval: float, agent: str):
+        self.interval = interval
+        self.agent = agent
+        # by the `node_key` of the node emitting the states
+        self._nodes: Dict[str, _HeldState] = {}
+
+    async def emit(self, config: RunnableConfig, state: Any):
+        """Emit a state now if the interval passed, or hold it back as the latest state"""
+        key = node_key(config)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = _HeldState()
+        now = asyncio.get_running_loop().time()
+        if node.pending is None and now >= node.next_emit:
+            node.next_emit = now + self.interval
+            await dispatch_events(config, [(STATE_EVENT, state)])
+            return
+
+        if node.pending is not None:
+            metrics.increment("copilotkit_state_emits_coalesced", agent=self.agent)
+        node.pending = (config, state)
+        if node.trailing is None:
+            node.trailing = asyncio.ensure_future(self._emit_trailing(node))
+
+    def take(self, key: str) -> Optional[Any]:
+        """Stop throttling a node that ended, returning the state it held back"""
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return None
+        if node.trailing is not None:
+            node.trailing.cancel()
+        return None if node.pending is None else node.pending[1]
+
+    def supersede(self, key: str):
+        """Drop the state held back by a node, as it emitted a newer one"""
+        node = self._nodes.get(key)
+        if node is not None:
+            node.pending = None
+            if node.trailing is not None:
+                node.trailing.cancel()
+                node.trailing = None
+
+    def clear(self):
+        """Drop the states held back by all nodes"""
+        for key in list(self._nodes):
+            self.take(key)
+
+    async def _emit_trailing(self, node: _HeldState):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(node.next_emit - loop.time(), 0))
+        node.trailing = None
+        pending = node.pending
+        if pending is None:
+            return
+        node.pending = None
+        node.next_emit = loop.time() + self.interval
+        await dispatch_events(pending[0], [(STATE_EVENT, pending[1])])
+
+
+class EventAcknowledger:
+    """
+    Tracks the dispatches of a run that wait for the agent to process their events.
+
+    Parameters
+    ----------
+    state_throttle : Optional[StateEmitThrottle]
+        Rate limits `copilotkit_emit_state` in the run, if set.
+    """
+
+    def __init__(self, state_throttle: Optional[StateEmitThrottle] = None):
+        self.state_throttle = state_throttle
+        self._pending: Dict[str, "asyncio.Future[None]"] = {}
+
+    def register(self) -> Tuple[str, "asyncio.Future[None]"]:
+        """Register a dispatch, returning its id and the future resolved when it is processed"""
+        dispatch_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending[dispatch_id] = future
+        return dispatch_id, future
+
+    def acknowledge(self, dispatch_id: str):
+        """Resolve a dispatch"""
+        future = self._pending.pop(dispatch_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def discard(self, dispatch_id: str):
+        """Stop tracking a dispatch, e.g. when waiting for it timed out"""
+        self._pending.pop(dispatch_id, None)
+
+    def release(self):
+        """Resolve all dispatches, as no more events will be processed"""
+        for dispatch_id in list(self._pending):
+            self.acknowledge(dispatch_id)
+
+    async def wrap(self, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """
+        Expand the batches in the events of `astream_events` into the custom events they hold,
+        and acknowledge a batch when the next event is requested, i.e. once the consumer has
+        processed all of its events.
+        """
+        try:
+            async for event in events:
+                if event.get("event") != "on_custom_event" or event.get("name") != BATCH_EVENT:
+                    yield event
+                    continue
+                batch = event["data"]
+                for name, data in batch["events"]:
+                    yield {**event, "name": name, "data": data}
+                self.acknowledge(batch["id"])
+        finally:
+            if self.state_throttle is not None:
+                self.state_throttle.clear()
+            self.release()
+            await events.aclose() # type: ignore
+
+
+def node_key(config: RunnableConfig) -> str:
+    """
+    Identifies the graph node `config` belongs to, also when it was passed on to runnables nested
+    in the node. This is the checkpoint namespace of the node's task, or the run id of the
+    runnable outside of a graph. See `event_node_key` for the events.
+    """
+    config = ensure_config(config)
+    namespace = config["metadata"].get("langgraph_checkpoint_ns")
+    if namespace:
+        return namespace
+    return str(get_async_callback_manager_for_config(config).parent_run_id)
+
+
+def event_node_key(event: Any) -> str:
+    """The `node_key` of the node an event of `astream_events` belongs to"""
+    return (event.get("metadata") or {}).get("langgraph_checkpoint_ns") or str(event.get("run_id"))
+
+
+def get_acknowledger(config: RunnableConfig) -> Optional[EventAcknowledger]:
+    """The acknowledger of the run, if it runs in a `LangGraphAgent`"""
+    acknowledger = (config.get("configurable") or {}).get(ACKNOWLEDGER_KEY)
+    return acknowledger if isinstance(acknowledger, EventAcknowledger) else None
+
+
+async def dispatch_events(config: RunnableConfig, events: List[CustomEvent]):
+    """
+    Dispatch custom events, waiting until they were processed if the run is acknowledged.
+    """
+    acknowledger = get_acknowledger(config)
+    if acknowledger is None:
+        for name, data in events:
+            await adispatch_custom_event(name, data, config=config)
+        # give the consumer of the events time to pick them up, as before
+        await asyncio.sleep(_UNACKNOWLEDGED_DELAY)
+        return
+
+    dispatch_id, future = acknowledger.register()
+    try:
+        await adispatch_custom_event(
+            BATCH_EVENT,
+            {"id": dispatch_id, "events": events},
+            config=config,
+        )
+        await asyncio.wait_for(future, _ACKNOWLEDGE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(
+            "Events %s were not processed within %s seconds",
+            ", ".join(name for name, _ in events),
+            _ACKNOWLEDGE_TIMEOUT,
+        )
+    finally:
+        acknowledger.discard(dispatch_id)
@@ -1,5 +1,10 @@
 """Exceptions for CopilotKit."""
 
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .validation import ArgumentError
+
 class ActionNotFoundException(Exception):
     """Exception raised when an action or agent is not found."""
 
@@ -29,3 +34,29 @@ class AgentExecutionException(Exception):
         self.name = name
         self.error = error
         super().__init__(f"Agent '{name}' failed to execute: {error}")
+
+class AgentOverloadedException(Exception):
+    """Exception raised when an agent run is rejected because of concurrency limits."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Agent '{name}' is overloaded: {reason}.")
+
+class ActionTimeoutException(Exception):
+    """Exception raised when an action does not finish within its timeout."""
+
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        super().__init__(f"Action '{name}' timed out after {timeout} seconds.")
+
+class ActionArgumentsException(Exception):
+    """Exception raised when an action is called with invalid arguments."""
+
+    def __init__(self, name: str, errors: List["ArgumentError"]):
+        self.name = name
+        self.errors = errors
+        details = "; ".join(f"{error['path']}: {error['message']}" for error in errors)
+        super().__init__(f"Invalid arguments for action '{name}': {details}")
@@ -0,0 +1,137 @@
+"""
+Executor for synchronous action handlers.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional, Tuple
+from .metrics import metrics
+
+
+class ActionExecutor:
+    """
+    A bounded thread pool running synchronous action handlers, so that they do not block the
+    event loop.
+
+    The pool reports its saturation with the gauges `copilotkit_action_executor_workers`,
+    `copilotkit_action_executor_busy` and `copilotkit_action_executor_queued`.
+
+    Parameters
+    ----------
+    max_workers : Optional[int]
+        The number of threads. Defaults to `min(32, os.cpu_count() + 4)`.
+    """
+
+    def __init__(self, *, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="copilotkit-action"
+        )
+        metrics.set_gauge("copilotkit_action_executor_workers", self.max_workers)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> "Future[Any]":
+        """Run `fn` on a worker thread, in a copy of the current context"""
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        started = False
+
+        def run():
+            nonlocal started
+            started = True
+            metrics.add_to_gauge("copilotkit_action_executor_queued", -1)
+            metrics.add_to_gauge("copilotkit_action_executor_busy", 1)
+            try:
+                return call()
+            finally:
+                metrics.add_to_gauge("copilotkit_action_executor_busy", -1)
+
+        def discard_if_cancelled(future: Future):
+            if future.cancelled() and not started:
+                metrics.add_to_gauge("copilotkit_action_executor_queued", -1)
+
+        metrics.add_to_gauge("copilotkit_action_executor_queued", 1)
+        future = self._executor.submit(run)
+        future.add_done_callback(discard_if_cancelled)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class ConcurrencyLimiter:
+    """
+    Limits how many calls run at the same time. Unlike `asyncio.Semaphore`, a limiter can be
+    shared by event loops running in different threads.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # the slot was handed to us while we were cancelled
+            self.release()
+            raise
+
+    def release(self):
+        """Free a slot, handing it to the next waiter"""
+        with self._lock:
+            if not self._waiters:
+                self._active -= 1
+                return
+            loop, future = self._waiters.popleft()
+        # the slot passes to the waiter, so _active stays the same
+        try:
+            loop.call_soon_threadsafe(_wake, future)
+        except RuntimeError:
+            # the waiter's event loop is closed
+            self.release()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_executor: Optional[ActionExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_action_executor() -> ActionExecutor:
+    """Get the executor running synchronous action handlers, creating it on first use"""
+    global _executor # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ActionExecutor()
+        return _executor
+
+def set_action_executor(executor: ActionExecutor):
+    """Replace the executor running synchronous action handlers"""
+    global _executor # pylint: disable=global-statement
+    with _executor_lock:
+        _executor = executor
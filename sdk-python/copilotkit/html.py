@@ -147,7 +147,6 @@ def generate_info_html(info: InfoDict) -> str:
     """
     Generate HTML for the info endpoint
     """
-    print(info, flush=True)
     action_html = ""
     for action in info["actions"]:
         action_html += ACTION_TEMPLATE.format(
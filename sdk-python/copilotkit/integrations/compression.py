@@ -0,0 +1,141 @@
+"""
+Streaming compression of agent responses.
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional, Union
+from typing_extensions import TypedDict, NotRequired
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressionConfig(TypedDict):
+    """
+    Configuration of streaming compression
+
+    Parameters
+    ----------
+    gzip_level : int
+        The gzip compression level, from 1 (fastest) to 9 (smallest). Defaults to 6.
+    zstd_level : int
+        The zstd compression level, from 1 (fastest) to 22 (smallest). Defaults to 3.
+        zstd is only offered when the `zstandard` package is installed.
+    """
+    gzip_level: NotRequired[int]
+    zstd_level: NotRequired[int]
+
+
+class _Compressor(ABC):
+    """Compresses a stream, flushing after every chunk"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so that the client can decode it right away"""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """End the stream"""
+
+
+class _GzipCompressor(_Compressor):
+    def __init__(self, level: int):
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush(zlib.Z_FINISH)
+
+
+class _ZstdCompressor(_Compressor):
+    def __init__(self, level: int):
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj() # type: ignore
+
+    def compress(self, data: bytes) -> bytes:
+        return (
+            self._compressobj.compress(data) +
+            self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) # type: ignore
+        )
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH) # type: ignore
+
+
+class StreamCompression:
+    """
+    Compresses streaming responses with the best encoding the client accepts.
+
+    The compressor is flushed after every chunk the agent yields, i.e. at event boundaries, so
+    events reach the client as soon as they are produced.
+    """
+
+    def __init__(self, *, gzip_level: int = 6, zstd_level: int = 3):
+        self.levels: Dict[str, int] = {"gzip": gzip_level}
+        if zstandard is not None:
+            self.levels["zstd"] = zstd_level
+
+    @classmethod
+    def from_config(cls, config: Union[bool, CompressionConfig]) -> "StreamCompression":
+        """Create from the `compression` argument of `add_fastapi_endpoint`"""
+        return cls(**(config if isinstance(config, dict) else {}))
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Pick an encoding from an `Accept-Encoding` header, preferring zstd"""
+        accepted: Dict[str, float] = {}
+        for item in accept_encoding.split(","):
+            encoding, _, params = item.strip().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[encoding.strip().lower()] = quality
+
+        best, best_quality = None, 0.0
+        for encoding in ("zstd", "gzip"):
+            if encoding not in self.levels:
+                continue
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def apply(self, request: Request, response: StreamingResponse) -> StreamingResponse:
+        """Compress the response if the client accepts a supported encoding"""
+        response.headers.append("Vary", "Accept-Encoding")
+        if "content-encoding" in response.headers:
+            return response
+        encoding = self.negotiate(request.headers.get("accept-encoding", ""))
+        if encoding is None:
+            return response
+
+        compressor: _Compressor = (
+            _ZstdCompressor(self.levels[encoding])
+            if encoding == "zstd"
+            else _GzipCompressor(self.levels[encoding])
+        )
+        response.headers["Content-Encoding"] = encoding
+        response.body_iterator = _compress(response.body_iterator, compressor)
+        return response
+
+
+async def _compress(chunks: AsyncIterator[Any], compressor: _Compressor) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose() # type: ignore
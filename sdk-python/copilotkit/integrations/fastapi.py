@@ -1,14 +1,18 @@
 """FastAPI integration"""
 
-import logging
 import asyncio
-import re
+import logging
+import math
 import uuid
-import warnings
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Any, cast, Optional
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse
+from typing import (
+    List, Any, cast, Optional, Dict, Type, TypeVar, Callable, Awaitable, NamedTuple, Union, Mapping,
+    AsyncIterator
+)
+from fastapi import FastAPI, Request, HTTPException, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from .. import codec
+from ..metrics import metrics
 from ..sdk import CopilotKitRemoteEndpoint, CopilotKitContext
 from ..types import Message, MetaEvent
 from ..exc import (
@@ -16,217 +20,611 @@ from ..exc import (
     ActionExecutionException,
     AgentNotFoundException,
     AgentExecutionException,
+    AgentOverloadedException,
+    ActionTimeoutException,
+    ActionArgumentsException,
 )
-from ..action import ActionDict
-from ..html import generate_info_html
+from ..action import ActionDict, ActionStreamEvent
+from ..admission import AdmissionTicket
+from .worker_pool import WorkerPool
+from .sse import SSE_HEADERS, SSE_MEDIA_TYPE, SSEConfig, SSEResumeError, SSERunRegistry, accepts_sse
+from .websocket import AgentWebSocketSession
+from .compression import CompressionConfig, StreamCompression
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
-def add_fastapi_endpoint(
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+class CodecJSONResponse(JSONResponse):
+    """JSON response encoded with the CopilotKit JSON codec"""
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumpb(content)
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response of an agent run holding an admission slot. The slot is released when the
+    response ends, even if its body was never iterated, e.g. because the client disconnected
+    before the stream started.
+    """
+
+    def __init__(self, *args, admission_ticket: AdmissionTicket, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admission_ticket = admission_ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.admission_ticket.release()
+
+class CopilotKitRequest(BaseModel):
+    """Fields shared by all CopilotKit request bodies"""
+    model_config = ConfigDict(extra="ignore")
+
+    properties: Any = None
+    frontendUrl: Optional[str] = None
+
+class InfoRequest(CopilotKitRequest):
+    """Request body for the info endpoint"""
+
+class ExecuteActionRequest(CopilotKitRequest):
+    """Request body for `POST action/{name}`"""
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+    stream: bool = False
+
+class ExecuteAgentRequest(CopilotKitRequest):
+    """Request body for `POST agent/{name}`"""
+    threadId: Optional[str] = None
+    nodeName: Optional[str] = None
+    state: Dict[str, Any] = Field(default_factory=dict)
+    messages: List[Dict[str, Any]] = Field(default_factory=list)
+    actions: List[Dict[str, Any]] = Field(default_factory=list)
+
+class GetAgentStateRequest(CopilotKitRequest):
+    """Request body for `POST agent/{name}/state`"""
+    threadId: str
+
+class ExecuteActionRequestV1(ExecuteActionRequest):
+    """Request body for `POST actions/execute`"""
+    name: str
+
+class ExecuteAgentRequestV1(CopilotKitRequest):
+    """Request body for `POST agents/execute`"""
+    name: str
+    threadId: Optional[str] = None
+    nodeName: Optional[str] = None
+    config: Optional[Dict[str, Any]] = None
+    state: Dict[str, Any]
+    messages: List[Dict[str, Any]]
+    actions: List[Dict[str, Any]] = Field(default_factory=list)
+    metaEvents: List[Dict[str, Any]] = Field(default_factory=list)
+
+class GetAgentStateRequestV1(GetAgentStateRequest):
+    """Request body for `POST agents/state`"""
+    name: str
+
+class ActionCall(BaseModel):
+    """A single action of a batch"""
+    model_config = ConfigDict(extra="ignore")
+
+    name: str
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+
+class ExecuteActionBatchRequest(CopilotKitRequest):
+    """Request body for `POST actions/execute-batch`"""
+    actions: List[ActionCall]
+    stream: bool = False
+
+RequestModel = TypeVar("RequestModel", bound=CopilotKitRequest)
+
+class _Route(NamedTuple):
+    """A CopilotKit route, registered relative to the endpoint prefix"""
+    path: str
+    methods: List[str]
+    kind: str
+    request_model: Type[CopilotKitRequest]
+    body_required: bool
+    endpoint: Callable[..., Awaitable[Response]]
+
+
+def add_fastapi_endpoint( # pylint: disable=too-many-arguments
         fastapi_app: FastAPI,
         sdk: CopilotKitRemoteEndpoint,
         prefix: str,
         *,
         use_thread_pool: bool = False,
         max_workers: int = 10,
+        channel_size: int = 64,
+        max_body_size: Optional[Union[int, Mapping[str, int]]] = None,
+        disconnect_poll_interval: float = 0.5,
+        sse: Union[bool, SSEConfig] = False,
+        compression: Union[bool, CompressionConfig] = False,
+        max_batch_concurrency: int = 8,
     ):
-    """Add FastAPI endpoint with configurable ThreadPoolExecutor size"""
-    if use_thread_pool:
-        warnings.warn(
-            "The 'use_thread_pool' parameter is deprecated " + 
-            "and will be removed in a future version.",
-            DeprecationWarning
-        )
-
-    def run_handler_in_thread(request: Request, sdk: CopilotKitRemoteEndpoint):
-        # Run the handler coroutine in the event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(handler(request, sdk))
-
-    async def make_handler(request: Request):
-        if use_thread_pool:
-            executor = ThreadPoolExecutor(max_workers=max_workers)
-            loop = asyncio.get_event_loop()
-            future = loop.run_in_executor(executor, run_handler_in_thread, request, sdk)
-            return await future
-        return await handler(request, sdk)
+    """
+    Add the CopilotKit endpoint to a FastAPI app.
+
+    When `use_thread_pool` is set, requests are handled on a fixed pool of `max_workers` long-lived
+    worker threads, each running its own event loop. The pool is started with the app and shut
+    down when the app shuts down. Agent streams are forwarded back to the ASGI event loop through a
+    bounded channel holding at most `channel_size` events, so an agent that blocks its event loop
+    does not stall the streams served by the other workers.
+
+    `max_body_size` limits the size of request bodies in bytes. Pass an int to apply the same
+    limit to every route, or a mapping from route kind (`info`, `execute_action`,
+    `execute_action_batch`, `execute_agent`, `get_agent_state`) to limit routes individually.
+
+    While an agent is streaming, the connection is checked every `disconnect_poll_interval`
+    seconds. When the client has gone away, the agent run is cancelled.
+
+    Set `sse` to stream agent events as Server-Sent Events to clients sending
+    `Accept: text/event-stream`, or pass an `SSEConfig` to tune the transport. Each event carries
+    an id and idle streams receive heartbeat comments. A client that loses its connection can
+    reconnect with the `Last-Event-ID` header to resume the run where it left off, instead of
+    starting it again. Other clients keep receiving newline delimited JSON.
+
+    Set `compression` to compress agent streams with zstd or gzip, depending on the client's
+    `Accept-Encoding` header, or pass a `CompressionConfig` to set the compression levels. The
+    stream is flushed after every event, so compression does not delay events.
+
+    `max_batch_concurrency` is the number of actions of a batch (`actions/execute-batch`) that
+    run at the same time.
+    """
+    worker_pool = (
+        _app_worker_pool(fastapi_app, max_workers=max_workers, channel_size=channel_size)
+        if use_thread_pool else None
+    )
 
+    sse_runs = SSERunRegistry.from_config(sse) if sse is not False else None
+    stream_compression = (
+        StreamCompression.from_config(compression) if compression is not False else None
+    )
 
     # Ensure the prefix starts with a slash and remove trailing slashes
-    normalized_prefix = '/' + prefix.strip('/')
+    normalized_prefix = ('/' + prefix.strip('/')).rstrip('/')
+
+    for route in ROUTES:
+        if isinstance(max_body_size, Mapping):
+            route_max_body_size = max_body_size.get(route.kind)
+        else:
+            route_max_body_size = max_body_size
+
+        fastapi_app.add_api_route(
+            f"{normalized_prefix}{route.path}",
+            _make_route_handler(
+                sdk=sdk,
+                route=route,
+                max_body_size=route_max_body_size,
+                worker_pool=worker_pool,
+                disconnect_poll_interval=disconnect_poll_interval,
+                sse_runs=sse_runs,
+                stream_compression=stream_compression,
+                max_batch_concurrency=max_batch_concurrency,
+            ),
+            methods=route.methods,
+        )
 
-    fastapi_app.add_api_route(
-        f"{normalized_prefix}/{{path:path}}",
-        make_handler,
-        methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+def add_fastapi_websocket_endpoint(
+        fastapi_app: FastAPI,
+        sdk: CopilotKitRemoteEndpoint,
+        prefix: str,
+        *,
+        use_thread_pool: bool = False,
+        max_workers: int = 10,
+        channel_size: int = 64,
+    ):
+    """
+    Add a WebSocket endpoint for agent sessions to a FastAPI app, at `{prefix}/agent/{name}/ws`.
+
+    The socket keeps a session per thread: clients send only new messages, state updates and
+    interrupt responses, and the agent events are streamed back over the same socket. See
+    `copilotkit.integrations.websocket` for the message format.
+
+    `use_thread_pool`, `max_workers` and `channel_size` work as for `add_fastapi_endpoint`. Both
+    endpoints of an app share the same worker pool.
+    """
+    normalized_prefix = ('/' + prefix.strip('/')).rstrip('/')
+    worker_pool = (
+        _app_worker_pool(fastapi_app, max_workers=max_workers, channel_size=channel_size)
+        if use_thread_pool else None
     )
 
-def body_get_or_raise(body: Any, key: str):
-    """Get value from body or raise an error"""
-    value = body.get(key)
-    if value is None:
-        raise HTTPException(status_code=400, detail=f"{key} is required")
-    return value
+    async def websocket_handler(websocket: WebSocket, name: str):
+        await AgentWebSocketSession(
+            sdk=sdk,
+            websocket=websocket,
+            name=name,
+            worker_pool=worker_pool,
+        ).serve()
+
+    fastapi_app.add_api_websocket_route(f"{normalized_prefix}/agent/{{name}}/ws", websocket_handler)
+
+def _app_worker_pool(fastapi_app: FastAPI, *, max_workers: int, channel_size: int) -> WorkerPool:
+    """The worker pool of the app, created by the first endpoint using it"""
+    worker_pool = getattr(fastapi_app.state, "copilotkit_worker_pool", None)
+    if worker_pool is None:
+        worker_pool = WorkerPool(max_workers=max_workers, channel_size=channel_size)
+        fastapi_app.add_event_handler("startup", worker_pool.start)
+        fastapi_app.add_event_handler("shutdown", worker_pool.shutdown)
+        fastapi_app.state.copilotkit_worker_pool = worker_pool
+    return worker_pool
+
+def _make_route_handler(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        route: _Route,
+        max_body_size: Optional[int],
+        worker_pool: Optional[WorkerPool],
+        disconnect_poll_interval: float,
+        sse_runs: Optional[SSERunRegistry] = None,
+        stream_compression: Optional[StreamCompression] = None,
+        max_batch_concurrency: int = 8,
+    ):
+    """Bind a route to the SDK"""
+    use_sse = sse_runs is not None and route.kind == "execute_agent"
+    endpoint_options = (
+        {"max_concurrency": max_batch_concurrency} if route.kind == "execute_action_batch" else {}
+    )
 
+    async def handle_request(request: Request):
+        body = await read_body(
+            request,
+            route.request_model,
+            required=route.body_required,
+            max_body_size=max_body_size,
+        )
+        request.state.copilotkit_name = request.path_params.get("name", getattr(body, "name", ""))
+        return await route.endpoint(
+            sdk=sdk,
+            request=request,
+            body=body,
+            **endpoint_options,
+            **request.path_params
+        )
 
-async def handler(request: Request, sdk: CopilotKitRemoteEndpoint):
-    """Handle FastAPI request"""
+    async def route_handler(request: Request):
+        response = await handle_streaming_request(request)
+        if stream_compression is not None and isinstance(response, StreamingResponse):
+            response = stream_compression.apply(request, response)
+        return response
+
+    async def handle_streaming_request(request: Request):
+        last_event_id = request.headers.get("last-event-id")
+        if use_sse and last_event_id:
+            try:
+                return cast(SSERunRegistry, sse_runs).resume(last_event_id, request=request)
+            except SSEResumeError as exc:
+                return CodecJSONResponse(content={"error": str(exc)}, status_code=exc.status_code)
+
+        if worker_pool is None:
+            response = await handle_request(request)
+        else:
+            # the body must be received on the ASGI event loop, after that it is
+            # cached on the request
+            await request.body()
+            response = await worker_pool.run(lambda: handle_request(request))
+
+        if isinstance(response, StreamingResponse):
+            if worker_pool is not None:
+                response.body_iterator = worker_pool.stream(response.body_iterator)
+            if use_sse and accepts_sse(request):
+                # the run outlives the connection, so that the client can resume it
+                return cast(SSERunRegistry, sse_runs).start(
+                    response.body_iterator,
+                    request=request,
+                    name=request.state.copilotkit_name,
+                )
+            response.body_iterator = cancel_on_disconnect(
+                request,
+                response.body_iterator,
+                poll_interval=disconnect_poll_interval,
+                route=route.kind,
+                name=request.state.copilotkit_name,
+            )
+        return response
+
+    return route_handler
+
+_END_OF_STREAM = object()
+_DISCONNECTED = object()
+
+async def cancel_on_disconnect(
+        request: Request,
+        events: AsyncIterator[Any],
+        *,
+        poll_interval: float = 0.5,
+        route: str = "execute_agent",
+        name: str = "",
+    ) -> AsyncIterator[Any]:
+    """
+    Stream events until the client disconnects, then cancel the task producing them.
+    Cancellation propagates into the agent (e.g. LangGraph's `astream_events` or the CrewAI
+    run loop) at its next await.
+    """
+    channel: asyncio.Queue = asyncio.Queue(maxsize=1)
+    cancelled = False
+
+    async def produce():
+        try:
+            async for event in events:
+                await channel.put(event)
+        except asyncio.CancelledError:
+            # stop the agent, even if it is suspended at a yield
+            if hasattr(events, "aclose"):
+                await cast(Any, events).aclose()
+            raise
+        except Exception:
+            await channel.put(_END_OF_STREAM)
+            raise
+        await channel.put(_END_OF_STREAM)
+
+    async def watch():
+        nonlocal cancelled
+        while not await request.is_disconnected():
+            await asyncio.sleep(poll_interval)
+        cancelled = True
+        producer.cancel()
+        await channel.put(_DISCONNECTED)
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch())
+    try:
+        while True:
+            event = await channel.get()
+            if event is _END_OF_STREAM:
+                # re-raise errors from the agent
+                await producer
+                break
+            if event is _DISCONNECTED:
+                break
+            yield event
+    finally:
+        watcher.cancel()
+        if not producer.done():
+            producer.cancel()
+            cancelled = True
+        if cancelled:
+            logger.info("Client disconnected, cancelled %s '%s'", route, name)
+            metrics.increment("copilotkit_runs_cancelled", route=route, name=name)
+
+async def read_body(
+        request: Request,
+        request_model: Type[RequestModel],
+        *,
+        required: bool = True,
+        max_body_size: Optional[int] = None,
+    ) -> RequestModel:
+    """Read and validate the request body"""
+    if max_body_size is not None:
+        content_length = request.headers.get("content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > max_body_size:
+                raise HTTPException(status_code=413, detail="Request body too large")
+
+    raw_body = await request.body()
+    if max_body_size is not None and len(raw_body) > max_body_size:
+        raise HTTPException(status_code=413, detail="Request body too large")
 
     try:
-        body = await request.json()
-    except: # pylint: disable=bare-except
+        body = codec.loads(raw_body) if raw_body else None
+    except ValueError:
         body = None
 
-    path = request.path_params.get('path')
-    method = request.method
-    context = cast(
+    if not isinstance(body, dict):
+        if required:
+            raise HTTPException(status_code=400, detail="Request body is required")
+        body = {}
+
+    try:
+        return request_model.model_validate(body)
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        if error["type"] == "missing" or error.get("input") is None:
+            raise HTTPException(status_code=400, detail=f"{field} is required") from exc
+        raise HTTPException(status_code=400, detail=f"{field}: {error['msg']}") from exc
+
+def _context(request: Request, body: CopilotKitRequest) -> CopilotKitContext:
+    return cast(
         CopilotKitContext,
         {
-            "properties": (body or {}).get("properties", {}),
-            "frontend_url": (body or {}).get("frontendUrl", None),
+            "properties": body.properties if body.properties is not None else {},
+            "frontend_url": body.frontendUrl,
             "headers": request.headers,
         }
     )
 
-    # handle / request for info endpoint
-    if method in ['GET', 'POST'] and path == '':
-        accept_header = request.headers.get('accept', '')
-        return await handle_info(
-            sdk=sdk,
-            context=context,
-            as_html='text/html' in accept_header,
-        )
-
-    # handle /agent/name request for executing an agent
-    if method == 'POST' and (match := re.match(r'agent/([a-zA-Z0-9_-]+)', path)):
-        name = match.group(1)
-        body = body or {}
-
-        thread_id = body.get("threadId", str(uuid.uuid4()))
-        state = body.get("state", {})
-        messages = body.get("messages", [])
-        actions = body.get("actions", [])
-
-        # used for LangGraph only
-        node_name = body.get("nodeName")
-
-        return handle_execute_agent(
-            sdk=sdk,
-            context=context,
-            thread_id=thread_id,
-            node_name=node_name,
-            name=name,
-            state=state,
-            messages=messages,
-            actions=actions,
-        )
-
-    # handle /agent/name/state request for getting agent state
-    if method == 'POST' and (match := re.match(r'agent/([a-zA-Z0-9_-]+)/state', path)):
-        name = match.group(1)
-        thread_id = body_get_or_raise(body, "threadId")
-
-        return await handle_get_agent_state(
-            sdk=sdk,
-            context=context,
-            thread_id=thread_id,
-            name=name,
-        )
-
-    # handle /action/name request for executing an action
-    if method == 'POST' and (match := re.match(r'action/([a-zA-Z0-9_-]+)', path)):
-        name = match.group(1)
-        arguments = body.get("arguments", {})
-
-        return await handle_execute_action(
-            sdk=sdk,
-            context=context,
-            name=name,
-            arguments=arguments,
-        )
+def _accepts_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
 
-    # v2: POST /agents/name/state
-
-    # Deal with backwards compatibility
-    result_v1 = await handler_v1(
+async def _info_endpoint(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: InfoRequest,
+    ):
+    return await handle_info(
         sdk=sdk,
-        method=method,
-        path=path,
-        body=body,
-        context=context,
+        context=_context(request, body),
+        as_html='text/html' in request.headers.get('accept', ''),
+        if_none_match=request.headers.get('if-none-match'),
     )
 
-    if result_v1 is not None:
-        return result_v1
-
-
-    raise HTTPException(status_code=404, detail="Not found")
-
-async def handler_v1(
+async def _info_endpoint_v1(
+        *,
         sdk: CopilotKitRemoteEndpoint,
-        method: str,
-        path: str,
-        body: Any,
-        context: CopilotKitContext,
+        request: Request,
+        body: InfoRequest,
     ):
-    """Handle FastAPI request for v1"""
-
-    if body is None:
-        raise HTTPException(status_code=400, detail="Request body is required")
-
-    if method == 'POST' and path == 'info':
-        return await handle_info(sdk=sdk, context=context)
+    return await handle_info(
+        sdk=sdk,
+        context=_context(request, body),
+        if_none_match=request.headers.get('if-none-match'),
+    )
 
+async def _execute_action_endpoint(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: ExecuteActionRequest,
+        name: str,
+    ):
+    return await handle_execute_action(
+        sdk=sdk,
+        context=_context(request, body),
+        name=name,
+        arguments=body.arguments,
+        stream=body.stream or _accepts_ndjson(request),
+        sse=accepts_sse(request),
+    )
 
-    if method == 'POST' and path == 'actions/execute':
-        name = body_get_or_raise(body, "name")
-        arguments = body.get("arguments", {})
+async def _execute_action_endpoint_v1(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: ExecuteActionRequestV1,
+    ):
+    return await handle_execute_action(
+        sdk=sdk,
+        context=_context(request, body),
+        name=body.name,
+        arguments=body.arguments,
+        stream=body.stream or _accepts_ndjson(request),
+        sse=accepts_sse(request),
+    )
 
-        return await handle_execute_action(
-            sdk=sdk,
-            context=context,
-            name=name,
-            arguments=arguments,
-        )
+async def _execute_action_batch_endpoint(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: ExecuteActionBatchRequest,
+        max_concurrency: int = 8,
+    ):
+    return await handle_execute_action_batch(
+        sdk=sdk,
+        context=_context(request, body),
+        actions=[call.model_dump() for call in body.actions],
+        stream=body.stream,
+        max_concurrency=max_concurrency,
+    )
 
-    if method == 'POST' and path == 'agents/execute':
-        thread_id = body.get("threadId")
-        node_name = body.get("nodeName")
-        config = body.get("config")
+async def _execute_agent_endpoint(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: ExecuteAgentRequest,
+        name: str,
+    ):
+    return await _admit_and_execute_agent(
+        sdk=sdk,
+        context=_context(request, body),
+        thread_id=body.threadId or str(uuid.uuid4()),
+        # used for LangGraph only
+        node_name=cast(str, body.nodeName),
+        name=name,
+        state=body.state,
+        messages=cast(List[Message], body.messages),
+        actions=cast(List[ActionDict], body.actions),
+    )
 
-        name = body_get_or_raise(body, "name")
-        state = body_get_or_raise(body, "state")
-        messages = body_get_or_raise(body, "messages")
-        actions = cast(List[ActionDict], body.get("actions", []))
-        meta_events = cast(List[MetaEvent], body.get("metaEvents", []))
+async def _execute_agent_endpoint_v1(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: ExecuteAgentRequestV1,
+    ):
+    return await _admit_and_execute_agent(
+        sdk=sdk,
+        context=_context(request, body),
+        thread_id=cast(str, body.threadId),
+        node_name=cast(str, body.nodeName),
+        name=body.name,
+        state=body.state,
+        config=body.config,
+        messages=cast(List[Message], body.messages),
+        actions=cast(List[ActionDict], body.actions),
+        meta_events=cast(List[MetaEvent], body.metaEvents),
+    )
 
-        return handle_execute_agent(
-            sdk=sdk,
-            context=context,
-            thread_id=thread_id,
-            node_name=node_name,
-            name=name,
-            state=state,
-            config=config,
-            messages=messages,
-            actions=actions,
-            meta_events=meta_events,
+async def _admit_and_execute_agent(*, sdk: CopilotKitRemoteEndpoint, name: str, **kwargs):
+    try:
+        admission_ticket = await sdk.admit_agent_run(name=name)
+    except AgentOverloadedException as exc:
+        logger.warning("Agent overloaded: %s", exc)
+        return CodecJSONResponse(
+            content={"error": str(exc)},
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
         )
+    return handle_execute_agent(
+        sdk=sdk,
+        name=name,
+        admission_ticket=admission_ticket,
+        **kwargs
+    )
 
+async def _get_agent_state_endpoint(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: GetAgentStateRequest,
+        name: str,
+    ):
+    return await handle_get_agent_state(
+        sdk=sdk,
+        context=_context(request, body),
+        thread_id=body.threadId,
+        name=name,
+    )
 
-    if method == 'POST' and path == 'agents/state':
-        thread_id = body_get_or_raise(body, "threadId")
-        name = body_get_or_raise(body, "name")
-
-        return await handle_get_agent_state(
-            sdk=sdk,
-            context=context,
-            thread_id=thread_id,
-            name=name,
-        )
+async def _get_agent_state_endpoint_v1(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        request: Request,
+        body: GetAgentStateRequestV1,
+    ):
+    return await handle_get_agent_state(
+        sdk=sdk,
+        context=_context(request, body),
+        thread_id=body.threadId,
+        name=body.name,
+    )
 
-    return None
+ROUTES: List[_Route] = [
+    # v2
+    _Route("/", ["GET", "POST"], "info", InfoRequest, False, _info_endpoint),
+    _Route(
+        "/agent/{name}", ["POST"], "execute_agent",
+        ExecuteAgentRequest, False, _execute_agent_endpoint
+    ),
+    _Route(
+        "/agent/{name}/state", ["POST"], "get_agent_state",
+        GetAgentStateRequest, True, _get_agent_state_endpoint
+    ),
+    _Route(
+        "/action/{name}", ["POST"], "execute_action",
+        ExecuteActionRequest, False, _execute_action_endpoint
+    ),
+    _Route(
+        "/actions/execute-batch", ["POST"], "execute_action_batch",
+        ExecuteActionBatchRequest, True, _execute_action_batch_endpoint
+    ),
+    # v1, kept for backwards compatibility
+    _Route("/info", ["POST"], "info", InfoRequest, True, _info_endpoint_v1),
+    _Route(
+        "/actions/execute", ["POST"], "execute_action",
+        ExecuteActionRequestV1, True, _execute_action_endpoint_v1
+    ),
+    _Route(
+        "/agents/execute", ["POST"], "execute_agent",
+        ExecuteAgentRequestV1, True, _execute_agent_endpoint_v1
+    ),
+    _Route(
+        "/agents/state", ["POST"], "get_agent_state",
+        GetAgentStateRequestV1, True, _get_agent_state_endpoint_v1
+    ),
+]
 
 
 async def handle_info(
@@ -234,37 +632,166 @@ async def handle_info(
         sdk: CopilotKitRemoteEndpoint,
         context: CopilotKitContext,
         as_html: bool = False,
+        if_none_match: Optional[str] = None,
     ):
-    """Handle info request with FastAPI"""
-    result = sdk.info(context=context)
+    """
+    Handle info request with FastAPI
+
+    The response carries an ETag. When it matches `if_none_match`, `304 Not Modified` is
+    returned without a body.
+    """
+    cached = sdk.cached_info(context=context)
     if as_html:
-        return HTMLResponse(content=generate_info_html(result))
-    return JSONResponse(content=result)
+        body, etag, media_type = cached.html, cached.html_etag, "text/html; charset=utf-8"
+    else:
+        body, etag, media_type = cached.body, cached.etag, "application/json"
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    return any(
+        candidate.strip().removeprefix("W/") in (etag, "*")
+        for candidate in if_none_match.split(",")
+    )
 
-async def handle_execute_action(
+async def handle_execute_action( # pylint: disable=too-many-arguments
         *,
         sdk: CopilotKitRemoteEndpoint,
         context: CopilotKitContext,
         name: str,
         arguments: dict,
+        stream: bool = False,
+        sse: bool = False,
     ):
-    """Handle execute action request with FastAPI"""
+    """
+    Handle execute action request with FastAPI
+
+    With `stream` or `sse`, the events of the action (see `Action.stream`) are sent as newline
+    delimited JSON or as Server-Sent Events. Errors before the first event get the same status
+    codes as unstreamed requests, later errors end the stream with an `error` event.
+    """
     try:
+        if stream or sse:
+            events = sdk.stream_action(
+                context=context,
+                name=name,
+                arguments=arguments
+            )
+            first_event = await anext(events)
+            return StreamingResponse(
+                _encode_action_events(first_event, events, sse),
+                media_type=SSE_MEDIA_TYPE if sse else NDJSON_MEDIA_TYPE,
+                headers=SSE_HEADERS if sse else None,
+            )
         result = await sdk.execute_action(
             context=context,
             name=name,
             arguments=arguments
         )
-        return JSONResponse(content=result)
+        return CodecJSONResponse(content=result)
     except ActionNotFoundException as exc:
         logger.error("Action not found: %s", exc)
-        return JSONResponse(content={"error": str(exc)}, status_code=404)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=404)
+    except ActionArgumentsException as exc:
+        logger.warning("Invalid action arguments: %s", exc)
+        return CodecJSONResponse(
+            content={"error": str(exc), "errors": exc.errors},
+            status_code=422
+        )
+    except ActionTimeoutException as exc:
+        logger.error("Action timed out: %s", exc)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=504)
     except ActionExecutionException as exc:
         logger.error("Action execution error: %s", exc)
-        return JSONResponse(content={"error": str(exc)}, status_code=500)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=500)
     except Exception as exc: # pylint: disable=broad-except
         logger.error("Action execution error: %s", exc)
-        return JSONResponse(content={"error": str(exc)}, status_code=500)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=500)
+
+async def _encode_action_events(
+        first_event: ActionStreamEvent,
+        events: AsyncIterator[ActionStreamEvent],
+        sse: bool,
+    ):
+    def encode(event: Any) -> str:
+        data = codec.dumps(event)
+        return f"data: {data}\n\n" if sse else data + "\n"
+
+    yield encode(first_event)
+    try:
+        async for event in events:
+            yield encode(event)
+    except Exception as exc: # pylint: disable=broad-except
+        logger.error("Action execution error: %s", exc)
+        yield encode({"type": "error", "error": str(exc)})
+    finally:
+        await events.aclose() # type: ignore
+
+async def handle_execute_action_batch(
+        *,
+        sdk: CopilotKitRemoteEndpoint,
+        context: CopilotKitContext,
+        actions: List[Dict[str, Any]],
+        stream: bool = False,
+        max_concurrency: int = 8,
+    ):
+    """
+    Handle execute action batch request with FastAPI
+
+    Runs the actions concurrently, at most `max_concurrency` at a time. Each action gets a result
+    `{"index", "name", "status", "result"}` or `{"index", "name", "status", "error"}`. Results are
+    returned together in request order, or, when `stream` is set, as newline delimited JSON in
+    the order the actions finish. Results of calls with invalid arguments (status 422) also list
+    the invalid arguments in `errors`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(index: int, call: Dict[str, Any]) -> Dict[str, Any]:
+        name = call["name"]
+        async with semaphore:
+            try:
+                result = await sdk.execute_action(
+                    context=context,
+                    name=name,
+                    arguments=call.get("arguments", {})
+                )
+                return {"index": index, "name": name, "status": 200, **result}
+            except ActionNotFoundException as exc:
+                logger.error("Action not found: %s", exc)
+                return {"index": index, "name": name, "status": 404, "error": str(exc)}
+            except ActionArgumentsException as exc:
+                logger.warning("Invalid action arguments: %s", exc)
+                return {
+                    "index": index,
+                    "name": name,
+                    "status": 422,
+                    "error": str(exc),
+                    "errors": exc.errors,
+                }
+            except ActionTimeoutException as exc:
+                logger.error("Action timed out: %s", exc)
+                return {"index": index, "name": name, "status": 504, "error": str(exc)}
+            except Exception as exc: # pylint: disable=broad-except
+                logger.error("Action execution error: %s", exc)
+                return {"index": index, "name": name, "status": 500, "error": str(exc)}
+
+    if not stream:
+        results = await asyncio.gather(*(run(index, call) for index, call in enumerate(actions)))
+        return CodecJSONResponse(content={"results": results})
+
+    async def results_as_completed():
+        tasks = [asyncio.ensure_future(run(index, call)) for index, call in enumerate(actions)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield codec.dumps(await next_result) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results_as_completed(), media_type=NDJSON_MEDIA_TYPE)
 
 def handle_execute_agent( # pylint: disable=too-many-arguments
         *,
@@ -278,6 +805,7 @@ def handle_execute_agent( # pylint: disable=too-many-arguments
         actions: List[ActionDict],
         node_name: str,
         meta_events: Optional[List[MetaEvent]] = None,
+        admission_ticket: Optional[AdmissionTicket] = None,
     ):
     """Handle continue agent execution request with FastAPI"""
     try:
@@ -291,17 +819,31 @@ def handle_execute_agent( # pylint: disable=too-many-arguments
             messages=messages,
             actions=actions,
             meta_events=meta_events,
+            admission_ticket=admission_ticket,
+        )
+        if admission_ticket is None:
+            return StreamingResponse(events, media_type=NDJSON_MEDIA_TYPE)
+        return AdmittedStreamingResponse(
+            events,
+            media_type=NDJSON_MEDIA_TYPE,
+            admission_ticket=admission_ticket,
         )
-        return StreamingResponse(events, media_type="application/json")
     except AgentNotFoundException as exc:
         logger.error("Agent not found: %s", exc, exc_info=True)
-        return JSONResponse(content={"error": str(exc)}, status_code=404)
+        _release(admission_ticket)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=404)
     except AgentExecutionException as exc:
         logger.error("Agent execution error: %s", exc, exc_info=True)
-        return JSONResponse(content={"error": str(exc)}, status_code=500)
+        _release(admission_ticket)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=500)
     except Exception as exc: # pylint: disable=broad-except
         logger.error("Agent execution error: %s", exc, exc_info=True)
-        return JSONResponse(content={"error": str(exc)}, status_code=500)
+        _release(admission_ticket)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=500)
+
+def _release(admission_ticket: Optional[AdmissionTicket]):
+    if admission_ticket is not None:
+        admission_ticket.release()
 
 async def handle_get_agent_state(
         *,
@@ -317,10 +859,10 @@ async def handle_get_agent_state(
             thread_id=thread_id,
             name=name,
         )
-        return JSONResponse(content=result)
+        return CodecJSONResponse(content=result)
     except AgentNotFoundException as exc:
         logger.error("Agent not found: %s", exc, exc_info=True)
-        return JSONResponse(content={"error": str(exc)}, status_code=404)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=404)
     except Exception as exc: # pylint: disable=broad-except
         logger.error("Agent get state error: %s", exc, exc_info=True)
-        return JSONResponse(content={"error": str(exc)}, status_code=500)
+        return CodecJSONResponse(content={"error": str(exc)}, status_code=500)
@@ -0,0 +1,247 @@
+"""
+Server-Sent Events transport for agent streams.
+"""
+
+import asyncio
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple, Union, cast
+from typing_extensions import TypedDict, NotRequired
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from ..logging import get_logger
+from ..metrics import metrics
+
+logger = get_logger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # disable response buffering in nginx
+    "X-Accel-Buffering": "no",
+}
+
+class SSEConfig(TypedDict):
+    """
+    Configuration of the Server-Sent Events transport
+
+    Parameters
+    ----------
+    heartbeat_interval : float
+        Seconds of inactivity after which a heartbeat comment is sent. Defaults to 15.
+    replay_buffer_size : int
+        The number of events kept per run for clients resuming with `Last-Event-ID`.
+        Defaults to 1000.
+    resume_timeout : float
+        Seconds a run keeps going without a connected client, and for which a finished run can
+        still be replayed. Defaults to 30.
+    max_runs : int
+        The maximum number of runs kept for resuming. When a run starts beyond the limit, the
+        oldest run is dropped, and cancelled if it is still running. Defaults to 1000.
+    """
+    heartbeat_interval: NotRequired[float]
+    replay_buffer_size: NotRequired[int]
+    resume_timeout: NotRequired[float]
+    max_runs: NotRequired[int]
+
+
+class SSEResumeError(Exception):
+    """Raised when a run cannot be resumed from the given `Last-Event-ID`"""
+
+    def __init__(self, last_event_id: str, reason: str, status_code: int):
+        self.last_event_id = last_event_id
+        self.status_code = status_code
+        super().__init__(f"Cannot resume from event '{last_event_id}': {reason}")
+
+
+class _SSERun: # pylint: disable=too-many-instance-attributes
+    """An agent run whose events are buffered for replay"""
+
+    def __init__(self, run_id: str, name: str, replay_buffer_size: int):
+        self.run_id = run_id
+        self.name = name
+        self.events: Deque[Tuple[int, str]] = deque(maxlen=replay_buffer_size)
+        self.last_seq = 0
+        self.finished = False
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_handle: Optional[asyncio.TimerHandle] = None
+
+    def append(self, data: str):
+        """Add an event and wake up the subscribers"""
+        self.last_seq += 1
+        self.events.append((self.last_seq, data))
+        self._notify()
+
+    def finish(self):
+        """Mark the run as finished"""
+        self.finished = True
+        self._notify()
+
+    def _notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def events_after(self, seq: int) -> List[Tuple[int, str]]:
+        """The buffered events following `seq`"""
+        if not self.events or seq >= self.last_seq:
+            return []
+        first_seq = self.events[0][0]
+        return list(islice(self.events, max(seq + 1 - first_seq, 0), None))
+
+    def can_resume_from(self, seq: int) -> bool:
+        """Whether all events following `seq` are still buffered"""
+        if seq > self.last_seq:
+            return False
+        return not self.events or self.events[0][0] <= seq + 1
+
+
+class SSERunRegistry:
+    """
+    Runs agents in the background and streams their events as Server-Sent Events.
+
+    Every event gets an id of the form `<run id>:<sequence number>`. When the connection drops,
+    the run keeps going for `resume_timeout` seconds, so that a client reconnecting with a
+    `Last-Event-ID` header picks up where it left off. If nobody reconnects, the run is
+    cancelled.
+    """
+
+    def __init__(
+            self,
+            *,
+            heartbeat_interval: float = 15.0,
+            replay_buffer_size: int = 1000,
+            resume_timeout: float = 30.0,
+            max_runs: int = 1000,
+        ):
+        self.heartbeat_interval = heartbeat_interval
+        self.replay_buffer_size = replay_buffer_size
+        self.resume_timeout = resume_timeout
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, _SSERun]" = OrderedDict()
+
+    @classmethod
+    def from_config(cls, config: Union[bool, SSEConfig]) -> "SSERunRegistry":
+        """Create a registry from the `sse` argument of `add_fastapi_endpoint`"""
+        return cls(**(config if isinstance(config, dict) else {}))
+
+    def start(
+            self,
+            events: AsyncIterator[Any],
+            *,
+            request: Request,
+            name: str,
+        ) -> StreamingResponse:
+        """Start a run in the background and stream its events"""
+        while len(self._runs) >= self.max_runs:
+            _, oldest = self._runs.popitem(last=False)
+            self._cancel(oldest, "Too many SSE runs, cancelling the oldest run of agent '%s'")
+        run = _SSERun(uuid.uuid4().hex, name, self.replay_buffer_size)
+        self._runs[run.run_id] = run
+        run.task = asyncio.create_task(self._produce(run, events))
+        # cancelled unless a client subscribes, even if the response is never streamed
+        self._schedule_cancel(run)
+        return self._response(run, request, 0)
+
+    def resume(self, last_event_id: str, *, request: Request) -> StreamingResponse:
+        """Resume streaming a run after the event with the given id"""
+        run_id, _, seq = last_event_id.partition(":")
+        run = self._runs.get(run_id)
+        if run is None:
+            raise SSEResumeError(last_event_id, "run not found", 404)
+        if not seq.isdigit() or not run.can_resume_from(int(seq)):
+            raise SSEResumeError(last_event_id, "events are no longer available", 410)
+        return self._response(run, request, int(seq))
+
+    def _response(self, run: _SSERun, request: Request, after_seq: int) -> StreamingResponse:
+        return StreamingResponse(
+            self._subscribe(run, request, after_seq),
+            media_type=SSE_MEDIA_TYPE,
+            headers=SSE_HEADERS,
+        )
+
+    async def _produce(self, run: _SSERun, events: AsyncIterator[Any]):
+        try:
+            async for chunk in events:
+                if isinstance(chunk, bytes):
+                    chunk = chunk.decode("utf-8")
+                # events may contain U+2028 and other characters splitlines() breaks at
+                for line in chunk.split("\n"):
+                    if line:
+                        run.append(line)
+        except asyncio.CancelledError:
+            if hasattr(events, "aclose"):
+                await cast(Any, events).aclose()
+            raise
+        except Exception as exc: # pylint: disable=broad-except
+            logger.error("Agent execution error: %s", exc, exc_info=True)
+        finally:
+            run.finish()
+            asyncio.get_running_loop().call_later(
+                self.resume_timeout,
+                self._runs.pop,
+                run.run_id,
+                None
+            )
+
+    async def _subscribe(
+            self,
+            run: _SSERun,
+            request: Request,
+            after_seq: int,
+        ) -> AsyncIterator[str]:
+        self._attach(run)
+        try:
+            while True:
+                changed = run.changed
+                for seq, data in run.events_after(after_seq):
+                    yield f"id: {run.run_id}:{seq}\ndata: {data}\n\n"
+                    after_seq = seq
+
+                if run.finished and after_seq >= run.last_seq:
+                    break
+
+                try:
+                    await asyncio.wait_for(changed.wait(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+        finally:
+            self._detach(run)
+
+    def _attach(self, run: _SSERun):
+        run.subscribers += 1
+        if run.cancel_handle is not None:
+            run.cancel_handle.cancel()
+            run.cancel_handle = None
+
+    def _detach(self, run: _SSERun):
+        run.subscribers -= 1
+        if run.subscribers == 0 and not run.finished:
+            self._schedule_cancel(run)
+
+    def _schedule_cancel(self, run: _SSERun):
+        run.cancel_handle = asyncio.get_running_loop().call_later(
+            self.resume_timeout,
+            self._cancel,
+            run
+        )
+
+    def _cancel(
+            self,
+            run: _SSERun,
+            message: str = "No client resumed agent '%s', cancelling the run",
+        ):
+        if run.task is not None and not run.task.done():
+            logger.info(message, run.name)
+            metrics.increment("copilotkit_runs_cancelled", route="execute_agent", name=run.name)
+            run.task.cancel()
+
+
+def accepts_sse(request: Request) -> bool:
+    """Whether the client asked for Server-Sent Events"""
+    return SSE_MEDIA_TYPE in request.headers.get("accept", "")
@@ -0,0 +1,263 @@
+"""
+WebSocket transport for agent sessions.
+
+A client opens one socket per agent and sends JSON messages:
+
+- `{"type": "run", "threadId": ..., "messages": [...], "state": {...}, "metaEvents": [...]}`
+  runs the agent on a thread. Only messages that are new since the last run need to be sent,
+  `state` is merged into the thread's state and `metaEvents` resume an interrupted run.
+  `actions`, `nodeName`, `config`, `properties` and `frontendUrl` are remembered per thread, so
+  they only need to be sent when they change.
+- `{"type": "cancel", "threadId": ...}` cancels the thread's run.
+
+The server answers with `{"type": "event", "threadId": ..., "event": {...}}` for every agent event,
+`{"type": "run_finished", "threadId": ...}` when a run is done,
+`{"type": "cancelled", "threadId": ...}` when a run was cancelled by the client, and
+`{"type": "error", "threadId": ..., "error": ..., "status": ...}` when a message could not be
+handled.
+"""
+
+import asyncio
+import uuid
+from typing import Any, Dict, List, Literal, Optional, cast
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from .. import codec
+from ..action import ActionDict
+from ..exc import AgentNotFoundException, AgentExecutionException, AgentOverloadedException
+from ..logging import get_logger
+from ..metrics import metrics
+from ..sdk import CopilotKitRemoteEndpoint, CopilotKitContext
+from ..types import Message, MetaEvent
+from .worker_pool import WorkerPool
+
+logger = get_logger(__name__)
+
+
+class WebSocketMessage(BaseModel):
+    """A message sent by the client"""
+    model_config = ConfigDict(extra="ignore")
+
+    type: Literal["run", "cancel"]
+    threadId: Optional[str] = None
+    nodeName: Optional[str] = None
+    config: Optional[Dict[str, Any]] = None
+    state: Dict[str, Any] = Field(default_factory=dict)
+    messages: List[Dict[str, Any]] = Field(default_factory=list)
+    actions: Optional[List[Dict[str, Any]]] = None
+    metaEvents: List[Dict[str, Any]] = Field(default_factory=list)
+    properties: Any = None
+    frontendUrl: Optional[str] = None
+
+
+class _ThreadSession: # pylint: disable=too-many-instance-attributes
+    """What the server remembers about a thread between runs"""
+
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.loaded = False
+        self.messages: List[Message] = []
+        self.state: Dict[str, Any] = {}
+        self.actions: List[ActionDict] = []
+        self.node_name: Optional[str] = None
+        self.config: Optional[Dict[str, Any]] = None
+        self.properties: Any = {}
+        self.frontend_url: Optional[str] = None
+        self.run: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+    def update(self, message: WebSocketMessage):
+        """Apply the fields sent by the client"""
+        known_ids = {existing.get("id") for existing in self.messages}
+        self.messages = [
+            *self.messages,
+            *(cast(Message, new) for new in message.messages if new.get("id") not in known_ids)
+        ]
+        self.state = {**self.state, **message.state}
+        if message.actions is not None:
+            self.actions = cast(List[ActionDict], message.actions)
+        if message.nodeName is not None:
+            self.node_name = message.nodeName
+        if message.config is not None:
+            self.config = message.config
+        if message.properties is not None:
+            self.properties = message.properties
+        if message.frontendUrl is not None:
+            self.frontend_url = message.frontendUrl
+
+
+class AgentWebSocketSession:
+    """
+    Serves an agent over a WebSocket, keeping a session per thread.
+
+    Messages and state are kept on the server between runs and refreshed from the agent after
+    every run, so clients only send what changed. Each thread runs at most one agent run at a
+    time; runs on different threads proceed concurrently. Closing the socket cancels all runs.
+
+    With a `worker_pool`, agents run on its workers instead of the ASGI event loop.
+    """
+
+    def __init__(
+            self,
+            *,
+            sdk: CopilotKitRemoteEndpoint,
+            websocket: WebSocket,
+            name: str,
+            worker_pool: Optional[WorkerPool] = None,
+        ):
+        self.sdk = sdk
+        self.websocket = websocket
+        self.name = name
+        self.worker_pool = worker_pool
+        self.threads: Dict[str, _ThreadSession] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def serve(self):
+        """Accept the socket and handle messages until the client disconnects"""
+        await self.websocket.accept()
+        try:
+            while True:
+                raw = await self.websocket.receive_text()
+                try:
+                    message = WebSocketMessage.model_validate(codec.loads(raw))
+                except (ValueError, ValidationError) as exc:
+                    await self._send_error(None, f"Invalid message: {exc}", 400)
+                    continue
+                await self._handle(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for thread in self.threads.values():
+                if thread.run is not None and not thread.run.done():
+                    thread.run.cancel()
+                    logger.info("Client disconnected, cancelled execute_agent '%s'", self.name)
+                    metrics.increment(
+                        "copilotkit_runs_cancelled",
+                        route="execute_agent",
+                        name=self.name
+                    )
+
+    async def _handle(self, message: WebSocketMessage):
+        thread_id = message.threadId or str(uuid.uuid4())
+        thread = self.threads.get(thread_id)
+
+        if message.type == "cancel":
+            if thread is not None and thread.run is not None and not thread.run.done():
+                thread.cancel_requested = True
+                thread.run.cancel()
+            return
+
+        if thread is None:
+            thread = self.threads[thread_id] = _ThreadSession(thread_id)
+        if thread.run is not None and not thread.run.done():
+            await self._send_error(thread_id, "A run is already in progress on this thread", 409)
+            return
+
+        thread.cancel_requested = False
+        thread.run = asyncio.create_task(self._run(thread, message))
+
+    def _context(self, thread: _ThreadSession) -> CopilotKitContext:
+        return cast(
+            CopilotKitContext,
+            {
+                "properties": thread.properties,
+                "frontend_url": thread.frontend_url,
+                "headers": self.websocket.headers,
+            }
+        )
+
+    async def _run(self, thread: _ThreadSession, message: WebSocketMessage):
+        thread_id = thread.thread_id
+        try:
+            if not thread.loaded:
+                # the thread may already exist, e.g. when the client reconnects. Loading it
+                # replaces messages and state, so the client's fields are applied again below.
+                thread.update(message)
+                await self._refresh(thread)
+            thread.update(message)
+
+            admission_ticket = await self.sdk.admit_agent_run(name=self.name)
+            events = self.sdk.execute_agent(
+                context=self._context(thread),
+                name=self.name,
+                thread_id=thread_id,
+                state=thread.state,
+                config=thread.config,
+                messages=thread.messages,
+                actions=thread.actions,
+                node_name=cast(str, thread.node_name),
+                meta_events=cast(List[MetaEvent], message.metaEvents),
+                admission_ticket=admission_ticket,
+            )
+            if self.worker_pool is not None:
+                events = self.worker_pool.stream(events)
+            prefix = '{"type":"event","threadId":' + codec.dumps(thread_id) + ',"event":'
+            try:
+                async for chunk in events:
+                    if isinstance(chunk, bytes):
+                        chunk = chunk.decode("utf-8")
+                    # events may contain U+2028 and other characters splitlines() breaks at
+                    for line in chunk.split("\n"):
+                        if line:
+                            await self._send(prefix + line + "}")
+            finally:
+                # stop the agent, even if it is suspended at a yield
+                if hasattr(events, "aclose"):
+                    await events.aclose()
+
+            await self._refresh(thread)
+            await self._send(codec.dumps({"type": "run_finished", "threadId": thread_id}))
+        except asyncio.CancelledError:
+            if thread.cancel_requested:
+                try:
+                    await self._send(codec.dumps({"type": "cancelled", "threadId": thread_id}))
+                except (WebSocketDisconnect, RuntimeError):
+                    # the socket is already closed
+                    pass
+            raise
+        except AgentNotFoundException as exc:
+            await self._send_error(thread_id, str(exc), 404)
+        except AgentOverloadedException as exc:
+            await self._send_error(thread_id, str(exc), 429, retryAfter=exc.retry_after)
+        except AgentExecutionException as exc:
+            logger.error("Agent execution error: %s", exc, exc_info=True)
+            await self._send_error(thread_id, str(exc), 500)
+        except WebSocketDisconnect:
+            pass
+        except Exception as exc: # pylint: disable=broad-except
+            logger.error("Agent execution error: %s", exc, exc_info=True)
+            await self._send_error(thread_id, str(exc), 500)
+
+    async def _refresh(self, thread: _ThreadSession):
+        """Load the thread's messages and state from the agent"""
+        def get_agent_state():
+            return self.sdk.get_agent_state(
+                context=self._context(thread),
+                thread_id=thread.thread_id,
+                name=self.name,
+            )
+
+        agent_state = await (
+            get_agent_state() if self.worker_pool is None
+            else self.worker_pool.run(get_agent_state)
+        )
+        thread.messages = agent_state.get("messages", [])
+        thread.state = agent_state.get("state", {})
+        thread.loaded = True
+
+    async def _send(self, text: str):
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+
+    async def _send_error(self, thread_id: Optional[str], error: str, status: int, **extra: Any):
+        try:
+            await self._send(codec.dumps({
+                "type": "error",
+                "threadId": thread_id,
+                "error": error,
+                "status": status,
+                **extra
+            }))
+        except (WebSocketDisconnect, RuntimeError):
+            # the socket is already closed
+            pass
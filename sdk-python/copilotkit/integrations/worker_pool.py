@@ -0,0 +1,180 @@
+"""
+Worker pool used to offload request handling from the ASGI event loop.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, TypeVar, cast
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_END_OF_STREAM = object()
+
+
+class _Worker:
+    """A long-lived thread running its own event loop"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        # only touched from the ASGI event loop
+        self.active_tasks = 0
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def start(self):
+        """Start the worker thread"""
+        self.thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the event loop and wait for the thread to finish"""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+
+
+class WorkerPool:
+    """
+    A fixed pool of worker threads, each running a persistent event loop.
+
+    Handlers are submitted with `run()` and execute on the least busy worker. Async iterators
+    passed to `stream()` are consumed on a worker and their items are forwarded to the calling
+    event loop through a bounded channel, so a slow client applies backpressure to the agent.
+
+    Parameters
+    ----------
+    max_workers : int
+        The number of worker threads.
+    channel_size : int
+        The maximum number of items buffered between a worker and the ASGI event loop.
+    shutdown_timeout : float
+        How long to wait for each worker thread to finish on shutdown.
+    """
+
+    def __init__(
+            self,
+            *,
+            max_workers: int = 10,
+            channel_size: int = 64,
+            shutdown_timeout: float = 10.0,
+        ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if channel_size < 1:
+            raise ValueError("channel_size must be at least 1")
+
+        self.max_workers = max_workers
+        self.channel_size = channel_size
+        self.shutdown_timeout = shutdown_timeout
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker threads have been started"""
+        return len(self._workers) > 0
+
+    def start(self):
+        """Start the worker threads. Calling this more than once has no effect."""
+        with self._lock:
+            if self._workers:
+                return
+            workers = [
+                _Worker(f"copilotkit-worker-{index}") for index in range(self.max_workers)
+            ]
+            for worker in workers:
+                worker.start()
+            self._workers = workers
+        logger.debug("Started %d CopilotKit worker threads", self.max_workers)
+
+    def shutdown(self):
+        """Cancel pending work and stop all worker threads"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop(self.shutdown_timeout)
+
+    def _acquire_worker(self) -> _Worker:
+        if not self._workers:
+            # the app may use a lifespan handler, in which case startup events are never fired
+            self.start()
+        worker = min(self._workers, key=lambda worker: worker.active_tasks)
+        worker.active_tasks += 1
+        return worker
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run the coroutine returned by `fn` on a worker and wait for its result"""
+        worker = self._acquire_worker()
+        try:
+            future = asyncio.run_coroutine_threadsafe(fn(), worker.loop)
+            return await asyncio.wrap_future(future)
+        finally:
+            worker.active_tasks -= 1
+
+    async def stream(self, iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+        """
+        Consume `iterator` on a worker and yield its items on the calling event loop.
+        Closing the returned iterator cancels the consumption on the worker.
+        """
+        loop = asyncio.get_running_loop()
+        channel: asyncio.Queue = asyncio.Queue(maxsize=self.channel_size)
+
+        async def forward():
+            try:
+                async for item in iterator:
+                    await asyncio.wrap_future(
+                        asyncio.run_coroutine_threadsafe(channel.put(item), loop)
+                    )
+            except asyncio.CancelledError:
+                # stop the producer, even if it is suspended at a yield
+                if hasattr(iterator, "aclose"):
+                    await cast(Any, iterator).aclose()
+                raise
+
+        def close_channel(_future: Future):
+            try:
+                loop.call_soon_threadsafe(
+                    lambda: loop.create_task(channel.put(_END_OF_STREAM))
+                )
+            except RuntimeError:
+                # the ASGI event loop is already closed
+                pass
+
+        worker = self._acquire_worker()
+        future = asyncio.run_coroutine_threadsafe(forward(), worker.loop)
+        future.add_done_callback(close_channel)
+        try:
+            while True:
+                item = await channel.get()
+                if item is _END_OF_STREAM:
+                    break
+                yield item
+
+            if future.cancelled():
+                raise RuntimeError("Worker pool was shut down while streaming")
+            error = future.exception()
+            if error is not None:
+                raise error
+        finally:
+            worker.active_tasks -= 1
+            if not future.done():
+                future.cancel()
+            # unblock a pending put so that it does not linger on the event loop
+            while not channel.empty():
+                channel.get_nowait()
@@ -5,9 +5,8 @@ LangChain specific utilities for CopilotKit
 import uuid
 import json
 import warnings
-import asyncio
-from typing import List, Optional, Any, Union, Dict, Callable, cast
-from typing_extensions import TypedDict
+from typing import List, Optional, Any, Union, Dict, Callable, Literal, cast
+from typing_extensions import TypedDict, NotRequired
 from langgraph.graph import MessagesState
 
 
@@ -19,10 +18,12 @@ from langchain_core.messages import (
     ToolMessage
 )
 from langchain_core.runnables import RunnableConfig
-from langchain_core.callbacks.manager import adispatch_custom_event
 from langgraph.types import interrupt
 
 from .types import Message, IntermediateStateConfig
+from .dispatch import (
+    STATE_EVENT, CustomEvent, StateEmitThrottle, dispatch_events, get_acknowledger, node_key
+)
 from .logging import get_logger
 
 logger = get_logger(__name__)
@@ -36,6 +37,14 @@ class CopilotKitState(MessagesState):
     """CopilotKit state"""
     copilotkit: CopilotKitProperties
 
+class CopilotKitEmitEvent(TypedDict):
+    """An event emitted with `copilotkit_emit_many`"""
+    type: Literal["state", "message", "tool_call", "exit"]
+    state: NotRequired[Any]
+    message: NotRequired[str]
+    name: NotRequired[str]
+    args: NotRequired[Dict[str, Any]]
+
 
 def copilotkit_messages_to_langchain(
         use_function_call: bool = False
@@ -324,12 +333,7 @@ async def copilotkit_exit(config: RunnableConfig):
         Always return True.
     """
 
-    await adispatch_custom_event(
-        "copilotkit_exit",
-        {},
-        config=config,
-    )
-    await asyncio.sleep(0.02)
+    await dispatch_events(config, [_exit_event()])
 
     return True
 
@@ -348,6 +352,10 @@ async def copilotkit_emit_state(config: RunnableConfig, state: Any):
         await copilotkit_emit_state(config, {"progress": i})
     ```
 
+    If the agent is configured with a `state_emit_interval`, states emitted within the interval
+    are held back and only the latest one is emitted, at the end of the interval or when the
+    node ends.
+
     Parameters
     ----------
     config : RunnableConfig
@@ -361,12 +369,11 @@ async def copilotkit_emit_state(config: RunnableConfig, state: Any):
         Always return True.
     """
 
-    await adispatch_custom_event(
-        "copilotkit_manually_emit_intermediate_state",
-        state,
-        config=config,
-    )
-    await asyncio.sleep(0.02)
+    throttle = _state_throttle(config)
+    if throttle is not None:
+        await throttle.emit(config, state)
+    else:
+        await dispatch_events(config, [_state_event(state)])
 
     return True
 
@@ -401,16 +408,7 @@ async def copilotkit_emit_message(config: RunnableConfig, message: str):
     Awaitable[bool]
         Always return True.
     """
-    await adispatch_custom_event(
-        "copilotkit_manually_emit_message",
-        {
-            "message": message,
-            "message_id": str(uuid.uuid4()),
-            "role": "assistant"
-        },
-        config=config,
-    )
-    await asyncio.sleep(0.02)
+    await dispatch_events(config, [_message_event(message)])
 
     return True
 
@@ -440,18 +438,96 @@ async def copilotkit_emit_tool_call(config: RunnableConfig, *, name: str, args:
         Always return True.
     """
 
-    await adispatch_custom_event(
+    await dispatch_events(config, [_tool_call_event(name, args)])
+
+    return True
+
+async def copilotkit_emit_many(config: RunnableConfig, events: List[CopilotKitEmitEvent]):
+    """
+    Emits several events to CopilotKit at once, in order. This is cheaper than emitting them
+    one by one, as the node only waits once for the events to be sent.
+
+    ### Examples
+
+    ```python
+    from copilotkit.langgraph import copilotkit_emit_many
+
+    await copilotkit_emit_many(config, [
+        {"type": "message", "message": "Step 1 of 10 complete"},
+        {"type": "state", "state": {"progress": 1}},
+        {"type": "tool_call", "name": "SearchTool", "args": {"steps": 10}},
+    ])
+    ```
+
+    Parameters
+    ----------
+    config : RunnableConfig
+        The LangGraph configuration.
+    events : List[CopilotKitEmitEvent]
+        The events to emit. `state` events take the state, `message` events the message and
+        `tool_call` events the name and args of the tool, as `copilotkit_emit_state`,
+        `copilotkit_emit_message` and `copilotkit_emit_tool_call` do. An `exit` event is the
+        same as calling `copilotkit_exit`.
+
+    Returns
+    -------
+    Awaitable[bool]
+        Always return True.
+    """
+    custom_events: List[CustomEvent] = []
+    for event in events:
+        event_type = event.get("type")
+        if event_type == "state":
+            custom_events.append(_state_event(event.get("state")))
+        elif event_type == "message":
+            custom_events.append(_message_event(event["message"]))
+        elif event_type == "tool_call":
+            custom_events.append(_tool_call_event(event["name"], event.get("args") or {}))
+        elif event_type == "exit":
+            custom_events.append(_exit_event())
+        else:
+            raise ValueError(f"Unknown event type: {event_type}")
+
+    if not custom_events:
+        return True
+
+    throttle = _state_throttle(config)
+    if throttle is not None and any(name == STATE_EVENT for name, _ in custom_events):
+        # a state held back by copilotkit_emit_state is older than the states emitted here
+        throttle.supersede(node_key(config))
+    await dispatch_events(config, custom_events)
+
+    return True
+
+def _exit_event() -> CustomEvent:
+    return ("copilotkit_exit", {})
+
+def _state_event(state: Any) -> CustomEvent:
+    return (STATE_EVENT, state)
+
+def _state_throttle(config: RunnableConfig) -> Optional[StateEmitThrottle]:
+    acknowledger = get_acknowledger(config)
+    return None if acknowledger is None else acknowledger.state_throttle
+
+def _message_event(message: str) -> CustomEvent:
+    return (
+        "copilotkit_manually_emit_message",
+        {
+            "message": message,
+            "message_id": str(uuid.uuid4()),
+            "role": "assistant"
+        },
+    )
+
+def _tool_call_event(name: str, args: Dict[str, Any]) -> CustomEvent:
+    return (
         "copilotkit_manually_emit_tool_call",
         {
             "name": name,
             "args": args,
             "id": str(uuid.uuid4())
         },
-        config=config,
     )
-    await asyncio.sleep(0.02)
-
-    return True
 
 def copilotkit_interrupt(
         message: Optional[str] = None,
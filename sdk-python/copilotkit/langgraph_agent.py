@@ -1,29 +1,57 @@
 """LangGraph agent for CopilotKit"""
 
+import asyncio
+import threading
 import uuid
-import json
-from typing import Optional, List, Callable, Any, cast, Union, TypedDict, Literal
+from typing import (
+    Optional, List, Callable, Any, cast, Union, TypedDict, Literal, NamedTuple, Dict, FrozenSet,
+    Set
+)
 
 from langgraph.graph.state import CompiledStateGraph
 from typing_extensions import NotRequired
 
 from langgraph.types import Command
-from langchain.load.dump import dumps as langchain_dumps
 from langchain.schema import BaseMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig, ensure_config
 from langchain_core.messages import HumanMessage
 
-from partialjson.json_parser import JSONParser
-
+from . import codec
 from .types import Message, MetaEvent
 from .utils import filter_by_schema_keys
 from .langgraph import copilotkit_messages_to_langchain, langchain_messages_to_copilotkit
 from .action import ActionDict
 from .agent import Agent
 from .logging import get_logger
+from .thread_state import ThreadStateCache
+from .checkpoint_index import CheckpointIndex, CheckpointIndexEntry, InMemoryCheckpointIndex
+from .metrics import metrics
+from .state_sync import DeltaStateSync, StateSyncMode
+from .partial_json import IncrementalJSONParser
+from .coalesce import CoalescingConfig, coalesce_events
+from .projection import EventProjection, EventProjectionConfig
+from .dispatch import (
+    ACKNOWLEDGER_KEY, BATCH_EVENT, EventAcknowledger, StateEmitThrottle, event_node_key
+)
 
 logger = get_logger(__name__)
 
+class SchemaKeys(NamedTuple):
+    """The state and config keys a graph accepts, None meaning any key"""
+    input: Optional[List[str]]
+    output: Optional[List[str]]
+    config: Optional[List[str]]
+
+_NO_SCHEMA_KEYS = SchemaKeys(None, None, None)
+
+# the number of distinct config shapes for which schema keys are cached
+_SCHEMA_KEYS_CACHE_SIZE = 64
+
+# custom events handled by `_stream_events`
+_INTERNAL_CUSTOM_EVENTS = (
+    "copilotkit_exit", "copilotkit_manually_emit_intermediate_state", BATCH_EVENT
+)
+
 class CopilotKitConfig(TypedDict):
     """
     CopilotKit config for LangGraphAgent
@@ -130,6 +158,31 @@ class LangGraphAgent(Agent):
         The LangGraph/LangChain config to use with the agent.
     copilotkit_config : Optional[CopilotKitConfig]
         The CopilotKit config to use with the agent.
+    state_cache_size : int
+        The maximum number of thread states cached by `get_state`.
+    state_cache_max_bytes : Optional[int]
+        The maximum total size of the cached thread states, in bytes of JSON.
+    state_cache_ttl : Optional[float]
+        Seconds after which a cached thread state is read from the checkpointer again. States
+        are also dropped when a run on their thread finishes.
+    checkpoint_index : Optional[CheckpointIndex]
+        Where to look up the checkpoint to go back to when regenerating a message. The index is
+        updated when a message is not found in it, from the checkpoints added since its last
+        update. Defaults to an `InMemoryCheckpointIndex`.
+    state_sync_snapshot_interval : int
+        For clients receiving state deltas (see `copilotkit.state_sync`), the number of deltas
+        sent before the next full snapshot.
+    stream_coalescing : Union[bool, CoalescingConfig]
+        Merge consecutive token chunks of a message or tool call into fewer events, see
+        `copilotkit.coalesce`. Pass a `CoalescingConfig` to tune it. Disabled by default.
+    event_projection : Union[bool, EventProjectionConfig]
+        Only send the LangGraph events the client consumes, without their inputs and outputs,
+        see `copilotkit.projection`. Pass an `EventProjectionConfig` to choose the events.
+        Disabled by default.
+    state_emit_interval : Optional[float]
+        The minimum number of seconds between two states emitted with `copilotkit_emit_state`
+        in a run, e.g. 0.1. States emitted in between are coalesced to the latest one, which is
+        emitted at the end of the interval or when the node ends. Not limited by default.
     """
     def __init__(
             self,
@@ -139,6 +192,14 @@ class LangGraphAgent(Agent):
             description: Optional[str] = None,
             langgraph_config:  Union[Optional[RunnableConfig], dict] = None,
             copilotkit_config: Optional[CopilotKitConfig] = None,
+            state_cache_size: int = 1024,
+            state_cache_max_bytes: Optional[int] = None,
+            state_cache_ttl: Optional[float] = 60,
+            checkpoint_index: Optional[CheckpointIndex] = None,
+            state_sync_snapshot_interval: int = 50,
+            stream_coalescing: Union[bool, CoalescingConfig] = False,
+            event_projection: Union[bool, EventProjectionConfig] = False,
+            state_emit_interval: Optional[float] = None,
 
             # deprecated - use langgraph_config instead
             config: Union[Optional[RunnableConfig], dict] = None,
@@ -165,7 +226,23 @@ class LangGraphAgent(Agent):
         )
 
         self.merge_state = None
-        self.thread_state = {}
+        self.thread_state = ThreadStateCache(
+            agent=name,
+            max_entries=state_cache_size,
+            max_bytes=state_cache_max_bytes,
+            ttl=state_cache_ttl,
+        )
+        self.checkpoint_index = checkpoint_index or InMemoryCheckpointIndex()
+        self.state_sync_snapshot_interval = state_sync_snapshot_interval
+        self.stream_coalescing: Optional[CoalescingConfig] = (
+            None if stream_coalescing is False
+            else (stream_coalescing if isinstance(stream_coalescing, dict) else {})
+        )
+        self.event_projection: Optional[EventProjection] = (
+            None if event_projection is False
+            else EventProjection(event_projection if isinstance(event_projection, dict) else None)
+        )
+        self.state_emit_interval = state_emit_interval
         if copilotkit_config is not None:
             self.merge_state = copilotkit_config.get("merge_state")
         if not self.merge_state and merge_state is not None:
@@ -183,6 +260,8 @@ class LangGraphAgent(Agent):
 
         self.graph = cast(CompiledStateGraph, graph or agent)
         self.active_interrupt_event = False
+        self._schema_keys: Dict[FrozenSet[str], SchemaKeys] = {}
+        self._schema_keys_lock = threading.Lock()
 
     def execute( # pylint: disable=too-many-arguments
             self,
@@ -204,7 +283,8 @@ class LangGraphAgent(Agent):
             actions=actions,
             thread_id=thread_id,
             node_name=node_name,
-            meta_events=meta_events
+            meta_events=meta_events,
+            state_sync=kwargs.get("state_sync", "snapshot"),
         )
 
     async def prepare_stream( # pylint: disable=too-many-arguments
@@ -218,6 +298,7 @@ class LangGraphAgent(Agent):
             actions: Optional[List[ActionDict]] = None,
             node_name: Optional[str] = None,
             meta_events: Optional[List[MetaEvent]] = None,
+            acknowledger: Optional[EventAcknowledger] = None,
     ):
         active_interrupts = agent_state.tasks[0].interrupts if agent_state.tasks and agent_state.tasks[0].interrupts else None
         state_input["messages"] = agent_state.values.get("messages", [])
@@ -257,12 +338,10 @@ class LangGraphAgent(Agent):
         stream_input = resume_input if resume_input else initial_state
 
         # Get the output and input schema keys the user has allowed for this graph
-        input_keys, output_keys, config_keys = self.get_schema_keys(config)
-        self.output_schema_keys = output_keys
-        self.input_schema_keys = input_keys
+        schema_keys = self.get_schema_keys(config) or _NO_SCHEMA_KEYS
 
-        stream_input = self.filter_state_on_schema_keys(stream_input, 'input')
-        config["configurable"] = filter_by_schema_keys(config["configurable"], config_keys)
+        stream_input = self.filter_state_on_schema_keys(stream_input, schema_keys.input)
+        config["configurable"] = filter_by_schema_keys(config["configurable"], schema_keys.config)
 
         if has_active_interrupts and (not resume_input):
             value = active_interrupts[0].value
@@ -271,12 +350,19 @@ class LangGraphAgent(Agent):
                 "state": None,
                 "config": None,
                 "interrupt_event": self.get_interrupt_event(value),
+                "schema_keys": schema_keys,
             }
 
         return {
-            "stream": self.graph.astream_events(stream_input, config, version="v2"),
+            "stream": self.graph.astream_events(
+                stream_input,
+                _acknowledged_config(config, acknowledger),
+                version="v2",
+                **self._astream_events_kwargs()
+            ),
             "state": current_graph_state,
-            "config": config
+            "config": config,
+            "schema_keys": schema_keys,
         }
 
     async def prepare_regenerate_stream( # pylint: disable=too-many-arguments
@@ -285,7 +371,8 @@ class LangGraphAgent(Agent):
             state: Any,
             config: Optional[dict] = None,
             actions: Optional[List[ActionDict]] = None,
-            message_checkpoint: HumanMessage
+            message_checkpoint: HumanMessage,
+            acknowledger: Optional[EventAcknowledger] = None,
     ):
         thread_id = config.get("configurable", {}).get("thread_id")
         time_travel_checkpoint = await self.get_checkpoint_before_message(message_checkpoint.id, thread_id)
@@ -304,7 +391,12 @@ class LangGraphAgent(Agent):
             actions=actions,
             agent_name=self.name
         )
-        stream = self.graph.astream_events(stream_input, fork, version="v2")
+        stream = self.graph.astream_events(
+            stream_input,
+            _acknowledged_config(fork, acknowledger),
+            version="v2",
+            **self._astream_events_kwargs()
+        )
         return {
             "stream": stream,
             "state": state,
@@ -322,6 +414,7 @@ class LangGraphAgent(Agent):
             actions: Optional[List[ActionDict]] = None,
             node_name: Optional[str] = None,
             meta_events: Optional[List[MetaEvent]] = None,
+            state_sync: StateSyncMode = "snapshot",
         ):
         default_config = ensure_config(cast(Any, self.langgraph_config.copy()) if self.langgraph_config else {}) # pylint: disable=line-too-long
         config = {**default_config, **(self.graph.config or {}), **(config or {})}
@@ -329,11 +422,21 @@ class LangGraphAgent(Agent):
         config["configurable"]["thread_id"] = thread_id
 
         streaming_state_extractor = _StreamingStateExtractor([])
+        delta_state_sync = (
+            DeltaStateSync(self.state_sync_snapshot_interval) if state_sync == "delta" else None
+        )
         prev_node_name = None
         emit_intermediate_state_until_end = None
         should_exit = False
         manually_emitted_state = None
         thread_id = cast(Any, config)["configurable"]["thread_id"]
+        state_throttle = (
+            StateEmitThrottle(self.state_emit_interval, self.name)
+            if self.state_emit_interval else None
+        )
+        acknowledger = EventAcknowledger(state_throttle)
+        # nodes that ended, states emitted in them after the end are outdated
+        ended_nodes: Set[str] = set()
 
         agent_state = await self.graph.aget_state(config)
         prepared_stream_response = await self.prepare_stream(
@@ -344,8 +447,11 @@ class LangGraphAgent(Agent):
             actions=actions,
             thread_id=thread_id,
             node_name=node_name,
-            meta_events=meta_events
+            meta_events=meta_events,
+            acknowledger=acknowledger,
         )
+        # regenerating reuses the schema keys of the run
+        schema_keys: SchemaKeys = prepared_stream_response["schema_keys"]
 
         langchain_messages = self.convert_messages(messages)
         non_system_messages = [msg for msg in langchain_messages if not isinstance(msg, SystemMessage)]
@@ -363,6 +469,7 @@ class LangGraphAgent(Agent):
                     config=config,
                     message_checkpoint=last_user_message,
                     actions=actions,
+                    acknowledger=acknowledger,
                 )
 
         state = prepared_stream_response["state"]
@@ -375,6 +482,11 @@ class LangGraphAgent(Agent):
             yield interrupt_event
             return
 
+        if self.stream_coalescing is not None:
+            stream = coalesce_events(stream, **self.stream_coalescing)
+        # acknowledges events dispatched by copilotkit_emit_* once they were processed below
+        stream = acknowledger.wrap(stream)
+
         try:
             async for event in stream:
                 current_node_name = event.get("name")
@@ -424,19 +536,51 @@ class LangGraphAgent(Agent):
 
                 exiting_node = node_name == current_node_name and event_type == "on_chain_end"
 
+                if exiting_node and state_throttle is not None:
+                    ended_nodes.add(event_node_key(event))
+                    # flush the state held back by the throttle before the node's final state
+                    held_state = state_throttle.take(event_node_key(event))
+                    if held_state is not None:
+                        # the held state was emitted before the node returned its output
+                        output = event.get("data", {}).get("output")
+                        if isinstance(held_state, dict):
+                            current_graph_state.update({
+                                **held_state,
+                                **(output if isinstance(output, dict) else {}),
+                            })
+                        state_sync_event = self._emit_state_sync_event(
+                            thread_id=thread_id,
+                            run_id=run_id,
+                            node_name=node_name,
+                            state=held_state,
+                            running=True,
+                            active=True,
+                            schema_keys=schema_keys,
+                            delta_state_sync=delta_state_sync,
+                        )
+                        if state_sync_event is not None:
+                            yield state_sync_event + "\n"
+
                 if exiting_node:
                     manually_emitted_state = None
 
+                if manually_emit_intermediate_state and event_node_key(event) in ended_nodes:
+                    continue
+
                 if manually_emit_intermediate_state:
                     manually_emitted_state = cast(Any, event["data"])
-                    yield self._emit_state_sync_event(
+                    state_sync_event = self._emit_state_sync_event(
                         thread_id=thread_id,
                         run_id=run_id,
                         node_name=node_name,
                         state=manually_emitted_state,
                         running=True,
-                        active=True
-                    ) + "\n"
+                        active=True,
+                        schema_keys=schema_keys,
+                        delta_state_sync=delta_state_sync,
+                    )
+                    if state_sync_event is not None:
+                        yield state_sync_event + "\n"
                     continue
 
 
@@ -473,16 +617,29 @@ class LangGraphAgent(Agent):
                     state = updated_state
                     prev_node_name = node_name
                     current_graph_state.update(updated_state)
-                    yield self._emit_state_sync_event(
+                    state_sync_event = self._emit_state_sync_event(
                         thread_id=thread_id,
                         run_id=run_id,
                         node_name=node_name,
                         state=state,
                         running=True,
-                        active=not exiting_node
-                    ) + "\n"
-
-                yield langchain_dumps(event) + "\n"
+                        active=not exiting_node,
+                        schema_keys=schema_keys,
+                        delta_state_sync=delta_state_sync,
+                    )
+                    if state_sync_event is not None:
+                        yield state_sync_event + "\n"
+
+                if self.event_projection is not None:
+                    event = self.event_projection.project(event)
+                    if event is None:
+                        continue
+                yield codec.dumps(event) + "\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            # the run was cancelled, e.g. because the client disconnected.
+            # Close the event stream so that LangGraph tears down the running nodes.
+            await stream.aclose()
+            raise
         except Exception as error:
             # Emit error information through streaming protocol before terminating
             # This preserves the semantic error details that would otherwise be lost
@@ -508,7 +665,7 @@ class LangGraphAgent(Agent):
             # Emit error events in both formats to support both LangGraph Platform and direct LangGraph modes
 
             # Format for LangGraph Platform (remote-lg-action.ts)
-            yield langchain_dumps({
+            yield codec.dumps({
                 "event": "error",
                 "data": {
                     "message": f"{error_type}: {error_message}",
@@ -520,7 +677,7 @@ class LangGraphAgent(Agent):
             }) + "\n"
 
             # Format for direct LangGraph mode (event-source.ts)
-            yield langchain_dumps({
+            yield codec.dumps({
                 "event": "on_copilotkit_error",
                 "data": {
                     "error": error_details,
@@ -532,6 +689,9 @@ class LangGraphAgent(Agent):
 
             # Re-raise the exception to maintain normal error handling flow
             raise
+        finally:
+            # the run changed the thread, drop the cached state
+            self.thread_state.invalidate(thread_id)
 
         state = await self.graph.aget_state(config)
         tasks = state.tasks
@@ -547,7 +707,7 @@ class LangGraphAgent(Agent):
             node_name = "__end__"
         is_end_node = state.next == () and not interrupts
 
-        yield self._emit_state_sync_event(
+        state_sync_event = self._emit_state_sync_event(
             thread_id=thread_id,
             run_id=run_id,
             node_name=cast(str, node_name) if not is_end_node else "__end__",
@@ -556,8 +716,19 @@ class LangGraphAgent(Agent):
             # at this point, the node is ending so we set active to false
             active=False,
             # sync messages at the end of the run
-            include_messages=True
-        ) + "\n"
+            include_messages=True,
+            schema_keys=schema_keys,
+        )
+        if state_sync_event is not None:
+            yield state_sync_event + "\n"
+
+    def _astream_events_kwargs(self) -> Dict[str, Any]:
+        if self.event_projection is None:
+            return {}
+        # the agent follows the nodes and its own custom events, whatever is sent to the client
+        return self.event_projection.astream_events_kwargs(
+            required_names=[*self.graph.nodes.keys(), *_INTERNAL_CUSTOM_EVENTS]
+        )
 
     def _emit_state_sync_event(
         self,
@@ -568,8 +739,11 @@ class LangGraphAgent(Agent):
         state: dict,
         running: bool,
         active: bool,
-        include_messages: bool = False
-    ):
+        include_messages: bool = False,
+        schema_keys: SchemaKeys = _NO_SCHEMA_KEYS,
+        delta_state_sync: Optional[DeltaStateSync] = None,
+    ) -> Optional[str]:
+        """The state sync event, None if a delta state sync has nothing to send"""
         # First handle messages as before
         if not include_messages:
             state = {
@@ -582,9 +756,28 @@ class LangGraphAgent(Agent):
             }
 
         # Filter by schema keys if available
-        state = self.filter_state_on_schema_keys(state, 'output')
-
-        return langchain_dumps({
+        state = self.filter_state_on_schema_keys(state, schema_keys.output)
+
+        patch = None
+        if delta_state_sync is not None:
+            patch = delta_state_sync.patch(state)
+            if delta_state_sync.skip(patch, (node_name, active, running)):
+                return None
+
+        if patch is not None:
+            return codec.dumps({
+                "event": "on_copilotkit_state_delta",
+                "thread_id": thread_id,
+                "run_id": run_id,
+                "agent_name": self.name,
+                "node_name": node_name,
+                "active": active,
+                "patch": patch,
+                "running": running,
+                "role": "assistant"
+            })
+
+        return codec.dumps({
             "event": "on_copilotkit_state_sync",
             "thread_id": thread_id,
             "run_id": run_id,
@@ -613,10 +806,11 @@ class LangGraphAgent(Agent):
         config["configurable"] = config.get("configurable", {})
         config["configurable"]["thread_id"] = thread_id
 
-        if self.thread_state.get(thread_id, None) is None:
-            self.thread_state[thread_id] = {**(await self.graph.aget_state(config)).values}
-
-        state = self.thread_state[thread_id]
+        state = self.thread_state.get(thread_id)
+        if state is None:
+            epoch = self.thread_state.epoch()
+            state = {**(await self.graph.aget_state(config)).values}
+            self.thread_state.put(thread_id, {**state}, epoch)
         if state == {}:
             return {
                 "threadId": thread_id or "",
@@ -642,7 +836,22 @@ class LangGraphAgent(Agent):
             'type': 'langgraph'
         }
 
-    def get_schema_keys(self, config):
+    def get_schema_keys(self, config) -> Optional[SchemaKeys]:
+        """
+        The input, output and config keys of the graph. They are computed once per set of
+        configurable keys, as generating the JSON schemas is expensive.
+        """
+        shape = frozenset((config or {}).get("configurable", {}).keys())
+        schema_keys = self._schema_keys.get(shape)
+        if schema_keys is None:
+            schema_keys = self._compute_schema_keys(config)
+            with self._schema_keys_lock:
+                if len(self._schema_keys) >= _SCHEMA_KEYS_CACHE_SIZE:
+                    self._schema_keys.pop(next(iter(self._schema_keys)))
+                self._schema_keys[shape] = schema_keys
+        return schema_keys if schema_keys is not _NO_SCHEMA_KEYS else None
+
+    def _compute_schema_keys(self, config) -> SchemaKeys:
         CONSTANT_KEYS = ['copilotkit', 'messages']
         CONSTANT_CONFIG_KEYS = ['checkpoint_id', 'checkpoint_ns', 'thread_id']
         try:
@@ -669,40 +878,65 @@ class LangGraphAgent(Agent):
                 if key not in output_schema_keys:
                     output_schema_keys.append(key)
 
-            return input_schema_keys, output_schema_keys, config_schema_keys
+            return SchemaKeys(input_schema_keys, output_schema_keys, config_schema_keys)
         except Exception:
-            return None
+            return _NO_SCHEMA_KEYS
 
-    def filter_state_on_schema_keys(self, state, schema_type: Literal["input", "output"]):
-        try:
-            schema_keys_name = f"{schema_type}_schema_keys"
-            if hasattr(self, schema_keys_name) and getattr(self, schema_keys_name):
-                return filter_by_schema_keys(state, getattr(self, schema_keys_name))
-        except Exception:
+    def filter_state_on_schema_keys(self, state, schema_keys: Optional[List[str]]):
+        if not schema_keys:
             return state
+        return filter_by_schema_keys(state, schema_keys)
 
     def get_interrupt_event(self, value):
         if not isinstance(value, str) and "__copilotkit_interrupt_value__" in value:
             ev_value = value["__copilotkit_interrupt_value__"]
-            return langchain_dumps({
+            return codec.dumps({
                 "event": "on_copilotkit_interrupt",
-                "data": { "value": ev_value if isinstance(ev_value, str) else json.dumps(ev_value), "messages": langchain_messages_to_copilotkit(value["__copilotkit_messages__"]) }
+                "data": { "value": ev_value if isinstance(ev_value, str) else codec.dumps(ev_value), "messages": langchain_messages_to_copilotkit(value["__copilotkit_messages__"]) }
             }) + "\n"
         else:
-            return langchain_dumps({
+            return codec.dumps({
                 "event": "on_interrupt",
-                "value": value if isinstance(value, str) else json.dumps(value)
+                "value": value if isinstance(value, str) else codec.dumps(value)
             }) + "\n"
 
     async def get_checkpoint_before_message(self, message_id: str, thread_id: str):
         if not thread_id:
             raise ValueError("Missing thread_id in config")
 
+        entry = await self.checkpoint_index.get(thread_id, message_id)
+        if entry is None:
+            # runs do not update the index, so that only regenerating reads the history
+            await self._index_checkpoints(thread_id)
+            entry = await self.checkpoint_index.get(thread_id, message_id)
+        if entry is not None:
+            snapshot = await self.graph.aget_state({
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": "",
+                    "checkpoint_id": entry.checkpoint_id,
+                }
+            })
+            # the checkpoint may have been deleted since it was indexed
+            if snapshot.metadata is not None:
+                metrics.increment("copilotkit_checkpoint_index_hits", agent=self.name)
+                if entry.first:
+                    snapshot.values["messages"] = []
+                return snapshot
+        metrics.increment("copilotkit_checkpoint_index_misses", agent=self.name)
+
         history_list = []
         async for snapshot in self.graph.aget_state_history({"configurable": {"thread_id": thread_id}}):
             history_list.append(snapshot)
 
         history_list.reverse()
+        if history_list:
+            await self.checkpoint_index.update(
+                thread_id,
+                _checkpoint_index_entries(history_list),
+                history_list[-1].config["configurable"]["checkpoint_id"],
+            )
+
         for idx, snapshot in enumerate(history_list):
             messages = snapshot.values.get("messages", [])
             if any(getattr(m, "id", None) == message_id for m in messages):
@@ -716,14 +950,59 @@ class LangGraphAgent(Agent):
 
         raise ValueError("Message ID not found in history")
 
+    async def _index_checkpoints(self, thread_id: str):
+        """Index the messages of the checkpoints added since the thread was last indexed"""
+        last_checkpoint_id = await self.checkpoint_index.last_checkpoint_id(thread_id)
+        snapshots = []
+        async for snapshot in self.graph.aget_state_history({"configurable": {"thread_id": thread_id}}):
+            if snapshot.config["configurable"]["checkpoint_id"] == last_checkpoint_id:
+                break
+            snapshots.append(snapshot)
+        if not snapshots:
+            return
+
+        snapshots.reverse()
+        await self.checkpoint_index.update(
+            thread_id,
+            _checkpoint_index_entries(snapshots),
+            snapshots[-1].config["configurable"]["checkpoint_id"],
+        )
+
+def _acknowledged_config(config: Any, acknowledger: Optional[EventAcknowledger]) -> Any:
+    if acknowledger is None:
+        return config
+    return {
+        **config,
+        "configurable": {**config.get("configurable", {}), ACKNOWLEDGER_KEY: acknowledger},
+    }
+
+
+def _checkpoint_index_entries(snapshots: List[Any]) -> Dict[str, CheckpointIndexEntry]:
+    """Map the ids of the messages in `snapshots`, oldest first, to their checkpoint entries"""
+    entries: Dict[str, CheckpointIndexEntry] = {}
+    for snapshot in snapshots:
+        for message in snapshot.values.get("messages", []):
+            message_id = getattr(message, "id", None)
+            if message_id is None or message_id in entries:
+                continue
+            if snapshot.parent_config:
+                entries[message_id] = CheckpointIndexEntry(
+                    snapshot.parent_config["configurable"]["checkpoint_id"]
+                )
+            else:
+                entries[message_id] = CheckpointIndexEntry(
+                    snapshot.config["configurable"]["checkpoint_id"],
+                    first=True,
+                )
+    return entries
+
 class _StreamingStateExtractor:
     def __init__(self, emit_intermediate_state: List[dict]):
         self.emit_intermediate_state = emit_intermediate_state
         self.tool_call_buffer = {}
+        self.tool_call_parsers: Dict[str, IncrementalJSONParser] = {}
         self.current_tool_call = None
 
-        self.previously_parsable_state = {}
-
     def buffer_tool_calls(self, event: Any):
         """Buffer the tool calls"""
         if len(event["data"]["chunk"].tool_call_chunks) > 0:
@@ -731,10 +1010,18 @@ class _StreamingStateExtractor:
             if chunk["name"] is not None:
                 self.current_tool_call = chunk["name"]
                 self.tool_call_buffer[self.current_tool_call] = chunk["args"]
+                self.tool_call_parsers[self.current_tool_call] = IncrementalJSONParser()
             elif self.current_tool_call is not None:
                 self.tool_call_buffer[self.current_tool_call] = (
                     self.tool_call_buffer[self.current_tool_call] + chunk["args"]
                 )
+            else:
+                return
+            try:
+                self.tool_call_parsers[self.current_tool_call].feed(chunk["args"] or "")
+            except ValueError:
+                # the parser keeps the state parsed before the error
+                pass
 
     def get_emit_state_config(self, current_tool_name):
         """Get the emit state config"""
@@ -752,29 +1039,23 @@ class _StreamingStateExtractor:
 
     def extract_state(self):
         """Extract the streaming state"""
-        parser = JSONParser()
-
         state = {}
 
-        for key, value in self.tool_call_buffer.items():
+        for key, parser in self.tool_call_parsers.items():
             argument_name, state_key = self.get_emit_state_config(key)
 
             if state_key is None:
                 continue
 
-            try:
-                parsed_value = parser.parse(value)
-            except Exception as _exc: # pylint: disable=broad-except
-                if key in self.previously_parsable_state:
-                    parsed_value = self.previously_parsable_state[key]
-                else:
-                    continue
-
-            self.previously_parsable_state[key] = parsed_value
+            parsed_value = parser.value
+            if parsed_value is None:
+                parsed_value = {}
 
             if argument_name is None:
                 state[state_key] = parsed_value
             else:
-                state[state_key] = parsed_value.get(argument_name)
+                state[state_key] = (
+                    parsed_value.get(argument_name) if isinstance(parsed_value, dict) else None
+                )
 
         return state
@@ -0,0 +1,113 @@
+"""
+In-process metrics for CopilotKit.
+"""
+
+import threading
+from typing import Dict, Tuple, Callable, List, Literal
+from typing_extensions import TypedDict
+
+MetricKind = Literal["counter", "gauge"]
+MetricListener = Callable[[MetricKind, str, float, Dict[str, str]], None]
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+class MetricSample(TypedDict):
+    """A single metric value"""
+    name: str
+    labels: Dict[str, str]
+    value: float
+
+class MetricsSnapshot(TypedDict):
+    """The current values of all metrics"""
+    counters: List[MetricSample]
+    gauges: List[MetricSample]
+
+class Metrics:
+    """
+    A minimal, thread safe registry of counters and gauges.
+
+    CopilotKit records its metrics in the module level `metrics` instance. Read the current
+    values with `snapshot()`, or forward every update to your metrics backend (e.g. Prometheus
+    or StatsD) by registering a listener:
+
+    ```python
+    from copilotkit.metrics import metrics
+
+    def forward(kind, name, value, labels):
+        ...
+
+    metrics.add_listener(forward)
+    ```
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, float] = {}
+        self._listeners: List[MetricListener] = []
+
+    def increment(self, name: str, value: float = 1, /, **labels: str):
+        """Increment a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._notify("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, /, **labels: str):
+        """Set a gauge to the given value"""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+        self._notify("gauge", name, value, labels)
+
+    def add_to_gauge(self, name: str, value: float, /, **labels: str):
+        """Add to (or subtract from) a gauge"""
+        key = _key(name, labels)
+        with self._lock:
+            current = self._gauges.get(key, 0) + value
+            self._gauges[key] = current
+        self._notify("gauge", name, current, labels)
+
+    def get(self, name: str, /, **labels: str) -> float:
+        """Get the current value of a counter or gauge"""
+        key = _key(name, labels)
+        with self._lock:
+            return self._counters.get(key, self._gauges.get(key, 0))
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Get the current values of all counters and gauges"""
+        with self._lock:
+            return {
+                "counters": [_sample(key, value) for key, value in self._counters.items()],
+                "gauges": [_sample(key, value) for key, value in self._gauges.items()],
+            }
+
+    def reset(self):
+        """Reset all counters and gauges"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+    def add_listener(self, listener: MetricListener):
+        """Call `listener(kind, name, value, labels)` on every update"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: MetricListener):
+        """Remove a listener added with `add_listener`"""
+        self._listeners.remove(listener)
+
+    def _notify(self, kind: MetricKind, name: str, value: float, labels: Dict[str, str]):
+        for listener in self._listeners:
+            listener(kind, name, value, labels)
+
+
+def _key(name: str, labels: Dict[str, str]) -> _Key:
+    return (name, tuple(sorted(labels.items())))
+
+def _sample(key: _Key, value: float) -> MetricSample:
+    return {
+        "name": key[0],
+        "labels": dict(key[1]),
+        "value": value,
+    }
+
+metrics = Metrics()
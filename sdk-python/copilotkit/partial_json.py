@@ -0,0 +1,295 @@
+"""
+Incremental parser for streamed JSON, such as the arguments of a tool call.
+
+Unlike parsing the accumulated text again on every chunk, `IncrementalJSONParser` only consumes
+the new text and keeps its position between calls to `feed()`:
+
+```python
+parser = IncrementalJSONParser()
+parser.feed('{"title": "Hel')
+parser.value         # {"title": "Hel"}
+parser.feed('lo", "tags": ["a"')
+parser.value         # {"title": "Hello", "tags": ["a"]}
+parser.changed_keys  # {"title", "tags"}
+```
+
+Incomplete values are completed the way `partialjson` completes them: partial strings and
+numbers are returned as far as they go, partial literals as the literal they start, and keys
+without a value yet map to None.
+"""
+
+import re
+from typing import Any, List, Optional, Set, cast
+
+_WHITESPACE = frozenset(" \t\n\r")
+_TOKEN_CHARS = frozenset("0123456789+-.eEtruefalsn")
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {
+    '"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"
+}
+_STRING_CONTENT = re.compile(r'[^"\\]*')
+_NUMBER = re.compile(r"-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?\Z")
+
+# what a frame expects next
+_KEY = 0
+_COLON = 1
+_VALUE = 2
+_AFTER_VALUE = 3
+
+
+class _Frame: # pylint: disable=too-few-public-methods
+    """An open object or array"""
+    __slots__ = ("container", "key", "expects")
+
+    def __init__(self, container: Any, expects: int):
+        self.container = container
+        self.key: Optional[str] = None
+        self.expects = expects
+
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON document fed in chunks. `feed()` raises `ValueError` on invalid JSON, after
+    which `value` keeps the value parsed up to the error.
+    """
+
+    def __init__(self):
+        # a list holding the document, so that the document is set like any other value
+        self._root = _Frame([], _VALUE)
+        self._stack: List[_Frame] = [self._root]
+        # the string, object key or number/literal being parsed, if any
+        self._scalar: Optional[str] = None
+        self._buffer = ""
+        self._escape: Optional[str] = None
+        self._done = False
+        self._error: Optional[ValueError] = None
+        self._value: Any = None
+        self._value_is_current = True
+        self.changed_keys: Set[str] = set()
+        """The top-level keys whose value changed during the last `feed()`"""
+
+    @property
+    def value(self) -> Any:
+        """
+        The value parsed so far, None if nothing was parsed yet. Values returned before a `feed()`
+        are not changed by it.
+        """
+        if not self._value_is_current:
+            self._value = self._snapshot()
+            self._value_is_current = True
+        return self._value
+
+    def feed(self, text: str):
+        """Parse the next chunk"""
+        if self._error is not None:
+            raise self._error
+        self.changed_keys = set()
+        if not text:
+            return
+        self._value_is_current = False
+        try:
+            self._feed(text)
+        except ValueError as exc:
+            self._error = exc
+            raise
+        finally:
+            if self._scalar == "string":
+                buffer = self._buffer
+                if buffer and 0xD800 <= ord(buffer[-1]) <= 0xDBFF:
+                    # wait for the second half of the surrogate pair
+                    buffer = buffer[:-1]
+                self._update_value(buffer)
+            elif self._scalar == "token":
+                self._update_value(_partial_token(self._buffer))
+
+    def _feed(self, text: str): # pylint: disable=too-many-branches,too-many-statements
+        index = 0
+        length = len(text)
+        while index < length and not self._done:
+            scalar = self._scalar
+
+            if scalar is not None and scalar != "token":
+                if self._escape is not None:
+                    self._consume_escape(text[index])
+                    index += 1
+                    continue
+                match = _STRING_CONTENT.match(text, index)
+                end = match.end() # type: ignore
+                if end > index:
+                    self._buffer += text[index:end]
+                    index = end
+                    if index == length:
+                        break
+                char = text[index]
+                index += 1
+                if char == "\\":
+                    self._escape = ""
+                elif scalar == "key":
+                    self._finish_key()
+                else:
+                    self._scalar = None
+                    self._update_value(self._buffer)
+                continue
+
+            char = text[index]
+            if scalar == "token":
+                if char in _TOKEN_CHARS:
+                    self._buffer += char
+                    index += 1
+                    continue
+                self._scalar = None
+                self._update_value(_complete_token(self._buffer))
+
+            index += 1
+            if char in _WHITESPACE:
+                continue
+
+            frame = self._stack[-1]
+            is_object = isinstance(frame.container, dict)
+            expects = frame.expects
+
+            if expects == _VALUE:
+                if char == "]" and not is_object and frame is not self._root:
+                    self._close(frame)
+                else:
+                    self._start_value(frame, char)
+            elif expects == _AFTER_VALUE:
+                if frame is self._root:
+                    # trailing text after the document is ignored
+                    self._done = True
+                elif char == ",":
+                    frame.expects = _KEY if is_object else _VALUE
+                elif char == ("}" if is_object else "]"):
+                    self._close(frame)
+                else:
+                    raise ValueError(f"Unexpected {char!r} after a value")
+            elif expects == _KEY:
+                if char == '"':
+                    self._scalar = "key"
+                    self._buffer = ""
+                elif char == "}":
+                    self._close(frame)
+                else:
+                    raise ValueError(f"Expected a key, got {char!r}")
+            elif char == ":":
+                frame.expects = _VALUE
+            else:
+                raise ValueError(f"Expected ':', got {char!r}")
+
+    def _start_value(self, frame: _Frame, char: str):
+        frame.expects = _AFTER_VALUE
+        if char == "{":
+            container: Any = {}
+            self._set_value(frame, container, start=True)
+            self._stack.append(_Frame(container, _KEY))
+        elif char == "[":
+            container = []
+            self._set_value(frame, container, start=True)
+            self._stack.append(_Frame(container, _VALUE))
+        elif char == '"':
+            self._scalar = "string"
+            self._buffer = ""
+            self._set_value(frame, "", start=True)
+        elif char in _TOKEN_CHARS:
+            self._scalar = "token"
+            self._buffer = char
+            self._set_value(frame, _partial_token(char), start=True)
+        else:
+            raise ValueError(f"Unexpected {char!r}")
+
+    def _update_value(self, value: Any):
+        self._set_value(self._stack[-1], value, start=False)
+
+    def _set_value(self, frame: _Frame, value: Any, start: bool):
+        container = frame.container
+        if isinstance(container, dict):
+            container[frame.key] = value
+        elif start:
+            container.append(value)
+        else:
+            container[-1] = value
+        self._touch()
+
+    def _finish_key(self):
+        self._scalar = None
+        frame = self._stack[-1]
+        frame.key = self._buffer
+        frame.expects = _COLON
+        frame.container[frame.key] = None
+        self._touch()
+
+    def _close(self, frame: _Frame):
+        self._stack.pop()
+        if len(self._stack) == 1:
+            self._done = True
+
+    def _touch(self):
+        if len(self._stack) > 1:
+            top = self._stack[1]
+            if top.key is not None and isinstance(top.container, dict):
+                self.changed_keys.add(top.key)
+
+    def _consume_escape(self, char: str):
+        escape = self._escape
+        if escape == "":
+            if char == "u":
+                self._escape = "u"
+                return
+            if char not in _ESCAPES:
+                raise ValueError(f"Invalid escape '\\{char}'")
+            self._buffer += _ESCAPES[char]
+            self._escape = None
+            return
+
+        escape = cast(str, escape) + char
+        if len(escape) < 5:
+            self._escape = escape
+            return
+        try:
+            code = int(escape[1:], 16)
+        except ValueError:
+            raise ValueError(f"Invalid escape '\\{escape}'") from None
+        self._escape = None
+        buffer = self._buffer
+        if 0xDC00 <= code <= 0xDFFF and buffer and 0xD800 <= ord(buffer[-1]) <= 0xDBFF:
+            # the second half of a surrogate pair
+            code = 0x10000 + ((ord(buffer[-1]) - 0xD800) << 10) + (code - 0xDC00)
+            buffer = buffer[:-1]
+        self._buffer = buffer + chr(code)
+
+    def _snapshot(self) -> Any:
+        # completed values never change, so only the open objects and arrays are copied
+        child = None
+        for depth in range(len(self._stack) - 1, -1, -1):
+            frame = self._stack[depth]
+            container = frame.container
+            if isinstance(container, dict):
+                copy: Any = dict(container)
+                if child is not None:
+                    copy[frame.key] = child
+            else:
+                copy = list(container)
+                if child is not None:
+                    copy[-1] = child
+            child = copy
+        return child[0] if child else None
+
+
+def _complete_token(token: str) -> Any:
+    if token in _LITERALS:
+        return _LITERALS[token]
+    if _NUMBER.match(token):
+        return float(token) if any(char in token for char in ".eE") else int(token)
+    raise ValueError(f"Invalid value {token!r}")
+
+
+def _partial_token(token: str) -> Any:
+    for literal, value in _LITERALS.items():
+        if literal.startswith(token):
+            return value
+    # the longest prefix that is a number
+    for end in range(len(token), 0, -1):
+        prefix = token[:end]
+        if _NUMBER.match(prefix):
+            return float(prefix) if any(char in prefix for char in ".eE") else int(prefix)
+    return None
@@ -0,0 +1,100 @@
+"""
+Projection of the LangGraph events sent to the client.
+
+`astream_events` produces start, stream and end events for every runnable of a graph, including
+prompts, parsers and the internal chains of LangGraph, with their full inputs and outputs. The
+CopilotKit runtime only consumes the token chunks of chat models and custom events (such as
+`copilotkit_emit_message`). A projection forwards only the subscribed event types, drops
+events of excluded names and strips the `input` and `output` payloads of the events it keeps.
+
+The state sync, interrupt and error events of `LangGraphAgent` are not affected. Projection is
+applied after the agent processed an event, so that state syncs work as before.
+"""
+
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+from typing_extensions import TypedDict, NotRequired
+
+DEFAULT_EVENTS: FrozenSet[str] = frozenset({
+    "on_chat_model_stream",
+    "on_custom_event",
+})
+"""The LangGraph events consumed by the CopilotKit runtime"""
+
+# run types that LangGraphAgent does not need to see to track nodes and state
+_PUSH_DOWN_TYPES = ("llm", "tool", "retriever", "prompt", "parser")
+
+_PAYLOAD_KEYS = ("input", "output")
+
+
+class EventProjectionConfig(TypedDict):
+    """
+    Configuration of event projection
+
+    Parameters
+    ----------
+    events : List[str]
+        The event types sent to the client, e.g. `on_chat_model_stream`. Defaults to
+        `DEFAULT_EVENTS`.
+    exclude_names : List[str]
+        Names of runnables or custom events whose events are never sent.
+    strip_payloads : bool
+        Remove `data.input` and `data.output` from the events sent. Defaults to True.
+    push_down : bool
+        Let `astream_events` skip producing the events that would be dropped, where that does
+        not hide events the agent needs itself. Defaults to True.
+    """
+    events: NotRequired[List[str]]
+    exclude_names: NotRequired[List[str]]
+    strip_payloads: NotRequired[bool]
+    push_down: NotRequired[bool]
+
+
+class EventProjection:
+    """
+    Filters the events of LangGraph's `astream_events` according to an `EventProjectionConfig`.
+    """
+
+    def __init__(self, config: Optional[EventProjectionConfig] = None):
+        config = config or {}
+        self.events = frozenset(config.get("events", DEFAULT_EVENTS))
+        self.exclude_names = frozenset(config.get("exclude_names", ()))
+        self.strip_payloads = config.get("strip_payloads", True)
+        self.push_down = config.get("push_down", True)
+
+    def project(self, event: Any) -> Optional[Any]:
+        """The event to send, None if it is dropped"""
+        event_type = event.get("event")
+        if event_type not in self.events or event.get("name") in self.exclude_names:
+            return None
+        data = event.get("data")
+        if (
+            self.strip_payloads and
+            # the data of a custom event is the payload dispatched by the user
+            event_type != "on_custom_event" and
+            isinstance(data, dict) and
+            any(key in data for key in _PAYLOAD_KEYS)
+        ):
+            data = {key: value for key, value in data.items() if key not in _PAYLOAD_KEYS}
+            return {**event, "data": data}
+        return event
+
+    def astream_events_kwargs(self, required_names: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Filters for `astream_events`. Chain and chat model events are always produced, since
+        the agent tracks the current node and the state with them, as are the events named in
+        `required_names`. Filtering by type is done by exclusion only, as custom events are
+        filtered by their name in place of a run type.
+        """
+        if not self.push_down:
+            return {}
+        kwargs: Dict[str, Any] = {}
+        exclude_types = [
+            run_type for run_type in _PUSH_DOWN_TYPES
+            if not any(event.startswith(f"on_{run_type}_") for event in self.events)
+        ]
+        if exclude_types:
+            kwargs["exclude_types"] = exclude_types
+        exclude_names = self.exclude_names.difference(required_names)
+        if exclude_names:
+            kwargs["exclude_names"] = sorted(exclude_names)
+        return kwargs
@@ -0,0 +1,90 @@
+"""
+Registries of actions and agents.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+from .logging import get_logger
+from .metrics import metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class Registry(Generic[T]):
+    """
+    A list of actions or agents, indexed by name.
+
+    With `strict`, duplicate names raise a `ValueError`. Otherwise the first item with a given
+    name wins and a warning is logged.
+    """
+
+    def __init__(self, items: List[T], *, kind: str, strict: bool = False):
+        self.items = items
+        self.size = len(items)
+        self.by_name: Dict[str, T] = {}
+        for item in items:
+            name = getattr(item, "name")
+            if name in self.by_name:
+                if strict:
+                    raise ValueError(f"Duplicate {kind} name '{name}'")
+                logger.warning("Duplicate %s name '%s', using the first one", kind, name)
+                continue
+            self.by_name[name] = item
+
+    def get(self, name: str) -> Optional[T]:
+        """Get an item by name"""
+        return self.by_name.get(name)
+
+    def indexes(self, items: List[T]) -> bool:
+        """Whether this registry is up to date for `items`"""
+        return self.items is items and self.size == len(items)
+
+
+class FactoryCache(Generic[T]):
+    """
+    Memoizes the registries built by an action or agent factory, by a key derived from the
+    context. Entries expire after `ttl` seconds and the least recently used entries are evicted
+    beyond `max_entries`.
+    """
+
+    def __init__(
+            self,
+            *,
+            kind: str,
+            ttl: Optional[float] = None,
+            max_entries: int = 128,
+        ):
+        self.kind = kind
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Registry[T], Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Registry[T]]) -> Registry[T]:
+        """Return the registry cached for `key`, or build and cache it"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                metrics.increment("copilotkit_factory_cache_hits", kind=self.kind)
+                return entry[0]
+
+        metrics.increment("copilotkit_factory_cache_misses", kind=self.kind)
+        registry = build()
+        expires_at = None if self.ttl is None else now + self.ttl
+        with self._lock:
+            self._entries[key] = (registry, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return registry
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
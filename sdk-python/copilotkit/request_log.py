@@ -0,0 +1,213 @@
+"""
+Request logging for CopilotKit.
+
+Request details are only formatted when INFO is enabled for the `copilotkit.sdk` logger and the
+request is sampled. Fields longer than `max_field_size` characters are truncated.
+
+With the `json` format, every record is a single JSON object:
+
+```json
+{"event": "request_started", "kind": "execute_agent", "request_id": "...", "name": "...",
+ "thread_id": "...", "fields": {...}}
+{"event": "request_finished", "kind": "execute_agent", "request_id": "...", "name": "...",
+ "thread_id": "...", "duration_ms": 1234.5, "status": "ok"}
+```
+"""
+
+import logging
+import random
+import time
+import uuid
+from pprint import pformat
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Literal, Mapping, Optional, Tuple
+from typing_extensions import TypedDict, NotRequired
+from . import codec
+from .logging import bold
+
+Fields = Callable[[], List[Tuple[str, Any]]]
+
+
+class RequestLogConfig(TypedDict):
+    """
+    Configuration of request logging
+
+    Parameters
+    ----------
+    format : Literal["text", "json"]
+        Human readable text (the default) or one JSON object per record.
+    sample_rate : float
+        The fraction of requests that are logged, from 0 to 1. Defaults to 1.
+    max_field_size : int
+        Fields longer than this number of characters are truncated. Defaults to 2000.
+    """
+    format: NotRequired[Literal["text", "json"]]
+    sample_rate: NotRequired[float]
+    max_field_size: NotRequired[int]
+
+
+class RequestLog:
+    """A sampled request. Call `finish()` when the request is done to log its duration."""
+
+    def __init__( # pylint: disable=too-many-arguments
+            self,
+            request_logger: "RequestLogger",
+            *,
+            kind: str,
+            request_id: str,
+            name: Optional[str],
+            thread_id: Optional[str],
+        ):
+        self.request_logger = request_logger
+        self.kind = kind
+        self.request_id = request_id
+        self.name = name
+        self.thread_id = thread_id
+        self.started_at = time.perf_counter()
+        self.finished = False
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Log the end of the request. Calling this more than once has no effect."""
+        if self.finished:
+            return
+        self.finished = True
+        self.request_logger.log_finished(self, error)
+
+    async def wrap(self, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable` and finish the request"""
+        try:
+            result = await awaitable
+        except BaseException as exc:
+            self.finish(exc)
+            raise
+        self.finish()
+        return result
+
+    async def wrap_stream(self, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Stream `events` and finish the request when the stream ends"""
+        error: Optional[BaseException] = None
+        try:
+            async for event in events:
+                yield event
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self.finish(error)
+            if hasattr(events, "aclose"):
+                await events.aclose() # type: ignore
+
+
+class RequestLogger:
+    """
+    Logs requests to the given logger.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+        The logger to write to, at INFO level.
+    format : Literal["text", "json"]
+        Human readable text or one JSON object per record.
+    sample_rate : float
+        The fraction of requests that are logged.
+    max_field_size : int
+        Fields longer than this number of characters are truncated.
+    """
+
+    def __init__(
+            self,
+            logger: logging.Logger,
+            *,
+            format: Literal["text", "json"] = "text", # pylint: disable=redefined-builtin
+            sample_rate: float = 1.0,
+            max_field_size: int = 2000,
+        ):
+        self.logger = logger
+        self.format = format
+        self.sample_rate = sample_rate
+        self.max_field_size = max_field_size
+
+    def start( # pylint: disable=too-many-arguments
+            self,
+            kind: str,
+            *,
+            title: str,
+            headers: Optional[Mapping[str, str]] = None,
+            name: Optional[str] = None,
+            thread_id: Optional[str] = None,
+            fields: Fields,
+        ) -> Optional[RequestLog]:
+        """
+        Log the start of a request. `fields` is only called when the request is logged.
+        Returns None when the request is not logged.
+        """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return None
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+
+        request_id = (headers or {}).get("x-request-id") or uuid.uuid4().hex
+        request_log = RequestLog(
+            self,
+            kind=kind,
+            request_id=request_id,
+            name=name,
+            thread_id=thread_id,
+        )
+
+        if self.format == "json":
+            self.logger.info(codec.dumps({
+                "event": "request_started",
+                **self._identity(request_log),
+                "fields": {key: self._json_field(value) for key, value in fields()},
+            }))
+        else:
+            lines = [bold(title), "--------------------------"]
+            for key, value in fields():
+                lines.append(bold(key + ":"))
+                lines.append(self._truncate(pformat(value)))
+            lines.append("--------------------------")
+            self.logger.info("\n".join(lines))
+        return request_log
+
+    def log_finished(self, request_log: RequestLog, error: Optional[BaseException]):
+        """Log the end of a request"""
+        duration_ms = round((time.perf_counter() - request_log.started_at) * 1000, 1)
+        status = "ok" if error is None else type(error).__name__
+        if self.format == "json":
+            self.logger.info(codec.dumps({
+                "event": "request_finished",
+                **self._identity(request_log),
+                "duration_ms": duration_ms,
+                "status": status,
+            }))
+        else:
+            self.logger.info(
+                "Finished %s request %s in %.1f ms (%s)",
+                request_log.kind,
+                request_log.request_id,
+                duration_ms,
+                status,
+            )
+
+    def _identity(self, request_log: RequestLog) -> dict:
+        identity = {"kind": request_log.kind, "request_id": request_log.request_id}
+        if request_log.name is not None:
+            identity["name"] = request_log.name
+        if request_log.thread_id is not None:
+            identity["thread_id"] = request_log.thread_id
+        return identity
+
+    def _truncate(self, text: str) -> str:
+        if len(text) <= self.max_field_size:
+            return text
+        return f"{text[:self.max_field_size]}... ({len(text) - self.max_field_size} more characters)"
+
+    def _json_field(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, str):
+            return self._truncate(value)
+        encoded = codec.dumps(value)
+        if len(encoded) <= self.max_field_size:
+            return codec.loads(encoded)
+        return self._truncate(encoded)
@@ -4,12 +4,13 @@ CopilotKit Run Loop
 
 import asyncio
 import contextvars
-import json
 import traceback
 from typing import Callable
 from pydantic import BaseModel
-from typing_extensions import Any, Dict, Optional, List, TypedDict, cast
-from partialjson.json_parser import JSONParser as PartialJSONParser
+from typing_extensions import Any, Dict, Optional, List, TypedDict, NotRequired, cast
+
+from . import codec
+from .partial_json import IncrementalJSONParser
 
 from .protocol import (
     RuntimeEvent,
@@ -46,6 +47,7 @@ class CopilotKitRunExecution(TypedDict):
     predict_state_configuration: Dict[str, PredictStateConfig]
     predicted_state: Dict[str, Any]
     argument_buffer: str
+    argument_parser: NotRequired[IncrementalJSONParser]
     current_tool_call: Optional[str]
     state: Dict[str, Any]
 
@@ -163,6 +165,9 @@ async def copilotkit_run(
         await task
 
     finally:
+        if not task.done():
+            # the consumer went away (e.g. the client disconnected), stop the flow
+            task.cancel()
         reset_context_queue(token_queue)
         reset_context_execution(token_execution)
 
@@ -226,7 +231,7 @@ def handle_runtime_event(
                 run_id=execution["run_id"],
                 active=True,
                 role="assistant",
-                state=json.dumps(_filter_state(state=execution["state"])),
+                state=codec.dumps(_filter_state(state=execution["state"])),
                 running=True
             )
         )
@@ -237,6 +242,7 @@ def handle_runtime_event(
         execution["predict_state_configuration"] = {}
         execution["current_tool_call"] = None
         execution["argument_buffer"] = ""
+        execution.pop("argument_parser", None)
         execution["predicted_state"] = {}
         execution["state"] = event["state"]
 
@@ -248,7 +254,7 @@ def handle_runtime_event(
                 run_id=execution["run_id"],
                 active=False,
                 role="assistant",
-                state=json.dumps(_filter_state(state=execution["state"])),
+                state=codec.dumps(_filter_state(state=execution["state"])),
                 running=True
             )
         )
@@ -294,6 +300,7 @@ def predict_state(
     if event["type"] == RuntimeEventTypes.ACTION_EXECUTION_START:
         execution["current_tool_call"] = event["actionName"]
         execution["argument_buffer"] = ""
+        execution.pop("argument_parser", None)
     elif event["type"] == RuntimeEventTypes.ACTION_EXECUTION_ARGS:
         execution["argument_buffer"] += event["args"]
 
@@ -305,17 +312,28 @@ def predict_state(
         if execution["current_tool_call"] not in tool_names:
             return None
 
-        current_arguments = {}
+        # the arguments are parsed incrementally, from the first chunk of a tracked tool call on
+        parser = execution.get("argument_parser")
         try:
-            current_arguments = PartialJSONParser().parse(execution["argument_buffer"])
-        except:  # pylint: disable=bare-except
+            if parser is None:
+                parser = execution["argument_parser"] = IncrementalJSONParser()
+                parser.feed(execution["argument_buffer"])
+            else:
+                parser.feed(event["args"])
+        except ValueError:
             return None
+        current_arguments = parser.value
+        if current_arguments is None:
+            current_arguments = {}
 
         emit_update = False
         for k, v in execution["predict_state_configuration"].items():
             if v["tool_name"] == execution["current_tool_call"]:
                 tool_argument = v.get("tool_argument")
                 if tool_argument is not None:
+                    if tool_argument not in parser.changed_keys:
+                        # the argument did not change with this chunk
+                        continue
                     argument_value = current_arguments.get(tool_argument)
                     if argument_value is not None:
                         execution["predicted_state"][k] = argument_value
@@ -332,7 +350,7 @@ def predict_state(
                 run_id=run_id,
                 active=True,
                 role="assistant",
-                state=json.dumps(
+                state=codec.dumps(
                     _filter_state(
                         state={
                             **(
@@ -1,13 +1,20 @@
 """CopilotKit SDK"""
 
+import hashlib
+import threading
 import warnings
+from collections import OrderedDict
 from importlib import metadata
 
-from pprint import pformat
-from typing import List, Callable, Union, Optional, Any, Coroutine
+from typing import List, Callable, Union, Optional, Any, Coroutine, Hashable, AsyncIterator
 from typing_extensions import TypedDict, Tuple, cast, Mapping
 from .agent import Agent, AgentDict
-from .action import Action, ActionDict, ActionResultDict
+from .action import Action, ActionDict, ActionResultDict, ActionStreamEvent
+from .admission import AdmissionController, AdmissionTicket
+from .registry import Registry, FactoryCache
+from .request_log import RequestLogger, RequestLogConfig
+from .state_sync import STATE_SYNC_HEADER
+from . import codec
 from .types import Message, MetaEvent
 from .exc import (
     ActionNotFoundException,
@@ -15,7 +22,7 @@ from .exc import (
     ActionExecutionException,
     AgentExecutionException
 )
-from .logging import get_logger, bold
+from .logging import get_logger
 
 
 try:
@@ -29,6 +36,8 @@ COPILOTKIT_SDK_VERSION = __version__
 
 logger = get_logger(__name__)
 
+_INFO_CACHE_SIZE = 128
+
 class InfoDict(TypedDict):
     """
     Info dictionary
@@ -58,6 +67,40 @@ class CopilotKitContext(TypedDict):
 CopilotKitSDKContext = CopilotKitContext
 
 
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+class CachedInfo:
+    """
+    The info of a set of actions and agents, encoded once and reused for every info request
+    """
+
+    def __init__(self, info: InfoDict, objects: Tuple[Any, ...]):
+        self.info = info
+        self.body = codec.dumpb(info)
+        self.etag = _etag(self.body)
+        # keep the actions and agents alive, so that their ids are not reused
+        self._objects = objects
+        self._html: Optional[Tuple[bytes, str]] = None
+
+    @property
+    def html(self) -> bytes:
+        """The info rendered as HTML"""
+        return self._render_html()[0]
+
+    @property
+    def html_etag(self) -> str:
+        """The ETag of the HTML variant"""
+        return self._render_html()[1]
+
+    def _render_html(self) -> Tuple[bytes, str]:
+        if self._html is None:
+            from .html import generate_info_html # pylint: disable=import-outside-toplevel
+            html = generate_info_html(self.info).encode("utf-8")
+            self._html = (html, _etag(html))
+        return self._html
+
+
 class CopilotKitRemoteEndpoint:
     """
     CopilotKitRemoteEndpoint lets you connect actions and agents written in Python to your 
@@ -177,6 +220,39 @@ class CopilotKitRemoteEndpoint:
     )
     ```
 
+    ## Reusing dynamically built actions and agents
+
+    By default, callables are called on every request. When building the actions or agents is
+    expensive, you can reuse the result for all requests sharing a cache key, e.g. per tenant:
+
+    ```python
+    sdk = CopilotKitRemoteEndpoint(
+        agents=lambda context: build_agents(context["properties"]["tenant_id"]),
+        factory_cache_key=lambda context: context["properties"]["tenant_id"],
+        factory_cache_ttl=300,
+    )
+    ```
+
+    Only do this when the actions and agents depend on nothing but the cache key, since the same
+    objects are shared by all requests with that key.
+
+    ## Limiting concurrent agent runs
+
+    To protect your server from traffic spikes, you can limit the number of agents running
+    at the same time. Runs over the limit wait in a queue, and are rejected when the queue is full
+    or when they have waited for too long (the FastAPI integration responds with
+    `429 Too Many Requests` and a `Retry-After` header):
+
+    ```python
+    sdk = CopilotKitRemoteEndpoint(
+        agents=[...],
+        max_concurrent_runs=50,
+        max_concurrent_runs_per_agent={"email_agent": 10},
+        max_queued_runs=100,
+        max_queue_wait=30,
+    )
+    ```
+
     ## Serving the CopilotKit SDK
 
     To serve the CopilotKit SDK, you can use the `add_fastapi_endpoint` function from the `copilotkit.integrations.fastapi` module:
@@ -205,9 +281,28 @@ class CopilotKitRemoteEndpoint:
         The actions to make available to the Copilot.
     agents : Optional[Union[List[Agent], Callable[[CopilotKitContext], List[Agent]]]]
         The agents to make available to the Copilot.
+    max_concurrent_runs : Optional[int]
+        The maximum number of agent runs across all agents. Unlimited by default.
+    max_concurrent_runs_per_agent : Optional[Union[int, Mapping[str, int]]]
+        The maximum number of runs per agent. Pass a mapping from agent name to limit agents
+        individually. Unlimited by default.
+    max_queued_runs : int
+        The maximum number of runs waiting for a slot when a limit is reached.
+    max_queue_wait : Optional[float]
+        The maximum number of seconds a run waits for a slot. None waits indefinitely.
+    factory_cache_key : Optional[Callable[[CopilotKitContext], Hashable]]
+        When `actions` or `agents` are callables, reuse their results for all requests with the
+        same key. Not cached by default.
+    factory_cache_ttl : Optional[float]
+        The number of seconds a cached result is reused. None reuses it until it is evicted.
+    factory_cache_size : int
+        The maximum number of cached results.
+    request_logging : Optional[RequestLogConfig]
+        How requests are logged at INFO level: as text or JSON records, the fraction of
+        requests logged and the maximum size of logged fields. See `copilotkit.request_log`.
     """
 
-    def __init__(
+    def __init__( # pylint: disable=too-many-arguments
         self,
         *,
         actions: Optional[
@@ -222,9 +317,47 @@ class CopilotKitRemoteEndpoint:
                 Callable[[CopilotKitContext], List[Agent]]
             ]
         ] = None,
+        max_concurrent_runs: Optional[int] = None,
+        max_concurrent_runs_per_agent: Optional[Union[int, Mapping[str, int]]] = None,
+        max_queued_runs: int = 100,
+        max_queue_wait: Optional[float] = 30.0,
+        factory_cache_key: Optional[Callable[[CopilotKitContext], Hashable]] = None,
+        factory_cache_ttl: Optional[float] = None,
+        factory_cache_size: int = 128,
+        request_logging: Optional[RequestLogConfig] = None,
     ):
         self.agents = agents or []
         self.actions = actions or []
+        # static lists are indexed, and checked for duplicate names, right away
+        self._action_registry: Optional[Registry[Action]] = (
+            None if callable(self.actions) else Registry(self.actions, kind="action", strict=True)
+        )
+        self._agent_registry: Optional[Registry[Agent]] = (
+            None if callable(self.agents) else Registry(self.agents, kind="agent", strict=True)
+        )
+
+        self.request_logger = RequestLogger(logger, **(request_logging or {}))
+        self.factory_cache_key = factory_cache_key
+        self._action_factory_cache: FactoryCache[Action] = FactoryCache(
+            kind="action",
+            ttl=factory_cache_ttl,
+            max_entries=factory_cache_size,
+        )
+        self._agent_factory_cache: FactoryCache[Agent] = FactoryCache(
+            kind="agent",
+            ttl=factory_cache_ttl,
+            max_entries=factory_cache_size,
+        )
+        self._info_cache: "OrderedDict[Tuple[int, ...], CachedInfo]" = OrderedDict()
+        self._info_cache_lock = threading.Lock()
+        self.admission = None
+        if max_concurrent_runs is not None or max_concurrent_runs_per_agent is not None:
+            self.admission = AdmissionController(
+                max_concurrent_runs=max_concurrent_runs,
+                max_concurrent_runs_per_agent=max_concurrent_runs_per_agent,
+                max_queued_runs=max_queued_runs,
+                max_queue_wait=max_queue_wait,
+            )
 
     def info(
         self,
@@ -234,27 +367,66 @@ class CopilotKitRemoteEndpoint:
         """
         Returns information about available actions and agents
         """
+        return self.cached_info(context=context).info
 
-        actions = self.actions(context) if callable(self.actions) else self.actions
-        agents = self.agents(context) if callable(self.agents) else self.agents
+    def cached_info(
+        self,
+        *,
+        context: CopilotKitContext
+    ) -> CachedInfo:
+        """
+        Returns information about available actions and agents, encoded as JSON.
 
-        actions_list = [action.dict_repr() for action in actions]
-        agents_list = [agent.dict_repr() for agent in agents]
+        The result is cached for as long as the same action and agent objects are served. Static
+        lists are described once. Callables are only cached with a `factory_cache_key`, as they
+        may return new objects on every call.
+        """
+        actions = self._get_actions(context).items
+        agents = self._get_agents(context).items
 
-        self._log_request_info(
+        cacheable = (
+            (not callable(self.actions) and not callable(self.agents)) or
+            self.factory_cache_key is not None
+        )
+        objects = (*actions, None, *agents)
+        key = tuple(id(obj) for obj in objects)
+        cached = None
+        if cacheable:
+            with self._info_cache_lock:
+                cached = self._info_cache.get(key)
+                if cached is not None:
+                    self._info_cache.move_to_end(key)
+
+        if cached is None:
+            cached = CachedInfo(
+                {
+                    "actions": [action.dict_repr() for action in actions],
+                    "agents": [agent.dict_repr() for agent in agents],
+                    "sdkVersion": COPILOTKIT_SDK_VERSION
+                },
+                objects
+            )
+            if cacheable:
+                with self._info_cache_lock:
+                    self._info_cache[key] = cached
+                    if len(self._info_cache) > _INFO_CACHE_SIZE:
+                        self._info_cache.popitem(last=False)
+
+        info = cached.info
+        request_log = self.request_logger.start(
+            "info",
             title="Handling info request:",
-            data=[
+            headers=_headers(context),
+            fields=lambda: [
                 ("Context", context),
-                ("Actions", actions_list),
-                ("Agents", agents_list),
+                ("Actions", info["actions"]),
+                ("Agents", info["agents"]),
             ]
         )
+        if request_log is not None:
+            request_log.finish()
 
-        return {
-            "actions": actions_list,
-            "agents": agents_list,
-            "sdkVersion": COPILOTKIT_SDK_VERSION
-        }
+        return cached
 
     def _get_action(
         self,
@@ -265,12 +437,43 @@ class CopilotKitRemoteEndpoint:
         """
         Get an action by name
         """
-        actions = self.actions(context) if callable(self.actions) else self.actions
-        action = next((action for action in actions if action.name == name), None)
+        action = self._get_actions(context).get(name)
         if action is None:
             raise ActionNotFoundException(name)
         return action
 
+    def _get_actions(self, context: CopilotKitContext) -> Registry[Action]:
+        """
+        Get the actions, indexed by name
+        """
+        if callable(self.actions):
+            factory = self.actions
+            if self.factory_cache_key is None:
+                return Registry(factory(context), kind="action")
+            return self._action_factory_cache.get_or_build(
+                self.factory_cache_key(context),
+                lambda: Registry(factory(context), kind="action")
+            )
+        if self._action_registry is None or not self._action_registry.indexes(self.actions):
+            self._action_registry = Registry(self.actions, kind="action", strict=True)
+        return self._action_registry
+
+    def _get_agents(self, context: CopilotKitContext) -> Registry[Agent]:
+        """
+        Get the agents, indexed by name
+        """
+        if callable(self.agents):
+            factory = self.agents
+            if self.factory_cache_key is None:
+                return Registry(factory(context), kind="agent")
+            return self._agent_factory_cache.get_or_build(
+                self.factory_cache_key(context),
+                lambda: Registry(factory(context), kind="agent")
+            )
+        if self._agent_registry is None or not self._agent_registry.indexes(self.agents):
+            self._agent_registry = Registry(self.agents, kind="agent", strict=True)
+        return self._agent_registry
+
     def execute_action(
             self,
             *,
@@ -284,9 +487,12 @@ class CopilotKitRemoteEndpoint:
 
         action = self._get_action(context=context, name=name)
 
-        self._log_request_info(
+        request_log = self.request_logger.start(
+            "execute_action",
             title="Handling execute action request:",
-            data=[
+            headers=_headers(context),
+            name=name,
+            fields=lambda: [
                 ("Context", context),
                 ("Action", action.dict_repr()),
                 ("Arguments", arguments),
@@ -294,11 +500,39 @@ class CopilotKitRemoteEndpoint:
         )
 
         try:
-            result = action.execute(arguments=arguments)
-            return result
+            result = action.execute(arguments=arguments, context=context)
+            return result if request_log is None else request_log.wrap(result)
         except Exception as error:
             raise ActionExecutionException(name, error) from error
 
+    def stream_action(
+            self,
+            *,
+            context: CopilotKitContext,
+            name: str,
+            arguments: dict,
+    ) -> AsyncIterator[ActionStreamEvent]:
+        """
+        Execute an action, streaming its events (see `Action.stream`)
+        """
+
+        action = self._get_action(context=context, name=name)
+
+        request_log = self.request_logger.start(
+            "stream_action",
+            title="Handling stream action request:",
+            headers=_headers(context),
+            name=name,
+            fields=lambda: [
+                ("Context", context),
+                ("Action", action.dict_repr()),
+                ("Arguments", arguments),
+            ]
+        )
+
+        events = action.stream(arguments=arguments, context=context)
+        return events if request_log is None else request_log.wrap_stream(events)
+
     def execute_agent( # pylint: disable=too-many-arguments
         self,
         *,
@@ -311,18 +545,69 @@ class CopilotKitRemoteEndpoint:
         actions: List[ActionDict],
         node_name: str,
         meta_events: Optional[List[MetaEvent]] = None,
+        admission_ticket: Optional[AdmissionTicket] = None,
     ) -> Any:
         """
         Execute an agent
+
+        When concurrency limits are configured, the run waits for a slot before it starts,
+        unless a slot was already acquired with `admit_agent_run()` and passed as
+        `admission_ticket`.
+        """
+        try:
+            events = self._execute_agent(
+                context=context,
+                name=name,
+                thread_id=thread_id,
+                state=state,
+                config=config,
+                messages=messages,
+                actions=actions,
+                node_name=node_name,
+                meta_events=meta_events,
+            )
+        except BaseException:
+            if admission_ticket is not None:
+                admission_ticket.release()
+            raise
+
+        if self.admission is None:
+            return events
+        return self.admission.guard(events, name=name, ticket=admission_ticket)
+
+    async def admit_agent_run(self, *, name: str) -> Optional[AdmissionTicket]:
         """
-        agents = self.agents(context) if callable(self.agents) else self.agents
-        agent = next((agent for agent in agents if agent.name == name), None)
+        Wait for a free slot to run the agent. Returns None when no concurrency limits are
+        configured. Raises `AgentOverloadedException` when the run is rejected.
+        """
+        if self.admission is None:
+            return None
+        return await self.admission.acquire(name)
+
+    def _execute_agent( # pylint: disable=too-many-arguments
+        self,
+        *,
+        context: CopilotKitContext,
+        name: str,
+        thread_id: str,
+        state: dict,
+        config: Optional[dict] = None,
+        messages: List[Message],
+        actions: List[ActionDict],
+        node_name: str,
+        meta_events: Optional[List[MetaEvent]] = None,
+    ) -> Any:
+        agent = self._get_agents(context).get(name)
         if agent is None:
             raise AgentNotFoundException(name)
 
-        self._log_request_info(
+        request_log = self.request_logger.start(
+            "execute_agent",
             title="Handling execute agent request:",
-            data=[
+            headers=_headers(context),
+            name=name,
+            thread_id=thread_id,
+            fields=lambda: [
                 ("Context", context),
                 ("Agent", agent.dict_repr()),
                 ("Thread ID", thread_id),
@@ -336,17 +621,23 @@ class CopilotKitRemoteEndpoint:
         )
 
         try:
-            return agent.execute(
+            # only passed when asked for, agents that do not know about it keep sending snapshots
+            state_sync = (_headers(context) or {}).get(STATE_SYNC_HEADER)
+            events = agent.execute(
                 thread_id=thread_id,
                 node_name=node_name,
                 state=state,
                 config=config,
                 messages=messages,
                 actions=actions,
-                meta_events=meta_events
+                meta_events=meta_events,
+                **({"state_sync": "delta"} if state_sync == "delta" else {})
             )
         except Exception as error:
+            if request_log is not None:
+                request_log.finish(error)
             raise AgentExecutionException(name, error) from error
+        return events if request_log is None else request_log.wrap_stream(events)
 
     async def get_agent_state(
         self,
@@ -358,34 +649,35 @@ class CopilotKitRemoteEndpoint:
         """
         Get agent state
         """
-        agents = self.agents(context) if callable(self.agents) else self.agents
-        agent = next((agent for agent in agents if agent.name == name), None)
+        agent = self._get_agents(context).get(name)
         if agent is None:
             raise AgentNotFoundException(name)
 
-        self._log_request_info(
+        request_log = self.request_logger.start(
+            "get_agent_state",
             title="Handling get agent state request:",
-            data=[
+            headers=_headers(context),
+            name=name,
+            thread_id=thread_id,
+            fields=lambda: [
                 ("Context", context),
                 ("Agent", agent.dict_repr()),
                 ("Thread ID", thread_id),
             ]
         )
         try:
-            return await agent.get_state(thread_id=thread_id)
+            state = await agent.get_state(thread_id=thread_id)
         except Exception as error:
+            if request_log is not None:
+                request_log.finish(error)
             raise AgentExecutionException(name, error) from error
+        if request_log is not None:
+            request_log.finish()
+        return state
 
-    def _log_request_info(self, title: str, data: List[Tuple[str, Any]]):
-        """
-        Log request info
-        """
-        logger.info(bold(title))
-        logger.info("--------------------------")
-        for key, value in data:
-            logger.info(bold(key+":"))
-            logger.info(pformat(value))
-        logger.info("--------------------------")
+
+def _headers(context: Optional[CopilotKitContext]) -> Optional[Mapping[str, str]]:
+    return context.get("headers") if context else None
 
 # Alias for backwards compatibility
 class CopilotKitSDK(CopilotKitRemoteEndpoint):
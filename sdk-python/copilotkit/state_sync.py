@@ -0,0 +1,150 @@
+"""
+Delta state sync.
+
+By default, every `on_copilotkit_state_sync` event carries the whole agent state. Clients that
+send the header `X-CopilotKit-State-Sync: delta` instead receive a full snapshot first, followed
+by `on_copilotkit_state_delta` events whose `patch` is an RFC 6902 JSON Patch against the
+previously sent state:
+
+```json
+{"event": "on_copilotkit_state_delta", "thread_id": "...", "run_id": "...", "agent_name": "...",
+ "node_name": "...", "active": true, "running": true, "role": "assistant",
+ "patch": [{"op": "replace", "path": "/document/title", "value": "Draft"}]}
+```
+
+A full snapshot is sent again every `snapshot_interval` events, so that clients can resync. The
+final state sync of a run, which includes the messages, is always a snapshot. A delta with an empty
+patch is not sent, unless the node, `active` or `running` changed.
+"""
+
+from typing import Any, Dict, List, Literal, Optional
+
+StateSyncMode = Literal["snapshot", "delta"]
+
+STATE_SYNC_HEADER = "x-copilotkit-state-sync"
+
+PatchOperation = Dict[str, Any]
+
+
+class DeltaStateSync:
+    """
+    Tracks the state last sent in a run and computes the patches to the next state.
+
+    Parameters
+    ----------
+    snapshot_interval : int
+        The number of patches sent before the next full snapshot.
+    """
+
+    def __init__(self, snapshot_interval: int = 50):
+        self.snapshot_interval = snapshot_interval
+        self._base: Optional[dict] = None
+        self._patches_since_snapshot = 0
+        self._context: Any = None
+
+    def patch(self, state: dict) -> Optional[List[PatchOperation]]:
+        """
+        The patch from the last sent state to `state`, or None when a full snapshot is due.
+        Either way, `state` becomes the base of the next patch.
+        """
+        base = self._base
+        if base is None or self._patches_since_snapshot >= self.snapshot_interval:
+            self._base = _copy_containers(state)
+            self._patches_since_snapshot = 0
+            return None
+        operations: List[PatchOperation] = []
+        # the parts of the base that did not change are kept, only the changes are copied
+        self._base = _diff(base, state, "", operations)
+        if operations:
+            self._patches_since_snapshot += 1
+        return operations
+
+    def skip(self, patch: Optional[List[PatchOperation]], context: Any) -> bool:
+        """
+        Whether an event with `patch` tells the client nothing new, as neither the state nor the
+        `context` of the event, e.g. its node, changed since the last event sent.
+        """
+        if patch == [] and context == self._context:
+            return True
+        self._context = context
+        return False
+
+    def reset(self):
+        """Send a full snapshot next"""
+        self._base = None
+        self._context = None
+
+
+def make_patch(old: Any, new: Any) -> List[PatchOperation]:
+    """Compute an RFC 6902 JSON Patch turning `old` into `new`"""
+    operations: List[PatchOperation] = []
+    _diff(old, new, "", operations)
+    return operations
+
+
+def _diff(old: Any, new: Any, path: str, operations: List[PatchOperation]) -> Any:
+    # appends the operations turning `old` into `new` and returns a copy of `new` that shares
+    # the containers of `old` that did not change, visiting every value once
+    if old is new:
+        return old
+    count = len(operations)
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        copy = {}
+        for key in old:
+            if key not in new:
+                operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            key_path = f"{path}/{_escape(key)}"
+            if key not in old:
+                operations.append({"op": "add", "path": key_path, "value": value})
+                copy[key] = _copy_containers(value)
+            else:
+                copy[key] = _diff(old[key], value, key_path, operations)
+        # a reordering of the keys alone is not a change
+        return old if len(operations) == count else copy
+
+    if isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        copy = [
+            _diff(old[index], new[index], f"{path}/{index}", operations)
+            for index in range(common)
+        ]
+        for index in range(common, len(new)):
+            operations.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+            copy.append(_copy_containers(new[index]))
+        # remove from the end, so that the indexes stay valid
+        for index in range(len(old) - 1, common - 1, -1):
+            operations.append({"op": "remove", "path": f"{path}/{index}"})
+        return old if len(operations) == count else copy
+
+    if isinstance(old, (dict, list)) or isinstance(new, (dict, list)) or not _equal(old, new):
+        operations.append({"op": "replace", "path": path, "value": new})
+        return _copy_containers(new)
+    return old
+
+
+def _equal(old: Any, new: Any) -> bool:
+    if old is new:
+        return True
+    # 1, 1.0 and True are equal in Python, but not in the client's state
+    if type(old) is not type(new): # pylint: disable=unidiomatic-typecheck
+        return False
+    try:
+        return bool(old == new)
+    except Exception: # pylint: disable=broad-except
+        return False
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _copy_containers(value: Any) -> Any:
+    # the base must not change when the agent mutates its state in place, values other than
+    # dicts and lists are treated as immutable
+    if isinstance(value, dict):
+        return {key: _copy_containers(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_containers(item) for item in value]
+    return value
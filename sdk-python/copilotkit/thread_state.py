@@ -0,0 +1,122 @@
+"""
+Cache of thread states read from the checkpointer.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from . import codec
+from .metrics import metrics
+
+
+class ThreadStateCache:
+    """
+    A bounded cache of thread states, by thread id.
+
+    Entries expire after `ttl` seconds. Beyond `max_entries` entries, or `max_bytes` bytes of
+    JSON encoded state, the least recently used entries are evicted. `get()` returns a shallow
+    copy, so callers may add and remove keys without changing the cached state.
+
+    Hits, misses and evictions are counted by the metrics `copilotkit_thread_state_cache_hits`,
+    `copilotkit_thread_state_cache_misses` and `copilotkit_thread_state_cache_evictions`.
+
+    Parameters
+    ----------
+    agent : str
+        The name of the agent, used as metrics label.
+    max_entries : int
+        The maximum number of cached states.
+    max_bytes : Optional[int]
+        The maximum total size of the cached states. Sizes are only computed when this is set.
+    ttl : Optional[float]
+        Seconds after which a state is read again. None keeps states until they are evicted.
+    """
+
+    def __init__(
+            self,
+            *,
+            agent: str,
+            max_entries: int = 1024,
+            max_bytes: Optional[int] = None,
+            ttl: Optional[float] = 60,
+        ):
+        self.agent = agent
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[dict, int, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # invalidations are numbered, the number of the last one is kept per thread
+        self._epoch = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        # states read before this epoch are dropped, as their invalidations are forgotten
+        self._min_epoch = 0
+
+    def epoch(self) -> int:
+        """
+        The current invalidation epoch. Pass it to `put()` to drop a state that was read before a
+        concurrent invalidation of its thread. Invalidations of other threads do not drop it.
+        """
+        return self._epoch
+
+    def get(self, thread_id: str) -> Optional[dict]:
+        """Get a copy of the cached state, or None"""
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(thread_id)
+                entry = None
+            if entry is None:
+                metrics.increment("copilotkit_thread_state_cache_misses", agent=self.agent)
+                return None
+            self._entries.move_to_end(thread_id)
+        metrics.increment("copilotkit_thread_state_cache_hits", agent=self.agent)
+        return {**entry[0]}
+
+    def put(self, thread_id: str, state: dict, epoch: Optional[int] = None):
+        """Cache a state, unless the thread was invalidated since `epoch`"""
+        size = len(codec.dumpb(state)) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if epoch is not None and (
+                epoch < self._min_epoch or self._invalidated.get(thread_id, 0) > epoch
+            ):
+                return
+            if thread_id in self._entries:
+                self._remove(thread_id)
+            self._entries[thread_id] = (state, size, expires_at)
+            self.size += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                metrics.increment("copilotkit_thread_state_cache_evictions", agent=self.agent)
+
+    def invalidate(self, thread_id: str):
+        """Drop the state of a thread, e.g. after a run changed it"""
+        with self._lock:
+            self._epoch += 1
+            self._invalidated[thread_id] = self._epoch
+            self._invalidated.move_to_end(thread_id)
+            while len(self._invalidated) > self.max_entries:
+                _thread_id, forgotten = self._invalidated.popitem(last=False)
+                self._min_epoch = max(self._min_epoch, forgotten)
+            if thread_id in self._entries:
+                self._remove(thread_id)
+
+    def clear(self):
+        """Drop all states"""
+        with self._lock:
+            self._epoch += 1
+            self._min_epoch = self._epoch
+            self._invalidated.clear()
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, thread_id: str):
+        _state, size, _expires_at = self._entries.pop(thread_id)
+        self.size -= size
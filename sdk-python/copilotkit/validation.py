@@ -0,0 +1,204 @@
+"""
+Argument validation for actions.
+
+Parameters are compiled once into a validator, which checks and coerces the arguments of each
+call before the handler runs:
+
+- `number` accepts ints and floats, and numeric strings, which are converted
+- `boolean` accepts booleans, and the strings `"true"` and `"false"`
+- `string` accepts strings, which must be one of `enum` when given
+- `object` accepts objects, whose `attributes` are validated recursively
+- `T[]` accepts lists of `T`
+
+Missing required arguments are errors. Optional arguments may be missing or null. Arguments
+that are not declared are passed through unchanged.
+"""
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing_extensions import TypedDict
+from .parameter import Parameter
+
+_MISSING = object()
+
+
+class ArgumentError(TypedDict):
+    """An invalid argument"""
+    path: str
+    message: str
+
+
+# a compiled check returns the (possibly coerced) value, or appends to errors
+Check = Callable[[Any, str, List[ArgumentError]], Any]
+
+
+class ArgumentValidator:
+    """
+    Validates arguments against normalized parameters (see `normalize_parameters`).
+
+    Parameters
+    ----------
+    parameters : List[Parameter]
+        The normalized parameters.
+    """
+
+    def __init__(self, parameters: List[Parameter]):
+        self.parameters = parameters
+        self._check = _compile_object(parameters)
+        self.json_schema = _object_schema(parameters)
+
+    def validate(self, arguments: Any) -> Tuple[dict, List[ArgumentError]]:
+        """Return the coerced arguments and the errors found"""
+        errors: List[ArgumentError] = []
+        result = self._check(arguments, "", errors)
+        return result, errors
+
+
+def _compile(parameter: Parameter) -> Check:
+    type_name: str = parameter.get("type", "string")
+    is_list = type_name.endswith("[]")
+    item_type = type_name[:-2] if is_list else type_name
+
+    if item_type == "string":
+        check = _compile_string(parameter.get("enum")) # type: ignore
+    elif item_type == "number":
+        check = _check_number
+    elif item_type == "boolean":
+        check = _check_boolean
+    elif item_type == "object":
+        check = _compile_object(parameter.get("attributes", [])) # type: ignore
+    else:
+        check = _check_any
+
+    return _compile_list(check) if is_list else check
+
+
+def _compile_object(parameters: List[Parameter]) -> Check:
+    fields = [
+        (parameter["name"], parameter.get("required", True), _compile(parameter))
+        for parameter in parameters
+    ]
+
+    def check(value: Any, path: str, errors: List[ArgumentError]) -> Any:
+        if not isinstance(value, dict):
+            errors.append(_error(path, "expected an object", value))
+            return value
+        result = None
+        for name, required, check_field in fields:
+            field_value = value.get(name, _MISSING)
+            field_path = f"{path}.{name}" if path else name
+            if field_value is _MISSING or field_value is None:
+                if required:
+                    errors.append({"path": field_path, "message": "is required"})
+                continue
+            checked = check_field(field_value, field_path, errors)
+            if checked is not field_value:
+                if result is None:
+                    result = dict(value)
+                result[name] = checked
+        return value if result is None else result
+
+    return check
+
+
+def _compile_list(check_item: Check) -> Check:
+    def check(value: Any, path: str, errors: List[ArgumentError]) -> Any:
+        if not isinstance(value, list):
+            errors.append(_error(path, "expected a list", value))
+            return value
+        result = None
+        for index, item in enumerate(value):
+            checked = check_item(item, f"{path}[{index}]", errors)
+            if checked is not item:
+                if result is None:
+                    result = list(value)
+                result[index] = checked
+        return value if result is None else result
+
+    return check
+
+
+def _compile_string(enum: Optional[List[str]]) -> Check:
+    allowed = frozenset(enum) if enum else None
+    expected = "expected one of " + ", ".join(repr(item) for item in enum) if enum else ""
+
+    def check(value: Any, path: str, errors: List[ArgumentError]) -> Any:
+        if not isinstance(value, str):
+            errors.append(_error(path, "expected a string", value))
+        elif allowed is not None and value not in allowed:
+            errors.append(_error(path, expected, value))
+        return value
+
+    return check
+
+
+def _check_number(value: Any, path: str, errors: List[ArgumentError]) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            number = float(value)
+            if math.isfinite(number):
+                return number
+        except ValueError:
+            pass
+    errors.append(_error(path, "expected a number", value))
+    return value
+
+
+def _check_boolean(value: Any, path: str, errors: List[ArgumentError]) -> Any:
+    if isinstance(value, bool):
+        return value
+    if value in ("true", "false"):
+        return value == "true"
+    errors.append(_error(path, "expected a boolean", value))
+    return value
+
+
+def _check_any(value: Any, path: str, errors: List[ArgumentError]) -> Any: # pylint: disable=unused-argument
+    return value
+
+
+def _error(path: str, message: str, value: Any) -> ArgumentError:
+    received = repr(value)
+    if len(received) > 100:
+        received = received[:100] + "..."
+    return {"path": path, "message": f"{message}, got {received}"}
+
+
+_SCHEMA_TYPES = {"string": "string", "number": "number", "boolean": "boolean", "object": "object"}
+
+
+def _schema(parameter: Parameter) -> Dict[str, Any]:
+    type_name: str = parameter.get("type", "string")
+    is_list = type_name.endswith("[]")
+    item_type = type_name[:-2] if is_list else type_name
+
+    if item_type == "object":
+        schema = _object_schema(parameter.get("attributes", [])) # type: ignore
+    elif item_type in _SCHEMA_TYPES:
+        schema = {"type": _SCHEMA_TYPES[item_type]}
+    else:
+        schema = {}
+    if item_type == "string" and parameter.get("enum"):
+        schema["enum"] = parameter.get("enum")
+
+    if is_list:
+        schema = {"type": "array", "items": schema}
+    if parameter.get("description"):
+        schema["description"] = parameter.get("description")
+    return schema
+
+
+def _object_schema(parameters: List[Parameter]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {parameter["name"]: _schema(parameter) for parameter in parameters},
+        "required": [
+            parameter["name"] for parameter in parameters if parameter.get("required", True)
+        ],
+    }
@@ -0,0 +1,84 @@
+"""Tests for the batch action execution endpoint"""
+
+import asyncio
+import json
+import warnings
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.integrations.fastapi import add_fastapi_endpoint
+
+
+def _client(max_batch_concurrency: int = 8) -> TestClient:
+    running = {"now": 0, "max": 0}
+
+    async def sleep(seconds: float):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            running["now"] -= 1
+        return seconds
+
+    async def max_running():
+        return running["max"]
+
+    sdk = CopilotKitRemoteEndpoint(actions=[
+        Action(
+            name="sleep",
+            handler=sleep,
+            parameters=[{"name": "seconds", "type": "number", "required": True}],
+        ),
+        Action(name="max_running", handler=max_running),
+    ])
+    app = FastAPI()
+    add_fastapi_endpoint(app, sdk, "/copilotkit", max_batch_concurrency=max_batch_concurrency)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return TestClient(app)
+
+
+def _batch(*calls) -> dict:
+    return {"actions": [{"name": name, "arguments": arguments} for name, arguments in calls]}
+
+
+def test_results_are_in_request_order():
+    response = _client().post("/copilotkit/actions/execute-batch", json=_batch(
+        ("sleep", {"seconds": 0.03}),
+        ("sleep", {"seconds": 0.01}),
+        ("missing", {}),
+        ("sleep", {"seconds": "soon"}),
+    ))
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["status"] for result in results] == [200, 200, 404, 422]
+    assert [result.get("result") for result in results[:2]] == [0.03, 0.01]
+    assert results[3]["errors"]
+
+
+def test_streamed_results_arrive_as_actions_finish():
+    response = _client().post("/copilotkit/actions/execute-batch", json={
+        **_batch(("sleep", {"seconds": 0.05}), ("sleep", {"seconds": 0.0})),
+        "stream": True,
+    })
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in response.text.split("\n") if line]
+    assert [result["index"] for result in results] == [1, 0]
+
+
+def test_concurrency_is_capped():
+    client = _client(max_batch_concurrency=2)
+    client.post(
+        "/copilotkit/actions/execute-batch",
+        json=_batch(*[("sleep", {"seconds": 0.01})] * 6),
+    )
+    response = client.post("/copilotkit/action/max_running", json={})
+    assert response.json()["result"] == 2
+
+
+def test_body_is_required():
+    assert _client().post("/copilotkit/actions/execute-batch").status_code == 400
@@ -0,0 +1,131 @@
+"""Tests for running action handlers on the executor, with timeouts"""
+
+import asyncio
+import threading
+import time
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.exc import ActionTimeoutException
+from copilotkit.executor import ConcurrencyLimiter
+from copilotkit.integrations.fastapi import add_fastapi_endpoint
+
+
+def test_sync_handler_does_not_block_the_loop():
+    def blocking():
+        time.sleep(0.1)
+        return threading.current_thread().name
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        result = await Action(name="blocking", handler=blocking).execute(arguments={})
+        ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    assert result["result"].startswith("copilotkit-action")
+    assert ticks >= 5
+
+
+def test_async_handler_times_out():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    action = Action(name="slow", handler=slow, timeout=0.02)
+    with pytest.raises(ActionTimeoutException) as error:
+        asyncio.run(action.execute(arguments={}))
+    assert error.value.timeout == 0.02
+    assert cancelled == [True]
+
+
+def test_sync_handler_times_out():
+    action = Action(name="slow", handler=lambda: time.sleep(0.2), timeout=0.02)
+    started = time.monotonic()
+    with pytest.raises(ActionTimeoutException):
+        asyncio.run(action.execute(arguments={}))
+    assert time.monotonic() - started < 0.15
+
+
+def test_timeout_raised_by_handler_is_not_an_action_timeout():
+    async def handler():
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(Action(name="handler", handler=handler, timeout=10).execute(arguments={}))
+
+
+def test_max_concurrency():
+    running = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def handler():
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+
+    async def main():
+        action = Action(name="handler", handler=handler, max_concurrency=2)
+        await asyncio.gather(*(action.execute(arguments={}) for _ in range(6)))
+
+    asyncio.run(main())
+    assert running["max"] == 2
+
+
+def test_limiter_is_shared_between_loops():
+    limiter = ConcurrencyLimiter(1)
+    order = []
+
+    async def hold():
+        await limiter.acquire()
+        order.append("held")
+        await asyncio.sleep(0.05)
+        order.append("released")
+        limiter.release()
+
+    async def wait():
+        await asyncio.sleep(0.01)
+        await limiter.acquire()
+        order.append("acquired")
+        limiter.release()
+
+    threads = [
+        threading.Thread(target=asyncio.run, args=(hold(),)),
+        threading.Thread(target=asyncio.run, args=(wait(),)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert order == ["held", "released", "acquired"]
+
+
+def test_timeout_is_gateway_timeout():
+    app = FastAPI()
+    add_fastapi_endpoint(app, CopilotKitRemoteEndpoint(actions=[
+        Action(name="slow", handler=lambda: time.sleep(0.1), timeout=0.01),
+    ]), "/copilotkit")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        client = TestClient(app)
+    assert client.post("/copilotkit/action/slow", json={}).status_code == 504
@@ -0,0 +1,109 @@
+"""Tests for the release of admission slots"""
+
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from copilotkit.admission import AdmissionController
+from copilotkit.exc import AgentOverloadedException
+from copilotkit.integrations.fastapi import AdmittedStreamingResponse
+
+
+async def _events():
+    yield "a\n"
+    yield "b\n"
+
+
+async def _acquired_again(controller: AdmissionController, name: str = "agent") -> bool:
+    try:
+        ticket = await controller.acquire(name)
+    except AgentOverloadedException:
+        return False
+    ticket.release()
+    return True
+
+
+def _controller() -> AdmissionController:
+    return AdmissionController(max_concurrent_runs=1, max_queue_wait=0.05)
+
+
+def test_slot_is_held_while_running():
+    async def main():
+        controller = _controller()
+        ticket = await controller.acquire("agent")
+        assert not await _acquired_again(controller)
+        ticket.release()
+        ticket.release()
+        assert await _acquired_again(controller)
+
+    asyncio.run(main())
+
+
+def test_finished_stream_releases_slot():
+    async def main():
+        controller = _controller()
+        stream = controller.guard(_events(), name="agent")
+        assert [event async for event in stream] == ["a\n", "b\n"]
+        assert await _acquired_again(controller)
+
+    asyncio.run(main())
+
+
+def test_unstarted_stream_releases_slot_when_closed():
+    async def main():
+        controller = _controller()
+        ticket = await controller.acquire("agent")
+        await controller.guard(_events(), name="agent", ticket=ticket).aclose()
+        assert await _acquired_again(controller)
+
+    asyncio.run(main())
+
+
+def test_failing_stream_releases_slot():
+    async def failing():
+        yield "a\n"
+        raise RuntimeError("boom")
+
+    async def main():
+        controller = _controller()
+        stream = controller.guard(failing(), name="agent")
+        with pytest.raises(RuntimeError):
+            async for _ in stream:
+                pass
+        assert await _acquired_again(controller)
+
+    asyncio.run(main())
+
+
+def test_response_releases_slot_when_body_never_starts():
+    async def main():
+        controller = _controller()
+        ticket = await controller.acquire("agent")
+        response = AdmittedStreamingResponse(
+            controller.guard(_events(), name="agent", ticket=ticket),
+            admission_ticket=ticket,
+        )
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(_message):
+            raise OSError("client went away")
+
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        assert await _acquired_again(controller)
+
+    asyncio.run(main())
+
+
+def test_queue_full_is_rejected():
+    async def main():
+        controller = AdmissionController(max_concurrent_runs=1, max_queued_runs=0)
+        ticket = await controller.acquire("agent")
+        with pytest.raises(AgentOverloadedException):
+            await controller.acquire("agent")
+        ticket.release()
+
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Tests for action result caching"""
+
+import asyncio
+
+import pytest
+
+from copilotkit.cache import ActionCache, LRUCacheBackend
+
+
+def test_concurrent_calls_share_one_execution():
+    async def main():
+        cache = ActionCache()
+        calls = []
+
+        async def execute():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return {"result": len(calls)}
+
+        key = cache.make_key("action", {"a": 1})
+        results = await asyncio.gather(*(
+            cache.get_or_execute("action", key, execute) for _ in range(10)
+        ))
+        assert len(calls) == 1
+        assert all(result == {"result": 1} for result in results)
+        assert await cache.get_or_execute("action", key, execute) == {"result": 1}
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_failures_are_shared_but_not_cached():
+    async def main():
+        cache = ActionCache()
+        calls = []
+
+        async def execute():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return "ok"
+
+        results = await asyncio.gather(
+            *(cache.get_or_execute("action", "key", execute) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert len(calls) == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get_or_execute("action", "key", execute) == "ok"
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_execution():
+    async def main():
+        cache = ActionCache()
+        calls = []
+
+        async def execute():
+            calls.append(None)
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        first = asyncio.ensure_future(cache.get_or_execute("action", "key", execute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_execute("action", "key", execute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await first == "ok"
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_execution_is_retried_by_waiters():
+    async def main():
+        cache = ActionCache()
+        calls = []
+
+        async def execute():
+            calls.append(None)
+            await asyncio.sleep(0.02)
+            return len(calls)
+
+        first = asyncio.ensure_future(cache.get_or_execute("action", "key", execute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_execute("action", "key", execute))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await waiter == 2
+
+    asyncio.run(main())
+
+
+def test_keys_depend_on_arguments_and_scope():
+    cache = ActionCache(key=lambda arguments, context: context["properties"]["user"])
+    alice = {"properties": {"user": "alice"}}
+    assert (
+        cache.make_key("action", {"a": 1, "b": 2}, alice) ==
+        cache.make_key("action", {"b": 2, "a": 1}, alice)
+    )
+    assert (
+        cache.make_key("action", {"a": 1}, alice) !=
+        cache.make_key("action", {"a": 1}, {"properties": {"user": "bob"}})
+    )
+    assert cache.make_key("action", {"a": 1}, alice) != cache.make_key("other", {"a": 1}, alice)
+
+
+def test_lru_backend_evicts_and_expires():
+    async def main():
+        backend = LRUCacheBackend(max_entries=2)
+        await backend.set("a", 1, None)
+        await backend.set("b", 2, None)
+        assert await backend.get("a") == (True, 1)
+        await backend.set("c", 3, None)
+        assert await backend.get("b") == (False, None)
+        await backend.set("d", 4, 0)
+        assert await backend.get("d") == (False, None)
+
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Tests for the message id to checkpoint index"""
+
+import asyncio
+import warnings
+
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, MessagesState, StateGraph
+
+from copilotkit import LangGraphAgent
+from copilotkit.checkpoint_index import CheckpointIndexEntry, InMemoryCheckpointIndex
+
+
+class _CountingSaver(MemorySaver):
+    """Counts the reads of the checkpoint history"""
+
+    def __init__(self):
+        super().__init__()
+        self.history_reads = 0
+
+    async def alist(self, *args, **kwargs): # pylint: disable=arguments-differ
+        self.history_reads += 1
+        async for checkpoint in super().alist(*args, **kwargs):
+            yield checkpoint
+
+
+def _reply(state):
+    return {"messages": [AIMessage(content="hi", id=f"ai{len(state['messages'])}")]}
+
+
+def _agent(name: str, saver: MemorySaver) -> LangGraphAgent:
+    graph = StateGraph(MessagesState)
+    graph.add_node("reply", _reply)
+    graph.set_entry_point("reply")
+    graph.add_edge("reply", END)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return LangGraphAgent(name=name, graph=graph.compile(checkpointer=saver))
+
+
+async def _run_turns(agent: LangGraphAgent, turns: int, messages=None) -> list:
+    """Run `turns` more turns on thread `t`, returning the messages"""
+    messages = [] if messages is None else messages
+    for turn in range(len(messages) // 2, len(messages) // 2 + turns):
+        messages.append({
+            "id": f"u{turn}", "type": "TextMessage", "role": "user", "content": f"q{turn}",
+        })
+        async for _ in agent.execute(
+                state={},
+                messages=messages,
+                thread_id="t",
+                actions=[],
+                node_name=None if turn == 0 else "__end__",
+            ):
+            pass
+        messages.append({
+            "id": f"ai{len(messages)}", "type": "TextMessage", "role": "assistant", "content": "hi",
+        })
+    return messages
+
+
+def test_in_memory_index_keeps_first_entry_and_evicts_threads():
+    async def main():
+        index = InMemoryCheckpointIndex(max_threads=1)
+        await index.update("t1", {"m": CheckpointIndexEntry("c1")}, "c1")
+        await index.update("t1", {"m": CheckpointIndexEntry("c2")}, "c2")
+        assert await index.get("t1", "m") == CheckpointIndexEntry("c1")
+        assert await index.last_checkpoint_id("t1") == "c2"
+        await index.update("t2", {}, "c3")
+        assert await index.get("t1", "m") is None
+
+    asyncio.run(main())
+
+
+def test_runs_do_not_read_history():
+    async def main():
+        saver = _CountingSaver()
+        agent = _agent("agent", saver)
+        await _run_turns(agent, 2)
+        assert saver.history_reads == 0
+        assert await agent.checkpoint_index.last_checkpoint_id("t") is None
+
+    asyncio.run(main())
+
+
+def test_lookups_match_history_scan():
+    async def main():
+        saver = _CountingSaver()
+        agent = _agent("indexed", saver)
+        await _run_turns(agent, 3)
+
+        expected = {
+            "u0": [],
+            "ai1": ["u0"],
+            "u1": ["u0", "ai1"],
+            "u2": ["u0", "ai1", "u1", "ai3"],
+        }
+        for message_id, messages in expected.items():
+            snapshot = await agent.get_checkpoint_before_message(message_id, "t")
+            assert [message.id for message in snapshot.values["messages"]] == messages
+        # the index was built once, on the first lookup
+        assert saver.history_reads == 1
+
+        with pytest.raises(ValueError):
+            await agent.get_checkpoint_before_message("unknown", "t")
+
+    asyncio.run(main())
+
+
+def test_index_catches_up_with_new_checkpoints():
+    async def main():
+        saver = _CountingSaver()
+        agent = _agent("catch_up", saver)
+        messages = await _run_turns(agent, 1)
+        await agent.get_checkpoint_before_message("u0", "t")
+        last_checkpoint_id = await agent.checkpoint_index.last_checkpoint_id("t")
+        await _run_turns(agent, 1, messages)
+        snapshot = await agent.get_checkpoint_before_message("u1", "t")
+        assert [message.id for message in snapshot.values["messages"]] == ["u0", "ai1"]
+        assert await agent.checkpoint_index.last_checkpoint_id("t") != last_checkpoint_id
+
+    asyncio.run(main())
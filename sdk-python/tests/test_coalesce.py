@@ -0,0 +1,131 @@
+"""Tests for the coalescing of streamed LLM tokens"""
+
+import asyncio
+from typing import Any, List
+
+from langchain_core.messages import AIMessageChunk
+
+from copilotkit.coalesce import coalesce_events
+
+
+def _token(content: str, run_id: str = "run") -> dict:
+    return {
+        "event": "on_chat_model_stream",
+        "run_id": run_id,
+        "data": {"chunk": AIMessageChunk(content=content, id=run_id)},
+    }
+
+
+def _tool_call(args: str, name: Any = None, index: int = 0) -> dict:
+    return {
+        "event": "on_chat_model_stream",
+        "run_id": "run",
+        "data": {"chunk": AIMessageChunk(
+            content="",
+            id="run",
+            tool_call_chunks=[{"name": name, "args": args, "id": None, "index": index}],
+        )},
+    }
+
+
+def _coalesce(events: List[Any], **kwargs) -> List[Any]:
+    async def source():
+        for event in events:
+            yield event
+
+    async def main():
+        return [event async for event in coalesce_events(source(), **kwargs)]
+
+    return asyncio.run(main())
+
+
+def _content(event: dict) -> str:
+    return event["data"]["chunk"].content
+
+
+def test_tokens_of_a_message_are_merged():
+    events = _coalesce([_token("Hel"), _token("lo"), _token(" world")], max_delay=1.0)
+    assert [_content(event) for event in events] == ["Hello world"]
+
+
+def test_other_events_keep_their_order():
+    other = {"event": "on_custom_event", "name": "x", "data": {}}
+    events = _coalesce([_token("a"), _token("b"), other, _token("c")], max_delay=1.0)
+    assert events[1] is other
+    assert [_content(events[0]), _content(events[2])] == ["ab", "c"]
+
+
+def test_runs_are_not_merged():
+    events = _coalesce([_token("a", "one"), _token("b", "two")], max_delay=1.0)
+    assert [_content(event) for event in events] == ["a", "b"]
+
+
+def test_max_bytes_sends_merged_event():
+    events = _coalesce([_token("ab"), _token("cd"), _token("ef")], max_delay=1.0, max_bytes=4)
+    assert [_content(event) for event in events] == ["abcd", "ef"]
+
+
+def test_tool_call_arguments_are_merged_per_call():
+    events = _coalesce([
+        _tool_call('{"a"', name="first"),
+        _tool_call(': 1}'),
+        _tool_call('{"b": 2}', name="second", index=1),
+    ], max_delay=1.0)
+    calls = [event["data"]["chunk"].tool_call_chunks for event in events]
+    assert [(call[0]["name"], call[0]["args"]) for call in calls] == [
+        ("first", '{"a": 1}'),
+        ("second", '{"b": 2}'),
+    ]
+
+
+def test_pending_tokens_are_sent_after_max_delay():
+    async def main():
+        received = asyncio.Queue()
+        release = asyncio.Event()
+
+        async def source():
+            yield _token("a")
+            yield _token("b")
+            await release.wait()
+
+        async def consume():
+            async for event in coalesce_events(source(), max_delay=0.01):
+                await received.put(event)
+
+        consumer = asyncio.ensure_future(consume())
+        event = await asyncio.wait_for(received.get(), 1.0)
+        release.set()
+        await consumer
+        return event
+
+    assert _content(asyncio.run(main())) == "ab"
+
+
+def test_errors_are_raised_after_pending_tokens():
+    async def failing():
+        yield _token("a")
+        raise RuntimeError("boom")
+
+    async def main():
+        events = []
+        try:
+            async for event in coalesce_events(failing(), max_delay=1.0):
+                events.append(event)
+        except RuntimeError:
+            return events
+        raise AssertionError("the error was not raised")
+
+    assert [_content(event) for event in asyncio.run(main())] == ["a"]
+
+
+def test_message_end_is_sent_on_its_own():
+    end = _token("")
+    end["data"]["chunk"] = AIMessageChunk(
+        content="",
+        id="run",
+        response_metadata={"finish_reason": "stop"},
+    )
+    events = _coalesce([_token("Hel"), _token("lo"), end, _token("!")], max_delay=1.0)
+    assert [_content(event) for event in events] == ["Hello", "", "!"]
+    assert events[1] is end
+    assert not events[0]["data"]["chunk"].response_metadata
@@ -0,0 +1,118 @@
+"""Tests for the streaming compression of agent responses"""
+
+import asyncio
+import json
+import warnings
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from copilotkit import CopilotKitRemoteEndpoint
+from copilotkit.agent import Agent
+from copilotkit.integrations.compression import StreamCompression
+from copilotkit.integrations.fastapi import add_fastapi_endpoint
+
+
+class _Request:
+    """The part of a request used by the compression"""
+
+    def __init__(self, accept_encoding: str):
+        self.headers = {"accept-encoding": accept_encoding}
+
+
+async def _chunks():
+    yield '{"i": 0}\n'
+    yield b'{"i": 1}\n'
+    yield ""
+
+
+def _compressed_chunks(compression: StreamCompression, accept_encoding: str):
+    response = compression.apply(
+        _Request(accept_encoding), # type: ignore
+        StreamingResponse(_chunks()),
+    )
+
+    async def read():
+        return [chunk async for chunk in response.body_iterator]
+
+    return response, asyncio.run(read())
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0.5, zstd;q=0", "gzip"),
+    ("br", None),
+    ("", None),
+    ("*", "gzip"),
+])
+def test_negotiate_gzip(accept_encoding, expected):
+    compression = StreamCompression()
+    compression.levels.pop("zstd", None)
+    assert compression.negotiate(accept_encoding) == expected
+
+
+def test_negotiate_prefers_zstd():
+    pytest.importorskip("zstandard")
+    compression = StreamCompression()
+    assert compression.negotiate("gzip, zstd") == "zstd"
+    assert compression.negotiate("gzip, zstd;q=0.1") == "gzip"
+
+
+def test_every_chunk_can_be_decoded_right_away():
+    compression = StreamCompression()
+    response, chunks = _compressed_chunks(compression, "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decompressor.decompress(chunks[0]) == b'{"i": 0}\n'
+    assert decompressor.decompress(chunks[1]) == b'{"i": 1}\n'
+    assert decompressor.decompress(b"".join(chunks[2:])) == b""
+    assert decompressor.eof
+
+
+def test_zstd_stream():
+    zstandard = pytest.importorskip("zstandard")
+    response, chunks = _compressed_chunks(StreamCompression(), "zstd")
+    assert response.headers["content-encoding"] == "zstd"
+    reader = zstandard.ZstdDecompressor().decompressobj()
+    assert reader.decompress(chunks[0]) == b'{"i": 0}\n'
+    assert reader.decompress(b"".join(chunks[1:])) == b'{"i": 1}\n'
+
+
+def test_unsupported_encoding_is_not_compressed():
+    response, chunks = _compressed_chunks(StreamCompression(), "br")
+    assert "content-encoding" not in response.headers
+    assert chunks == ['{"i": 0}\n', b'{"i": 1}\n', ""]
+
+
+class _EchoAgent(Agent):
+    def execute(self, **kwargs):
+        async def events():
+            for index in range(3):
+                yield json.dumps({"i": index}) + "\n"
+        return events()
+
+    async def get_state(self, *, thread_id):
+        return {"threadId": thread_id, "threadExists": False, "state": {}, "messages": []}
+
+
+def test_agent_stream_is_compressed():
+    app = FastAPI()
+    sdk = CopilotKitRemoteEndpoint(agents=[_EchoAgent(name="echo")])
+    add_fastapi_endpoint(app, sdk, "/copilotkit", compression={"gzip_level": 1})
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        client = TestClient(app)
+    response = client.post(
+        "/copilotkit/agent/echo",
+        json={},
+        headers={"accept-encoding": "gzip"},
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    # the test client decodes the response
+    assert [json.loads(line)["i"] for line in response.text.split("\n") if line] == [0, 1, 2]
+    info = client.post("/copilotkit/info", json={}, headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in info.headers
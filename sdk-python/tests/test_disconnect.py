@@ -0,0 +1,110 @@
+"""Tests for the cancellation of agent runs when the client disconnects"""
+
+import asyncio
+
+import pytest
+
+from copilotkit.integrations.fastapi import cancel_on_disconnect
+from copilotkit.metrics import metrics
+
+
+class _Request:
+    """A request whose client disconnects after `connected_polls` polls"""
+
+    def __init__(self, connected_polls: int):
+        self.connected_polls = connected_polls
+
+    async def is_disconnected(self) -> bool:
+        self.connected_polls -= 1
+        return self.connected_polls < 0
+
+
+def test_events_are_forwarded_while_connected():
+    async def events():
+        for index in range(3):
+            yield index
+
+    async def main():
+        stream = cancel_on_disconnect(
+            _Request(1000), # type: ignore
+            events(),
+            poll_interval=0.01,
+        )
+        return [event async for event in stream]
+
+    assert asyncio.run(main()) == [0, 1, 2]
+
+
+def test_disconnect_cancels_the_agent():
+    stopped = []
+
+    async def events():
+        try:
+            yield "first"
+            await asyncio.sleep(10)
+            yield "never"
+        except asyncio.CancelledError:
+            stopped.append("cancelled")
+            raise
+
+    async def main():
+        before = metrics.get("copilotkit_runs_cancelled", route="execute_agent", name="slow")
+        stream = cancel_on_disconnect(
+            _Request(2), # type: ignore
+            events(),
+            poll_interval=0.01,
+            name="slow",
+        )
+        received = await asyncio.wait_for(_collect(stream), 1.0)
+        after = metrics.get("copilotkit_runs_cancelled", route="execute_agent", name="slow")
+        return received, after - before
+
+    received, cancelled = asyncio.run(main())
+    assert received == ["first"]
+    assert stopped == ["cancelled"]
+    assert cancelled == 1
+
+
+def test_agent_errors_are_raised():
+    async def events():
+        yield "first"
+        raise RuntimeError("boom")
+
+    async def main():
+        stream = cancel_on_disconnect(
+            _Request(1000), # type: ignore
+            events(),
+            poll_interval=0.01,
+        )
+        return await _collect(stream)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_closing_the_stream_stops_the_agent():
+    stopped = []
+
+    async def events():
+        try:
+            while True:
+                yield "event"
+        finally:
+            stopped.append("closed")
+
+    async def main():
+        stream = cancel_on_disconnect(
+            _Request(1000), # type: ignore
+            events(),
+            poll_interval=0.01,
+        )
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert stopped == ["closed"]
+
+
+async def _collect(stream):
+    return [event async for event in stream]
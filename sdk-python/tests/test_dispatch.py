@@ -0,0 +1,115 @@
+"""Tests for the acknowledged dispatch of custom events"""
+
+import asyncio
+import logging
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from copilotkit import dispatch
+from copilotkit.dispatch import (
+    ACKNOWLEDGER_KEY,
+    BATCH_EVENT,
+    EventAcknowledger,
+    dispatch_events,
+)
+
+
+def _dispatching_runnable(log: list) -> RunnableLambda:
+    async def dispatching(_input, config: RunnableConfig):
+        await dispatch_events(config, [("first", 1), ("second", 2)])
+        log.append("dispatched")
+        return None
+    return RunnableLambda(dispatching)
+
+
+async def _custom_events(events, log: list) -> list:
+    received = []
+    async for event in events:
+        if event["event"] == "on_custom_event":
+            received.append((event["name"], event["data"]))
+            # a slow consumer
+            await asyncio.sleep(0.05)
+            log.append(f"processed {event['name']}")
+    return received
+
+
+def test_wrap_acknowledges_a_batch_when_the_next_event_is_requested():
+    async def main():
+        acknowledger = EventAcknowledger()
+        dispatch_id, future = acknowledger.register()
+
+        async def events():
+            yield {"event": "on_custom_event", "name": BATCH_EVENT,
+                   "data": {"id": dispatch_id, "events": [("a", 1), ("b", 2)]}}
+            yield {"event": "on_chain_end", "name": "node", "data": {}}
+
+        wrapped = acknowledger.wrap(events())
+        assert (await anext(wrapped))["name"] == "a"
+        assert (await anext(wrapped))["data"] == 2
+        assert not future.done()
+        assert (await anext(wrapped))["event"] == "on_chain_end"
+        assert future.done()
+
+    asyncio.run(main())
+
+
+def test_closing_the_stream_releases_pending_dispatches():
+    async def main():
+        acknowledger = EventAcknowledger()
+        _, future = acknowledger.register()
+
+        async def events():
+            yield {"event": "on_chain_start", "name": "node", "data": {}}
+            await asyncio.sleep(10)
+
+        wrapped = acknowledger.wrap(events())
+        await anext(wrapped)
+        await wrapped.aclose()
+        assert future.done()
+
+    asyncio.run(main())
+
+
+def test_dispatch_waits_for_the_consumer():
+    log = []
+
+    async def main():
+        acknowledger = EventAcknowledger()
+        config: RunnableConfig = {"configurable": {ACKNOWLEDGER_KEY: acknowledger}}
+        events = _dispatching_runnable(log).astream_events(None, config, version="v2")
+        return await _custom_events(acknowledger.wrap(events), log)
+
+    assert asyncio.run(main()) == [("first", 1), ("second", 2)]
+    assert log == ["processed first", "processed second", "dispatched"]
+
+
+def test_dispatch_without_acknowledger_sends_each_event():
+    log = []
+
+    async def main():
+        events = _dispatching_runnable(log).astream_events(None, version="v2")
+        return await _custom_events(events, log)
+
+    assert asyncio.run(main()) == [("first", 1), ("second", 2)]
+    # the node does not wait for the consumer
+    assert log.index("dispatched") < log.index("processed second")
+
+
+def test_unprocessed_dispatch_times_out(monkeypatch, caplog):
+    monkeypatch.setattr(dispatch, "_ACKNOWLEDGE_TIMEOUT", 0.02)
+    log = []
+
+    async def main():
+        acknowledger = EventAcknowledger()
+        config: RunnableConfig = {"configurable": {ACKNOWLEDGER_KEY: acknowledger}}
+        # the batch is never expanded, so it is never acknowledged
+        events = _dispatching_runnable(log).astream_events(None, config, version="v2")
+        names = [event["name"] async for event in events if event["event"] == "on_custom_event"]
+        return names, acknowledger
+
+    with caplog.at_level(logging.WARNING, logger="copilotkit.dispatch"):
+        names, acknowledger = asyncio.run(main())
+    assert names == [BATCH_EVENT]
+    assert log == ["dispatched"]
+    assert "were not processed within" in caplog.text
+    assert not acknowledger._pending # pylint: disable=protected-access
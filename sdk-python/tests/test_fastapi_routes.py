@@ -0,0 +1,107 @@
+"""Tests for the routes added by `add_fastapi_endpoint`"""
+
+import asyncio
+import json
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.agent import Agent
+from copilotkit.integrations.fastapi import ROUTES, add_fastapi_endpoint
+
+
+class _EchoAgent(Agent):
+    """Streams the number of messages it received"""
+
+    def execute(self, *, messages, **kwargs): # pylint: disable=arguments-differ
+        async def events():
+            await asyncio.sleep(0)
+            yield json.dumps({"event": "echo", "messages": len(messages)}) + "\n"
+        return events()
+
+    async def get_state(self, *, thread_id):
+        return {"threadId": thread_id, "threadExists": False, "state": {}, "messages": []}
+
+
+def _greet(name: str):
+    return f"Hello, {name}!"
+
+
+@pytest.fixture(name="client", params=[False, True], ids=["event_loop", "thread_pool"])
+def fixture_client(request):
+    sdk = CopilotKitRemoteEndpoint(
+        actions=[Action(name="greet", handler=_greet)],
+        agents=[_EchoAgent(name="echo")],
+    )
+    app = FastAPI()
+    add_fastapi_endpoint(app, sdk, "/copilotkit/", use_thread_pool=request.param)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with TestClient(app) as client:
+            yield client
+
+
+def test_every_route_is_registered(client):
+    registered = {
+        (route.path, method)
+        for route in client.app.routes
+        for method in getattr(route, "methods", ())
+    }
+    for route in ROUTES:
+        for method in route.methods:
+            assert (f"/copilotkit{route.path}", method) in registered
+
+
+def test_info(client):
+    for response in (client.get("/copilotkit"), client.post("/copilotkit/info", json={})):
+        assert response.status_code == 200
+        info = response.json()
+        assert [action["name"] for action in info["actions"]] == ["greet"]
+        assert [agent["name"] for agent in info["agents"]] == ["echo"]
+
+
+def test_execute_action(client):
+    response = client.post("/copilotkit/action/greet", json={"arguments": {"name": "Ada"}})
+    assert response.status_code == 200
+    assert response.json()["result"] == "Hello, Ada!"
+    response = client.post(
+        "/copilotkit/actions/execute",
+        json={"name": "greet", "arguments": {"name": "Ada"}},
+    )
+    assert response.json()["result"] == "Hello, Ada!"
+
+
+def test_unknown_action_is_not_found(client):
+    assert client.post("/copilotkit/action/missing", json={}).status_code == 404
+
+
+def test_execute_agent_streams_ndjson(client):
+    message = {"id": "1", "role": "user", "content": "hi"}
+    for response in (
+        client.post("/copilotkit/agent/echo", json={"threadId": "t", "messages": [message]}),
+        client.post(
+            "/copilotkit/agents/execute",
+            json={"name": "echo", "threadId": "t", "state": {}, "messages": [message]},
+        ),
+    ):
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.split("\n") if line]
+        assert events == [{"event": "echo", "messages": 1}]
+
+
+def test_get_agent_state(client):
+    response = client.post("/copilotkit/agent/echo/state", json={"threadId": "t"})
+    assert response.status_code == 200
+    assert response.json()["threadId"] == "t"
+
+
+def test_missing_body_is_rejected(client):
+    assert client.post("/copilotkit/agents/execute").status_code == 400
+
+
+def test_unknown_route_is_not_found(client):
+    assert client.post("/copilotkit/unknown", json={}).status_code == 404
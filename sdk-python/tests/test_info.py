@@ -0,0 +1,88 @@
+"""Tests for the cached info endpoint"""
+
+import warnings
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.integrations.fastapi import add_fastapi_endpoint
+
+
+def _greet(name: str):
+    return f"Hello, {name}!"
+
+
+def _context(tenant: str = "a") -> dict:
+    return {"properties": {"tenant": tenant}, "frontend_url": None, "headers": {}}
+
+
+def _client(sdk: CopilotKitRemoteEndpoint) -> TestClient:
+    app = FastAPI()
+    add_fastapi_endpoint(app, sdk, "/copilotkit")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return TestClient(app)
+
+
+def test_etag_and_not_modified():
+    client = _client(CopilotKitRemoteEndpoint(actions=[Action(name="greet", handler=_greet)]))
+    response = client.post("/copilotkit/info", json={})
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    not_modified = client.post("/copilotkit/info", json={}, headers={"if-none-match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    weak = client.get("/copilotkit", headers={"if-none-match": f'"other", W/{etag}'})
+    assert weak.status_code == 304
+    assert client.get("/copilotkit", headers={"if-none-match": '"other"'}).status_code == 200
+
+
+def test_html_has_its_own_etag():
+    client = _client(CopilotKitRemoteEndpoint(actions=[Action(name="greet", handler=_greet)]))
+    json_etag = client.get("/copilotkit").headers["etag"]
+    html = client.get("/copilotkit", headers={"accept": "text/html"})
+    assert html.headers["content-type"].startswith("text/html")
+    assert html.headers["etag"] != json_etag
+    assert client.get(
+        "/copilotkit",
+        headers={"accept": "text/html", "if-none-match": html.headers["etag"]},
+    ).status_code == 304
+
+
+def test_etag_changes_with_actions():
+    actions = [Action(name="greet", handler=_greet)]
+    sdk = CopilotKitRemoteEndpoint(actions=actions)
+    first = sdk.cached_info(context=_context())
+    assert sdk.cached_info(context=_context()) is first
+    actions.append(Action(name="other", handler=_greet))
+    second = sdk.cached_info(context=_context())
+    assert second.etag != first.etag
+    assert [action["name"] for action in second.info["actions"]] == ["greet", "other"]
+
+
+def test_unkeyed_factories_are_not_cached():
+    sdk = CopilotKitRemoteEndpoint(
+        actions=lambda context: [Action(name="greet", handler=_greet)],
+    )
+    first = sdk.cached_info(context=_context())
+    second = sdk.cached_info(context=_context())
+    assert first is not second
+    assert first.etag == second.etag
+
+
+def test_keyed_factories_are_cached_per_key():
+    sdk = CopilotKitRemoteEndpoint(
+        actions=lambda context: [
+            Action(name=f"greet_{context['properties']['tenant']}", handler=_greet)
+        ],
+        factory_cache_key=lambda context: context["properties"]["tenant"],
+    )
+    first = sdk.cached_info(context=_context("a"))
+    assert sdk.cached_info(context=_context("a")) is first
+    other = sdk.cached_info(context=_context("b"))
+    assert other.etag != first.etag
+    assert other.info["actions"][0]["name"] == "greet_b"
@@ -0,0 +1,65 @@
+"""Tests for the incremental JSON parser"""
+
+import json
+
+import pytest
+
+from copilotkit.partial_json import IncrementalJSONParser
+
+
+def test_values_while_streaming():
+    parser = IncrementalJSONParser()
+    parser.feed('{"title": "Hel')
+    assert parser.value == {"title": "Hel"}
+    assert parser.changed_keys == {"title"}
+
+    parser.feed('lo", "tags": ["a"')
+    assert parser.value == {"title": "Hello", "tags": ["a"]}
+    assert parser.changed_keys == {"title", "tags"}
+
+    parser.feed(', tr')
+    assert parser.value == {"title": "Hello", "tags": ["a", True]}
+    assert parser.changed_keys == {"tags"}
+
+    parser.feed('ue], "n": 1')
+    parser.feed('2}')
+    assert parser.value == {"title": "Hello", "tags": ["a", True], "n": 12}
+
+
+def test_earlier_values_are_not_changed():
+    parser = IncrementalJSONParser()
+    parser.feed('{"items": [1')
+    before = parser.value
+    parser.feed(', 2]}')
+    assert before == {"items": [1]}
+    assert parser.value == {"items": [1, 2]}
+
+
+def test_key_without_value_maps_to_none():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": 1, "b"')
+    assert parser.value == {"a": 1, "b": None}
+
+
+@pytest.mark.parametrize("document", [
+    {"text": "line\nbreak \"quoted\" \\ é \U0001f600  "},
+    {"nested": {"list": [1, -2.5, 3e2, None, False, {"k": []}]}, "empty": {}},
+    [1, "two", [3]],
+])
+def test_any_split_matches_json_loads(document):
+    text = json.dumps(document)
+    for size in (1, 2, 7):
+        parser = IncrementalJSONParser()
+        for start in range(0, len(text), size):
+            parser.feed(text[start:start + size])
+        assert parser.value == json.loads(text)
+
+
+def test_invalid_json_raises_and_keeps_value():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": 1, ')
+    with pytest.raises(ValueError):
+        parser.feed('x')
+    assert parser.value == {"a": 1}
+    with pytest.raises(ValueError):
+        parser.feed('"b": 2}')
@@ -0,0 +1,110 @@
+"""Tests for the projection of the LangGraph events sent to the client"""
+
+import asyncio
+import json
+import warnings
+
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, MessagesState, StateGraph
+
+from copilotkit import LangGraphAgent
+from copilotkit.projection import EventProjection
+
+
+def _event(event_type: str, name: str = "node", **data) -> dict:
+    return {"event": event_type, "name": name, "run_id": "r", "data": data}
+
+
+def test_only_subscribed_events_are_kept():
+    projection = EventProjection()
+    assert projection.project(_event("on_chain_start", input={})) is None
+    assert projection.project(_event("on_chat_model_end", output={})) is None
+    chunk = _event("on_chat_model_stream", chunk="c")
+    assert projection.project(chunk) is chunk
+
+
+def test_excluded_names_are_dropped():
+    projection = EventProjection({"exclude_names": ["internal"]})
+    assert projection.project(_event("on_custom_event", name="internal")) is None
+    assert projection.project(_event("on_custom_event", name="public")) is not None
+
+
+def test_payloads_are_stripped():
+    projection = EventProjection({"events": ["on_chain_end", "on_custom_event"]})
+    event = _event("on_chain_end", input={"a": 1}, output={"b": 2}, chunk="c")
+    assert projection.project(event)["data"] == {"chunk": "c"}
+    assert event["data"]["input"] == {"a": 1}
+    # custom events carry the user's payload
+    custom = _event("on_custom_event", input="kept")
+    assert projection.project(custom) is custom
+
+    unstripped = EventProjection({"events": ["on_chain_end"], "strip_payloads": False})
+    assert unstripped.project(event) is event
+
+
+def test_astream_events_kwargs():
+    projection = EventProjection({"exclude_names": ["node", "noise"]})
+    assert projection.astream_events_kwargs(required_names=["node"]) == {
+        "exclude_types": ["llm", "tool", "retriever", "prompt", "parser"],
+        "exclude_names": ["noise"],
+    }
+    tools = EventProjection({"events": ["on_tool_end", "on_chat_model_stream"]})
+    assert "tool" not in tools.astream_events_kwargs()["exclude_types"]
+    assert EventProjection({"push_down": False}).astream_events_kwargs() == {}
+
+
+def _run(event_projection) -> list:
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="hello there", id="ai")]))
+
+    async def chat(state, config: RunnableConfig):
+        await adispatch_custom_event("progress", {"step": 1}, config=config)
+        return {"messages": [await model.ainvoke(state["messages"], config)]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("chat", chat)
+    graph.set_entry_point("chat")
+    graph.add_edge("chat", END)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        agent = LangGraphAgent(
+            name="agent",
+            graph=graph.compile(checkpointer=MemorySaver()),
+            event_projection=event_projection,
+        )
+
+    async def main():
+        events = []
+        async for chunk in agent.execute(
+                state={},
+                messages=[{"id": "u", "type": "TextMessage", "role": "user", "content": "hi"}],
+                thread_id="t",
+                actions=[],
+            ):
+            events.extend(json.loads(line) for line in chunk.split("\n") if line)
+        return events
+
+    return asyncio.run(main())
+
+
+def test_agent_sends_only_projected_events():
+    events = _run(True)
+    types = {event["event"] for event in events}
+    assert types == {"on_chat_model_stream", "on_custom_event", "on_copilotkit_state_sync"}
+    assert all("input" not in event.get("data", {}) for event in events)
+    tokens = "".join(
+        event["data"]["chunk"]["kwargs"]["content"]
+        for event in events if event["event"] == "on_chat_model_stream"
+    )
+    assert tokens == "hello there"
+    # the state is synced as without projection
+    final = [event for event in events if event["event"] == "on_copilotkit_state_sync"][-1]
+    assert final["state"]["messages"][-1]["content"] == "hello there"
+
+
+def test_agent_without_projection_sends_every_event():
+    types = {event["event"] for event in _run(False)}
+    assert {"on_chain_start", "on_chat_model_start", "on_chat_model_end"} <= types
@@ -0,0 +1,113 @@
+"""Tests for the indexed registry and the memoized factories"""
+
+import time
+
+import pytest
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.exc import ActionNotFoundException
+from copilotkit.registry import FactoryCache, Registry
+
+
+class _Named: # pylint: disable=too-few-public-methods
+    def __init__(self, name: str):
+        self.name = name
+
+
+def _greet():
+    return "hello"
+
+
+def _context(tenant: str) -> dict:
+    return {"properties": {"tenant": tenant}, "frontend_url": None, "headers": {}}
+
+
+def test_registry_looks_up_by_name():
+    first, second = _Named("a"), _Named("b")
+    registry = Registry([first, second], kind="action")
+    assert registry.get("a") is first
+    assert registry.get("b") is second
+    assert registry.get("c") is None
+
+
+def test_duplicate_names():
+    first, duplicate = _Named("a"), _Named("a")
+    assert Registry([first, duplicate], kind="action").get("a") is first
+    with pytest.raises(ValueError):
+        Registry([first, duplicate], kind="action", strict=True)
+
+
+def test_registry_tracks_its_list():
+    items = [_Named("a")]
+    registry = Registry(items, kind="action")
+    assert registry.indexes(items)
+    assert not registry.indexes([_Named("a")])
+    items.append(_Named("b"))
+    assert not registry.indexes(items)
+
+
+def test_static_actions_are_reindexed_when_appended():
+    actions = [Action(name="greet", handler=_greet)]
+    sdk = CopilotKitRemoteEndpoint(actions=actions)
+    # pylint: disable=protected-access
+    assert sdk._get_action(context=_context("a"), name="greet") is actions[0]
+    actions.append(Action(name="later", handler=_greet))
+    assert sdk._get_action(context=_context("a"), name="later") is actions[1]
+    with pytest.raises(ActionNotFoundException):
+        sdk._get_action(context=_context("a"), name="missing")
+
+
+def test_duplicate_static_actions_are_rejected():
+    with pytest.raises(ValueError):
+        CopilotKitRemoteEndpoint(actions=[
+            Action(name="greet", handler=_greet),
+            Action(name="greet", handler=_greet),
+        ])
+
+
+def test_factory_is_memoized_per_key():
+    calls = []
+
+    def actions(context):
+        calls.append(context["properties"]["tenant"])
+        return [Action(name="greet", handler=_greet)]
+
+    sdk = CopilotKitRemoteEndpoint(
+        actions=actions,
+        factory_cache_key=lambda context: context["properties"]["tenant"],
+    )
+    # pylint: disable=protected-access
+    first = sdk._get_action(context=_context("a"), name="greet")
+    assert sdk._get_action(context=_context("a"), name="greet") is first
+    assert sdk._get_action(context=_context("b"), name="greet") is not first
+    assert calls == ["a", "b"]
+
+
+def test_factory_without_key_is_called_every_time():
+    calls = []
+
+    def actions(_context):
+        calls.append(None)
+        return [Action(name="greet", handler=_greet)]
+
+    sdk = CopilotKitRemoteEndpoint(actions=actions)
+    sdk._get_action(context=_context("a"), name="greet") # pylint: disable=protected-access
+    sdk._get_action(context=_context("a"), name="greet") # pylint: disable=protected-access
+    assert len(calls) == 2
+
+
+def test_factory_cache_expires_and_evicts():
+    cache = FactoryCache(kind="action", ttl=0.01, max_entries=1)
+    built = []
+
+    def build():
+        built.append(None)
+        return Registry([], kind="action")
+
+    first = cache.get_or_build("a", build)
+    assert cache.get_or_build("a", build) is first
+    time.sleep(0.02)
+    assert cache.get_or_build("a", build) is not first
+    cache.get_or_build("b", build)
+    cache.get_or_build("a", build)
+    assert len(built) == 4
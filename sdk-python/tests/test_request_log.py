@@ -0,0 +1,115 @@
+"""Tests for request logging"""
+
+import asyncio
+import json
+import logging
+
+import pytest
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.request_log import RequestLogger
+
+_LOGGER = "copilotkit.tests.request_log"
+
+
+def _context(request_id: str = "") -> dict:
+    headers = {"x-request-id": request_id} if request_id else {}
+    return {"properties": {}, "frontend_url": None, "headers": headers}
+
+
+def _records(caplog, name: str) -> list:
+    return [json.loads(record.getMessage()) for record in caplog.records if record.name == name]
+
+
+def test_fields_are_not_built_when_info_is_disabled(caplog):
+    logger = logging.getLogger(_LOGGER)
+    request_logger = RequestLogger(logger)
+
+    def fields():
+        raise AssertionError("fields should not be built")
+
+    with caplog.at_level(logging.WARNING, logger=_LOGGER):
+        assert request_logger.start("info", title="Info", fields=fields) is None
+
+
+def test_unsampled_requests_are_not_logged(caplog):
+    request_logger = RequestLogger(logging.getLogger(_LOGGER), sample_rate=0)
+    with caplog.at_level(logging.INFO, logger=_LOGGER):
+        assert request_logger.start("info", title="Info", fields=list) is None
+    assert not caplog.records
+
+
+def test_json_records(caplog):
+    request_logger = RequestLogger(logging.getLogger(_LOGGER), format="json", max_field_size=12)
+    with caplog.at_level(logging.INFO, logger=_LOGGER):
+        request_log = request_logger.start(
+            "execute_agent",
+            title="Agent",
+            headers={"x-request-id": "abc"},
+            name="agent",
+            thread_id="thread",
+            fields=lambda: [("short", "text"), ("long", "x" * 22), ("nested", {"a": [1, 2]})],
+        )
+        request_log.finish()
+        request_log.finish()
+
+    started, finished = _records(caplog, _LOGGER)
+    assert started["event"] == "request_started"
+    assert started["request_id"] == "abc"
+    assert started["name"] == "agent"
+    assert started["thread_id"] == "thread"
+    assert started["fields"]["short"] == "text"
+    assert started["fields"]["long"] == "x" * 12 + "... (10 more characters)"
+    assert started["fields"]["nested"] == {"a": [1, 2]}
+    assert finished["event"] == "request_finished"
+    assert finished["status"] == "ok"
+    assert finished["duration_ms"] >= 0
+
+
+def test_text_fields_are_truncated(caplog):
+    request_logger = RequestLogger(logging.getLogger(_LOGGER), max_field_size=10)
+    with caplog.at_level(logging.INFO, logger=_LOGGER):
+        request_logger.start("info", title="Info", fields=lambda: [("long", "x" * 50)])
+    assert "more characters)" in caplog.records[0].getMessage()
+
+
+def test_stream_errors_are_logged(caplog):
+    request_logger = RequestLogger(logging.getLogger(_LOGGER), format="json")
+
+    async def events():
+        yield 1
+        raise RuntimeError("boom")
+
+    async def main():
+        request_log = request_logger.start("execute_agent", title="Agent", fields=list)
+        async for _ in request_log.wrap_stream(events()):
+            pass
+
+    with caplog.at_level(logging.INFO, logger=_LOGGER):
+        with pytest.raises(RuntimeError):
+            asyncio.run(main())
+    assert _records(caplog, _LOGGER)[-1]["status"] == "RuntimeError"
+
+
+def test_sdk_logs_action_requests(caplog):
+    async def greet(name):
+        return f"hello {name}"
+
+    sdk = CopilotKitRemoteEndpoint(
+        actions=[Action(name="greet", handler=greet)],
+        request_logging={"format": "json"},
+    )
+    with caplog.at_level(logging.INFO, logger="copilotkit.sdk"):
+        result = asyncio.run(sdk.execute_action(
+            context=_context("req-1"),
+            name="greet",
+            arguments={"name": "world"},
+        ))
+    assert result["result"] == "hello world"
+
+    started, finished = _records(caplog, "copilotkit.sdk")
+    assert started["kind"] == "execute_action"
+    assert started["request_id"] == "req-1"
+    assert started["fields"]["Arguments"] == {"name": "world"}
+    assert finished["request_id"] == "req-1"
+    assert finished["status"] == "ok"
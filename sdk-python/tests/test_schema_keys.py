@@ -0,0 +1,88 @@
+"""Tests for the cached schema keys of LangGraph agents"""
+
+import warnings
+from typing import List
+
+from langchain_core.messages import AnyMessage
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import Annotated, TypedDict
+
+from copilotkit import LangGraphAgent
+
+
+class _Input(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    question: str
+
+
+class _Output(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    answer: str
+
+
+class _State(_Input, _Output):
+    scratch: str
+
+
+def _agent() -> LangGraphAgent:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        graph = StateGraph(_State, input=_Input, output=_Output)
+        graph.add_node("respond", lambda state: {"answer": state["question"]})
+        graph.set_entry_point("respond")
+        graph.add_edge("respond", END)
+        return LangGraphAgent(name="agent", graph=graph.compile())
+
+
+def _count_schema_calls(agent: LangGraphAgent) -> list:
+    calls = []
+    get_input_jsonschema = agent.graph.get_input_jsonschema
+
+    def counting(config=None):
+        calls.append(config)
+        return get_input_jsonschema(config)
+
+    agent.graph.get_input_jsonschema = counting
+    return calls
+
+
+def test_schema_keys_include_the_constant_keys():
+    schema_keys = _agent().get_schema_keys({"configurable": {}})
+    assert set(schema_keys.input) == {"messages", "question", "copilotkit"}
+    assert set(schema_keys.output) == {"messages", "answer", "copilotkit"}
+    assert schema_keys.config is None
+
+
+def test_schema_keys_are_computed_once_per_config_shape():
+    agent = _agent()
+    calls = _count_schema_calls(agent)
+    first = agent.get_schema_keys({"configurable": {"thread_id": "a"}})
+    assert agent.get_schema_keys({"configurable": {"thread_id": "b"}}) is first
+    assert len(calls) == 1
+    agent.get_schema_keys({"configurable": {"thread_id": "a", "model": "x"}})
+    assert len(calls) == 2
+
+
+def test_failures_are_cached():
+    agent = _agent()
+    calls = []
+
+    def failing(config=None):
+        calls.append(config)
+        raise ValueError("no schema")
+
+    agent.graph.get_input_jsonschema = failing
+    assert agent.get_schema_keys({}) is None
+    assert agent.get_schema_keys({}) is None
+    assert len(calls) == 1
+
+
+def test_state_is_filtered_on_the_schema_keys():
+    agent = _agent()
+    schema_keys = agent.get_schema_keys({})
+    state = {"question": "q", "scratch": "s", "messages": []}
+    assert agent.filter_state_on_schema_keys(state, schema_keys.input) == {
+        "question": "q", "messages": [],
+    }
+    assert agent.filter_state_on_schema_keys(state, None) is state
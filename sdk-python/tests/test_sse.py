@@ -0,0 +1,121 @@
+"""Tests for the Server-Sent Events transport"""
+
+import asyncio
+import json
+from typing import Any, List, cast
+
+import pytest
+
+from copilotkit.integrations.sse import SSEResumeError, SSERunRegistry
+
+
+class _Request:
+    """The part of a request used by the registry"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def _events(count: int, delay: float = 0.0):
+    async def events():
+        for index in range(count):
+            await asyncio.sleep(delay)
+            # U+2028 must not split an event
+            yield json.dumps({"i": index, "text": "a\u2028b"}, ensure_ascii=False) + "\n"
+    return events()
+
+
+async def _read(response: Any, count: int = -1) -> List[str]:
+    """The ids of the events of an SSE response"""
+    ids = []
+    body = response.body_iterator
+    async for chunk in body:
+        if chunk.startswith("id: "):
+            event_id, data = chunk.split("\n")[:2]
+            event_id = event_id[len("id: "):]
+            event = json.loads(data[len("data: "):])
+            assert event == {"i": int(event_id.split(":")[1]) - 1, "text": "a\u2028b"}
+            ids.append(event_id)
+        if len(ids) == count:
+            break
+    await body.aclose()
+    return ids
+
+
+def test_run_is_streamed_with_event_ids():
+    async def main():
+        registry = SSERunRegistry()
+        response = registry.start(_events(3), request=cast(Any, _Request()), name="agent")
+        assert response.media_type == "text/event-stream"
+        ids = await _read(response)
+        assert [event_id.split(":")[1] for event_id in ids] == ["1", "2", "3"]
+
+    asyncio.run(main())
+
+
+def test_resume_after_last_event_id():
+    async def main():
+        registry = SSERunRegistry(resume_timeout=1.0)
+        request = cast(Any, _Request())
+        first = await _read(registry.start(_events(6, 0.01), request=request, name="agent"), 2)
+        resumed = await _read(registry.resume(first[-1], request=request))
+        run_id = first[0].split(":")[0]
+        assert first + resumed == [f"{run_id}:{seq}" for seq in range(1, 7)]
+
+    asyncio.run(main())
+
+
+def test_resume_errors():
+    async def main():
+        registry = SSERunRegistry(replay_buffer_size=2)
+        request = cast(Any, _Request())
+        ids = await _read(registry.start(_events(5), request=request, name="agent"))
+        run_id = ids[0].split(":")[0]
+        with pytest.raises(SSEResumeError) as not_found:
+            registry.resume("unknown:1", request=request)
+        assert not_found.value.status_code == 404
+        with pytest.raises(SSEResumeError) as evicted:
+            registry.resume(f"{run_id}:1", request=request)
+        assert evicted.value.status_code == 410
+
+    asyncio.run(main())
+
+
+def test_unsubscribed_run_is_cancelled():
+    async def main():
+        registry = SSERunRegistry(resume_timeout=0.01)
+        cancelled = asyncio.Event()
+
+        async def events():
+            try:
+                await asyncio.sleep(10)
+                yield "never\n"
+            finally:
+                cancelled.set()
+
+        registry.start(events(), request=cast(Any, _Request()), name="agent")
+        await asyncio.wait_for(cancelled.wait(), 1.0)
+
+    asyncio.run(main())
+
+
+def test_oldest_run_is_cancelled_beyond_max_runs():
+    async def main():
+        registry = SSERunRegistry(max_runs=1)
+        request = cast(Any, _Request())
+        cancelled = asyncio.Event()
+
+        async def events():
+            try:
+                await asyncio.sleep(10)
+                yield "never\n"
+            finally:
+                cancelled.set()
+
+        registry.start(events(), request=request, name="agent")
+        await asyncio.sleep(0)
+        response = registry.start(_events(1), request=request, name="agent")
+        await asyncio.wait_for(cancelled.wait(), 1.0)
+        assert len(await _read(response)) == 1
+
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Tests for the throttling of copilotkit_emit_state"""
+
+import asyncio
+import json
+import operator
+import warnings
+from typing import Annotated, List
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, MessagesState, StateGraph
+
+from copilotkit import LangGraphAgent
+from copilotkit.langgraph import copilotkit_emit_many, copilotkit_emit_state
+
+
+class _State(MessagesState):
+    done: Annotated[list, operator.add]
+    who: str
+    i: int
+
+
+def _emitting_node(
+        who: str,
+        emits: int,
+        delay: float = 0.0,
+        nested: bool = False,
+        final: bool = True,
+    ):
+    async def emit(index: int, config: RunnableConfig):
+        await copilotkit_emit_state(config, {"who": who, "i": index})
+        return index
+
+    async def node(_state, config: RunnableConfig):
+        for index in range(emits):
+            if nested:
+                # e.g. a tool emitting the state
+                await RunnableLambda(emit).ainvoke(index, config)
+            else:
+                await emit(index, config)
+            await asyncio.sleep(delay)
+        # parallel nodes cannot all write the same keys
+        return {"done": [who], "who": f"{who} done", "i": -1} if final else {"done": [who]}
+    return node
+
+
+def _states(graph: StateGraph, interval: float) -> List[tuple]:
+    """The distinct states synced while running the graph, as (node, who, i)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        agent = LangGraphAgent(
+            name="agent",
+            graph=graph.compile(checkpointer=MemorySaver()),
+            state_emit_interval=interval,
+        )
+
+    async def main():
+        states = []
+        async for chunk in agent.execute(
+                state={},
+                messages=[{"id": "u", "type": "TextMessage", "role": "user", "content": "hi"}],
+                thread_id="t",
+                actions=[],
+            ):
+            for line in chunk.split("\n"):
+                event = json.loads(line) if line else {}
+                if event.get("event") == "on_copilotkit_state_sync":
+                    state = event["state"]
+                    synced = (event["node_name"], state.get("who"), state.get("i"))
+                    # the agent syncs a state again when the node moves on
+                    if not states or states[-1] != synced:
+                        states.append(synced)
+        return states
+
+    return asyncio.run(main())
+
+
+def _single_node_graph(node) -> StateGraph:
+    graph = StateGraph(_State)
+    graph.add_node("work", node)
+    graph.set_entry_point("work")
+    graph.add_edge("work", END)
+    return graph
+
+
+def _emitted(states: List[tuple], who: str) -> List[int]:
+    return [index for _node, state_who, index in states if state_who == who]
+
+
+def test_emits_are_coalesced_to_the_latest():
+    states = _states(_single_node_graph(_emitting_node("work", 20)), interval=10)
+    # the first state is sent right away, the latest one when the node ends
+    assert _emitted(states, "work") == [0, 19]
+    assert states.index(("work", "work", 19)) < states.index(("work", "work done", -1))
+
+
+def test_nested_emits_are_flushed_before_the_node_ends():
+    states = _states(_single_node_graph(_emitting_node("work", 20, nested=True)), interval=10)
+    assert _emitted(states, "work") == [0, 19]
+    final = states.index(("work", "work done", -1))
+    assert all(who != "work" for _node, who, _index in states[final:])
+
+
+def test_without_interval_every_state_is_emitted():
+    states = _states(_single_node_graph(_emitting_node("work", 5)), interval=0)
+    assert _emitted(states, "work") == [0, 1, 2, 3, 4]
+
+
+def test_parallel_nodes_are_throttled_independently():
+    graph = StateGraph(_State)
+    graph.add_node("start", lambda _state: {})
+    graph.add_node("a", _emitting_node("a", 3, final=False))
+    graph.add_node("b", _emitting_node("b", 20, delay=0.005, final=False))
+    graph.set_entry_point("start")
+    graph.add_edge("start", "a")
+    graph.add_edge("start", "b")
+    graph.add_edge("a", END)
+    graph.add_edge("b", END)
+
+    states = _states(graph, interval=0.05)
+    emitted_a = _emitted(states, "a")
+    emitted_b = _emitted(states, "b")
+    assert emitted_a[0] == 0 and emitted_a[-1] == 2
+    assert emitted_b[0] == 0 and emitted_b[-1] == 19
+    assert len(emitted_b) < 20
+    # the final state of b keeps the state it emitted last
+    assert [state for state in states if state[0] == "b"][-1] == ("b", "b", 19)
+
+
+def test_emit_many_supersedes_held_state():
+    async def node(_state, config: RunnableConfig):
+        await copilotkit_emit_state(config, {"who": "held", "i": 0})
+        await copilotkit_emit_state(config, {"who": "held", "i": 1})
+        await copilotkit_emit_many(config, [{"type": "state", "state": {"who": "many", "i": 2}}])
+        return {"who": "work done", "i": -1}
+
+    states = _states(_single_node_graph(node), interval=10)
+    assert _emitted(states, "held") == [0]
+    assert _emitted(states, "many") == [2]
@@ -0,0 +1,117 @@
+"""Tests for delta state sync"""
+
+import copy
+import random
+from typing import Any
+
+import pytest
+
+from copilotkit.state_sync import DeltaStateSync, make_patch
+
+
+def _apply(document: Any, patch: list) -> Any:
+    """A minimal RFC 6902 implementation for the operations make_patch produces"""
+    document = copy.deepcopy(document)
+    for operation in patch:
+        path = operation["path"]
+        if path == "":
+            document = copy.deepcopy(operation["value"])
+            continue
+        *parents, last = [
+            part.replace("~1", "/").replace("~0", "~") for part in path.split("/")[1:]
+        ]
+        target = document
+        for part in parents:
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        if isinstance(target, list):
+            if operation["op"] == "add":
+                target.insert(int(last), copy.deepcopy(operation["value"]))
+            elif operation["op"] == "remove":
+                del target[int(last)]
+            else:
+                target[int(last)] = copy.deepcopy(operation["value"])
+        elif operation["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = copy.deepcopy(operation["value"])
+    return document
+
+
+def _random_value(rng: random.Random, depth: int = 0) -> Any:
+    roll = rng.random()
+    if depth > 3 or roll < 0.4:
+        return rng.choice([1, "a", "b/c~", None, True, 2.5])
+    if roll < 0.7:
+        return {
+            rng.choice(["a", "b", "c/", "~d"]): _random_value(rng, depth + 1)
+            for _ in range(rng.randint(0, 4))
+        }
+    return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+
+def test_patch_operations():
+    old = {"list": [1, 2, 3], "dict": {"k": 1}, "gone": True}
+    new = {"list": [1, 5], "dict": {"k": 1, "n": 2}}
+    assert make_patch(old, new) == [
+        {"op": "remove", "path": "/gone"},
+        {"op": "replace", "path": "/list/1", "value": 5},
+        {"op": "remove", "path": "/list/2"},
+        {"op": "add", "path": "/dict/n", "value": 2},
+    ]
+
+
+def test_keys_are_escaped():
+    assert make_patch({}, {"a/b~c": 1}) == [{"op": "add", "path": "/a~1b~0c", "value": 1}]
+
+
+def test_equal_documents_have_empty_patch():
+    assert not make_patch({"a": [1, {"b": 2}]}, {"a": [1, {"b": 2}]})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_patch_turns_old_into_new(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        old = {"x": _random_value(rng), "y": _random_value(rng)}
+        new = {"x": _random_value(rng), "y": old["y"] if rng.random() < 0.5 else _random_value(rng)}
+        assert _apply(old, make_patch(old, new)) == new
+
+
+def test_state_mutated_in_place():
+    sync = DeltaStateSync()
+    state = {"items": [1]}
+    assert sync.patch(state) is None
+    state["items"].append(2)
+    assert sync.patch(state) == [{"op": "add", "path": "/items/1", "value": 2}]
+    assert sync.patch(state) == []
+
+
+def test_snapshot_interval_counts_changes_only():
+    sync = DeltaStateSync(snapshot_interval=2)
+    assert sync.patch({"n": 0}) is None
+    assert sync.patch({"n": 1})
+    assert sync.patch({"n": 1}) == []
+    assert sync.patch({"n": 2})
+    assert sync.patch({"n": 3}) is None
+
+
+def test_empty_patch_is_skipped_unless_context_changed():
+    sync = DeltaStateSync()
+    assert not sync.skip(sync.patch({"n": 0}), ("node", True))
+    assert sync.skip(sync.patch({"n": 0}), ("node", True))
+    assert not sync.skip(sync.patch({"n": 0}), ("node", False))
+    assert not sync.skip(sync.patch({"n": 1}), ("node", False))
+
+
+@pytest.mark.parametrize("old, new", [(1, True), (True, 1), (1, 1.0), (0, False)])
+def test_type_changes_are_patched(old, new):
+    patch = make_patch({"value": old}, {"value": new})
+    assert patch == [{"op": "replace", "path": "/value", "value": new}]
+    assert type(patch[0]["value"]) is type(new) # pylint: disable=unidiomatic-typecheck
+
+
+def test_type_change_updates_base():
+    sync = DeltaStateSync()
+    sync.patch({"flag": 1})
+    assert sync.patch({"flag": True}) == [{"op": "replace", "path": "/flag", "value": True}]
+    assert sync.patch({"flag": True}) == []
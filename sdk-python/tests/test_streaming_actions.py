@@ -0,0 +1,159 @@
+"""Tests for streaming actions"""
+
+import asyncio
+import json
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import Action, ActionProgress, CopilotKitRemoteEndpoint
+from copilotkit.exc import ActionTimeoutException
+from copilotkit.integrations.fastapi import add_fastapi_endpoint
+
+
+async def _count(n):
+    for index in range(n):
+        yield ActionProgress(progress=index / n, message=f"step {index}")
+        yield index
+
+
+async def _fail():
+    yield 1
+    raise RuntimeError("boom")
+
+
+async def _collect(events) -> list:
+    return [event async for event in events]
+
+
+def _client(*actions: Action) -> TestClient:
+    app = FastAPI()
+    add_fastapi_endpoint(app, CopilotKitRemoteEndpoint(actions=list(actions)), "/copilotkit")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return TestClient(app)
+
+
+def test_stream_yields_progress_chunks_and_result():
+    action = Action(name="count", handler=_count, parameters=[{"name": "n", "type": "number"}])
+    events = asyncio.run(_collect(action.stream(arguments={"n": "2"})))
+    assert events == [
+        {"type": "progress", "progress": 0.0, "message": "step 0"},
+        {"type": "chunk", "data": 0},
+        {"type": "progress", "progress": 0.5, "message": "step 1"},
+        {"type": "chunk", "data": 1},
+        {"type": "result", "result": None},
+    ]
+
+
+def test_execute_collects_chunks():
+    action = Action(name="count", handler=_count)
+    assert asyncio.run(action.execute(arguments={"n": 3})) == {"result": [0, 1, 2]}
+
+
+def test_aggregate_folds_chunks():
+    action = Action(
+        name="count",
+        handler=_count,
+        aggregate=lambda total, chunk: (total or 0) + chunk,
+    )
+    assert asyncio.run(action.execute(arguments={"n": 4})) == {"result": 6}
+    events = asyncio.run(_collect(action.stream(arguments={"n": 4})))
+    assert events[-1] == {"type": "result", "result": 6}
+
+
+def test_unstreamed_handler_streams_its_result():
+    action = Action(name="double", handler=lambda value: value * 2)
+    events = asyncio.run(_collect(action.stream(arguments={"value": 2})))
+    assert events == [{"type": "result", "result": 4}]
+
+
+def test_stream_times_out():
+    async def slow():
+        yield 1
+        await asyncio.sleep(10)
+        yield 2
+
+    action = Action(name="slow", handler=slow, timeout=0.02)
+    with pytest.raises(ActionTimeoutException):
+        asyncio.run(action.execute(arguments={}))
+
+
+def test_limiter_is_released_when_the_consumer_stops():
+    closed = []
+
+    async def endless():
+        try:
+            while True:
+                yield 1
+                await asyncio.sleep(0)
+        finally:
+            closed.append(True)
+
+    action = Action(name="endless", handler=endless, max_concurrency=1)
+
+    async def main():
+        events = action.stream(arguments={})
+        assert (await anext(events))["type"] == "chunk"
+        await events.aclose()
+        # the slot is free again
+        events = action.stream(arguments={})
+        await asyncio.wait_for(anext(events), 1)
+        await events.aclose()
+
+    asyncio.run(main())
+    assert closed == [True, True]
+    assert action._limiter._active == 0 # pylint: disable=protected-access
+
+
+def test_ndjson_endpoint():
+    client = _client(Action(name="count", handler=_count))
+    response = client.post("/copilotkit/action/count", json={"arguments": {"n": 2}, "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["progress", "chunk", "progress", "chunk", "result"]
+
+    response = client.post(
+        "/copilotkit/action/count",
+        json={"arguments": {"n": 1}},
+        headers={"accept": "application/x-ndjson"},
+    )
+    assert [json.loads(line)["type"] for line in response.text.splitlines()] == [
+        "progress", "chunk", "result",
+    ]
+
+
+def test_sse_endpoint():
+    client = _client(Action(name="count", handler=_count))
+    response = client.post(
+        "/copilotkit/action/count",
+        json={"arguments": {"n": 1}},
+        headers={"accept": "text/event-stream"},
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(block.removeprefix("data: "))
+        for block in response.text.split("\n\n") if block
+    ]
+    assert events[-1] == {"type": "result", "result": None}
+
+
+def test_errors_after_the_first_event_end_the_stream():
+    client = _client(Action(name="fail", handler=_fail))
+    response = client.post("/copilotkit/action/fail", json={"stream": True})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events == [{"type": "chunk", "data": 1}, {"type": "error", "error": "boom"}]
+
+
+def test_errors_before_the_first_event_keep_their_status():
+    client = _client(Action(name="count", handler=_count, parameters=[
+        {"name": "n", "type": "number"},
+    ]))
+    response = client.post("/copilotkit/action/count", json={"arguments": {}, "stream": True})
+    assert response.status_code == 422
+    response = client.post("/copilotkit/action/missing", json={"stream": True})
+    assert response.status_code == 404
@@ -0,0 +1,73 @@
+"""Tests for the thread state cache"""
+
+import time
+
+from copilotkit.thread_state import ThreadStateCache
+
+
+def test_get_returns_copy():
+    cache = ThreadStateCache(agent="agent")
+    cache.put("t1", {"a": 1})
+    state = cache.get("t1")
+    assert state == {"a": 1}
+    state["b"] = 2
+    assert cache.get("t1") == {"a": 1}
+    assert cache.get("t2") is None
+
+
+def test_invalidation_drops_state_read_before():
+    cache = ThreadStateCache(agent="agent")
+    epoch = cache.epoch()
+    cache.invalidate("t1")
+    cache.put("t1", {"stale": True}, epoch)
+    assert cache.get("t1") is None
+    cache.put("t1", {"fresh": True}, cache.epoch())
+    assert cache.get("t1") == {"fresh": True}
+
+
+def test_invalidation_of_other_threads_keeps_state():
+    cache = ThreadStateCache(agent="agent")
+    epoch = cache.epoch()
+    cache.invalidate("t2")
+    cache.invalidate("t3")
+    cache.put("t1", {"a": 1}, epoch)
+    assert cache.get("t1") == {"a": 1}
+
+
+def test_forgotten_invalidations_drop_older_states():
+    cache = ThreadStateCache(agent="agent", max_entries=1)
+    epoch = cache.epoch()
+    cache.invalidate("t1")
+    cache.invalidate("t2")
+    cache.put("t1", {"stale": True}, epoch)
+    assert cache.get("t1") is None
+
+
+def test_clear_drops_states_read_before():
+    cache = ThreadStateCache(agent="agent")
+    cache.put("t1", {"a": 1})
+    epoch = cache.epoch()
+    cache.clear()
+    assert cache.get("t1") is None
+    cache.put("t2", {"a": 1}, epoch)
+    assert cache.get("t2") is None
+
+
+def test_entries_are_bounded():
+    cache = ThreadStateCache(agent="agent", max_entries=2, max_bytes=20)
+    cache.put("t1", {"a": 1})
+    cache.put("t2", {"a": 2})
+    cache.get("t1")
+    cache.put("t3", {"a": 3})
+    assert cache.get("t2") is None
+    assert cache.get("t1") == {"a": 1}
+    cache.put("big", {"a": "x" * 100})
+    assert cache.get("big") is None
+    assert cache.size <= 20
+
+
+def test_entries_expire():
+    cache = ThreadStateCache(agent="agent", ttl=0.01)
+    cache.put("t1", {"a": 1})
+    time.sleep(0.02)
+    assert cache.get("t1") is None
@@ -0,0 +1,113 @@
+"""Tests for action argument validation"""
+
+import asyncio
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import Action, CopilotKitRemoteEndpoint
+from copilotkit.exc import ActionArgumentsException
+from copilotkit.integrations.fastapi import add_fastapi_endpoint
+from copilotkit.parameter import normalize_parameters
+from copilotkit.validation import ArgumentValidator
+
+_PARAMETERS = [
+    {"name": "count", "type": "number"},
+    {"name": "enabled", "type": "boolean", "required": False},
+    {"name": "color", "type": "string", "enum": ["red", "blue"], "required": False},
+    {"name": "tags", "type": "string[]", "required": False},
+    {"name": "point", "type": "object", "required": False, "attributes": [
+        {"name": "x", "type": "number"},
+        {"name": "y", "type": "number"},
+    ]},
+]
+
+
+def _validator() -> ArgumentValidator:
+    return ArgumentValidator(normalize_parameters(_PARAMETERS)) # type: ignore
+
+
+def test_valid_arguments_are_returned_unchanged():
+    arguments = {"count": 1, "tags": ["a"], "point": {"x": 1, "y": 2.5}, "extra": True}
+    result, errors = _validator().validate(arguments)
+    assert errors == []
+    assert result is arguments
+
+
+def test_unambiguous_values_are_coerced():
+    arguments = {"count": "3", "enabled": "false", "point": {"x": "1.5", "y": 2}}
+    result, errors = _validator().validate(arguments)
+    assert errors == []
+    assert result == {"count": 3, "enabled": False, "point": {"x": 1.5, "y": 2}}
+    assert arguments["count"] == "3"
+
+
+def test_errors_have_paths():
+    _, errors = _validator().validate({
+        "enabled": 1,
+        "color": "green",
+        "tags": ["a", 2],
+        "point": {"x": "nan"},
+    })
+    assert [error["path"] for error in errors] == [
+        "count", "enabled", "color", "tags[1]", "point.x", "point.y",
+    ]
+    assert errors[0]["message"] == "is required"
+    assert errors[2]["message"] == "expected one of 'red', 'blue', got 'green'"
+
+
+def test_booleans_are_not_numbers():
+    _, errors = _validator().validate({"count": True})
+    assert errors[0]["message"] == "expected a number, got True"
+
+
+def test_optional_arguments_may_be_null():
+    _, errors = _validator().validate({"count": 1, "enabled": None, "point": None})
+    assert errors == []
+
+
+def test_json_schema():
+    schema = _validator().json_schema
+    assert schema["required"] == ["count"]
+    assert schema["properties"]["tags"] == {"type": "array", "items": {"type": "string"}}
+    assert schema["properties"]["color"]["enum"] == ["red", "blue"]
+    assert schema["properties"]["point"]["required"] == ["x", "y"]
+
+
+def test_handler_is_not_called_with_invalid_arguments():
+    calls = []
+
+    def add(value):
+        calls.append(value)
+
+    action = Action(name="add", handler=add, parameters=[
+        {"name": "value", "type": "number"},
+    ])
+    with pytest.raises(ActionArgumentsException) as error:
+        asyncio.run(action.execute(arguments={"value": "one"}))
+    assert error.value.errors[0]["path"] == "value"
+    assert calls == []
+    assert asyncio.run(action.execute(arguments={"value": "1"}))["result"] is None
+    assert calls == [1]
+
+
+def test_invalid_arguments_are_unprocessable():
+    app = FastAPI()
+    add_fastapi_endpoint(app, CopilotKitRemoteEndpoint(actions=[
+        Action(name="double", handler=lambda value: value * 2, parameters=[
+            {"name": "value", "type": "number"},
+        ]),
+    ]), "/copilotkit")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        client = TestClient(app)
+
+    response = client.post("/copilotkit/action/double", json={"arguments": {"value": "x"}})
+    assert response.status_code == 422
+    assert response.json()["errors"] == [{"path": "value", "message": "expected a number, got 'x'"}]
+
+    response = client.post("/copilotkit/action/double", json={"arguments": {"value": "2"}})
+    assert response.status_code == 200
+    assert response.json()["result"] == 4
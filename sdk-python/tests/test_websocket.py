@@ -0,0 +1,137 @@
+"""Tests for the WebSocket transport"""
+
+import asyncio
+import json
+import threading
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from copilotkit import CopilotKitRemoteEndpoint
+from copilotkit.agent import Agent
+from copilotkit.integrations.fastapi import add_fastapi_websocket_endpoint
+
+
+class _TickAgent(Agent):
+    """Records its runs, and streams `ticks` events per run"""
+
+    def __init__(self, ticks: int = 3, delay: float = 0.0):
+        super().__init__(name="ticks")
+        self.ticks = ticks
+        self.delay = delay
+        self.runs = []
+        self.threads = set()
+        self.store = {}
+
+    def execute(self, *, state, messages, thread_id, meta_events=None, **kwargs):
+        self.runs.append((len(messages), dict(state), meta_events))
+
+        async def events():
+            self.threads.add(threading.current_thread().name)
+            reply = {"id": f"a{len(messages)}", "role": "assistant", "content": "ok"}
+            self.store[thread_id] = {
+                "messages": messages + [reply],
+                "state": {**state, "turns": state.get("turns", 0) + 1},
+            }
+            for index in range(self.ticks):
+                await asyncio.sleep(self.delay)
+                yield json.dumps({"event": "tick", "i": index}) + "\n"
+        return events()
+
+    async def get_state(self, *, thread_id):
+        thread = self.store.get(thread_id, {"messages": [], "state": {}})
+        return {"threadId": thread_id, "threadExists": thread_id in self.store, **thread}
+
+
+def _client(agent: _TickAgent, use_thread_pool: bool = False) -> TestClient:
+    app = FastAPI()
+    add_fastapi_websocket_endpoint(
+        app,
+        CopilotKitRemoteEndpoint(agents=[agent]),
+        "/copilotkit",
+        use_thread_pool=use_thread_pool,
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return TestClient(app)
+
+
+def _run(socket, thread_id: str, **fields):
+    socket.send_text(json.dumps({"type": "run", "threadId": thread_id, **fields}))
+    events = []
+    while True:
+        message = json.loads(socket.receive_text())
+        if message["type"] != "event":
+            return events, message
+        events.append(message["event"])
+
+
+def _user(message_id: str) -> dict:
+    return {"id": message_id, "role": "user", "content": "hi"}
+
+
+def test_runs_keep_the_thread_session():
+    agent = _TickAgent()
+    with _client(agent).websocket_connect("/copilotkit/agent/ticks/ws") as socket:
+        events, end = _run(socket, "t1", messages=[_user("u0")], state={"x": 0})
+        assert [event["i"] for event in events] == [0, 1, 2]
+        assert end == {"type": "run_finished", "threadId": "t1"}
+        # only the new message is sent, the session holds the history and state
+        _run(socket, "t1", messages=[_user("u1")], state={"x": 1})
+    assert agent.runs[0] == (1, {"x": 0}, [])
+    assert agent.runs[1] == (3, {"x": 1, "turns": 1}, [])
+
+
+def test_reconnect_loads_thread_from_agent():
+    agent = _TickAgent()
+    client = _client(agent)
+    with client.websocket_connect("/copilotkit/agent/ticks/ws") as socket:
+        _run(socket, "t1", messages=[_user("u0")])
+    with client.websocket_connect("/copilotkit/agent/ticks/ws") as socket:
+        _run(
+            socket,
+            "t1",
+            messages=[_user("u1")],
+            metaEvents=[{"name": "LangGraphInterruptEvent", "response": "yes"}],
+        )
+    assert agent.runs[1][0] == 3
+    assert agent.runs[1][2] == [{"name": "LangGraphInterruptEvent", "response": "yes"}]
+
+
+def test_errors_are_reported():
+    client = _client(_TickAgent())
+    with client.websocket_connect("/copilotkit/agent/ticks/ws") as socket:
+        socket.send_text("not json")
+        assert json.loads(socket.receive_text())["status"] == 400
+    with client.websocket_connect("/copilotkit/agent/missing/ws") as socket:
+        _events, end = _run(socket, "t1")
+        assert end["type"] == "error"
+        assert end["status"] == 404
+
+
+@pytest.mark.parametrize("use_thread_pool", [False, True])
+def test_cancel_sends_cancelled(use_thread_pool):
+    agent = _TickAgent(ticks=20, delay=0.01)
+    with _client(agent, use_thread_pool) as client:
+        with client.websocket_connect("/copilotkit/agent/ticks/ws") as socket:
+            socket.send_text(json.dumps({"type": "run", "threadId": "t1", "messages": []}))
+            assert json.loads(socket.receive_text())["type"] == "event"
+            socket.send_text(json.dumps({"type": "cancel", "threadId": "t1"}))
+            while True:
+                message = json.loads(socket.receive_text())
+                if message["type"] != "event":
+                    break
+            assert message == {"type": "cancelled", "threadId": "t1"}
+            # the socket keeps serving other runs
+            _events, end = _run(socket, "t2", messages=[])
+            assert end == {"type": "run_finished", "threadId": "t2"}
+
+
+def test_runs_on_worker_pool():
+    agent = _TickAgent()
+    with _client(agent, use_thread_pool=True) as client:
+        with client.websocket_connect("/copilotkit/agent/ticks/ws") as socket:
+            _run(socket, "t1", messages=[_user("u0")])
+    assert all(thread.startswith("copilotkit-worker-") for thread in agent.threads)
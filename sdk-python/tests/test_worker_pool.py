@@ -0,0 +1,136 @@
+"""Tests for the worker pool of the offload mode"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from copilotkit.integrations.worker_pool import WorkerPool
+
+
+def test_start_and_shutdown():
+    pool = WorkerPool(max_workers=2)
+    assert not pool.running
+    pool.start()
+    pool.start()
+    threads = [
+        thread for thread in threading.enumerate()
+        if thread.name.startswith("copilotkit-worker-")
+    ]
+    assert len(threads) >= 2
+    assert pool.running
+    pool.shutdown()
+    assert not pool.running
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        WorkerPool(max_workers=0)
+    with pytest.raises(ValueError):
+        WorkerPool(channel_size=0)
+
+
+def test_run_on_worker_thread():
+    async def main():
+        pool = WorkerPool(max_workers=1)
+        try:
+            async def handler():
+                return threading.current_thread().name
+            # started on first use, e.g. with a lifespan handler
+            assert await pool.run(handler) == "copilotkit-worker-0"
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_run_raises_handler_errors():
+    async def main():
+        pool = WorkerPool(max_workers=1)
+        try:
+            async def handler():
+                raise KeyError("boom")
+            with pytest.raises(KeyError):
+                await pool.run(handler)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_blocking_worker_does_not_stall_other_streams():
+    async def main():
+        pool = WorkerPool(max_workers=2)
+        try:
+            async def blocking():
+                # blocks its worker's event loop
+                time.sleep(0.3)
+                yield "blocked"
+
+            async def ticks():
+                for index in range(3):
+                    await asyncio.sleep(0.01)
+                    yield index
+
+            blocked = asyncio.ensure_future(_first(pool.stream(blocking())))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            assert [item async for item in pool.stream(ticks())] == [0, 1, 2]
+            assert time.monotonic() - started < 0.25
+            assert await blocked == "blocked"
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+async def _first(iterator):
+    async for item in iterator:
+        return item
+    return None
+
+
+def test_stream_forwards_items_and_errors():
+    async def main():
+        pool = WorkerPool(max_workers=1, channel_size=1)
+        try:
+            async def failing():
+                yield threading.current_thread().name
+                yield 2
+                raise ValueError("boom")
+
+            items = []
+            with pytest.raises(ValueError):
+                async for item in pool.stream(failing()):
+                    items.append(item)
+            assert items == ["copilotkit-worker-0", 2]
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_closing_stream_stops_producer():
+    async def main():
+        pool = WorkerPool(max_workers=1, channel_size=1)
+        closed = threading.Event()
+        try:
+            async def endless():
+                try:
+                    index = 0
+                    while True:
+                        yield index
+                        index += 1
+                finally:
+                    closed.set()
+
+            stream = pool.stream(endless())
+            assert [await stream.__anext__() for _ in range(3)] == [0, 1, 2]
+            await stream.aclose()
+            assert await asyncio.get_running_loop().run_in_executor(None, closed.wait, 1.0)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())